@@ -0,0 +1,94 @@
+"""Partitioned audit log
+
+Revision ID: a7d3e5f1c248
+Revises: f2c8d4e6a913
+Create Date: 2026-10-19 10:12:44.318020
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e5f1c248'
+down_revision = 'f2c8d4e6a913'
+branch_labels = None
+depends_on = None
+
+# Creates the monthly partition (events_YYYY_MM) a timestamp falls into, see Event.create_partition
+CREATE_PARTITION = """
+    DO $$
+    DECLARE
+        month date;
+    BEGIN
+        FOR month IN {months} LOOP
+            EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+                           'events_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month');
+        END LOOP;
+    END
+    $$;
+"""
+
+
+# Events are stored in UTC, the unpartitioned table kept them in the server's time zone (its default was now())
+LOCAL_TO_UTC = "coalesce(time::timestamptz, now()) AT TIME ZONE 'UTC'"
+UTC_TO_LOCAL = "(time AT TIME ZONE 'UTC')::timestamp"
+
+
+def upgrade():
+    op.rename_table('events', 'events_unpartitioned')
+    op.execute("ALTER TABLE events_unpartitioned RENAME CONSTRAINT events_pkey TO events_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE events_id_seq RENAME TO events_unpartitioned_id_seq")
+
+    # The partition key has to be a part of the primary key
+    op.create_table('events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('table', sa.String(), nullable=True),
+    sa.Column('action', sa.String(), nullable=True),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.Column('time', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+    sa.PrimaryKeyConstraint('id', 'time'),
+    postgresql_partition_by='RANGE (time)'
+    )
+    op.create_index('ix_events_table_record_id_time', 'events', ['table', 'record_id', 'time'], unique=False)
+    op.create_index('ix_events_user_id_time', 'events', ['user_id', 'time'], unique=False)
+
+    op.execute(CREATE_PARTITION.format(
+        months=f"SELECT DISTINCT date_trunc('month', {LOCAL_TO_UTC})::date FROM events_unpartitioned "
+               "UNION SELECT date_trunc('month', timezone('utc', now()))::date"
+    ))
+    op.execute(f"""
+        INSERT INTO events (id, "table", action, record_id, user_id, username, time)
+        SELECT id, "table", action, record_id, user_id, username, {LOCAL_TO_UTC} FROM events_unpartitioned
+    """)
+    op.execute("SELECT setval(pg_get_serial_sequence('events', 'id'), "
+               "coalesce((SELECT max(id) FROM events), 0) + 1, false)")
+    op.drop_table('events_unpartitioned')
+
+
+def downgrade():
+    op.rename_table('events', 'events_partitioned')
+    op.execute("ALTER TABLE events_partitioned RENAME CONSTRAINT events_pkey TO events_partitioned_pkey")
+    op.execute("ALTER SEQUENCE events_id_seq RENAME TO events_partitioned_id_seq")
+    op.create_table('events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('table', sa.String(), nullable=True),
+    sa.Column('action', sa.String(), nullable=True),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('time', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id', name='events_unpartitioned_pkey')
+    )
+    op.execute(f"""
+        INSERT INTO events (id, "table", action, record_id, user_id, username, time)
+        SELECT id, "table", action, record_id, user_id, username, {UTC_TO_LOCAL} FROM events_partitioned
+    """)
+    # Drops the partitions with it
+    op.drop_table('events_partitioned')
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_unpartitioned_pkey TO events_pkey")
+    op.execute("SELECT setval(pg_get_serial_sequence('events', 'id'), "
+               "coalesce((SELECT max(id) FROM events), 0) + 1, false)")
@@ -0,0 +1,27 @@
+"""Trigram lemma search
+
+Revision ID: b1d6a0f3c2e4
+Revises: ca3a01bab94d
+Create Date: 2026-10-17 22:51:10.412337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b1d6a0f3c2e4'
+down_revision = 'ca3a01bab94d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_entries_lemma_trgm', 'entries', ['lemma'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'lemma': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_entries_lemma_trgm', table_name='entries')
+    op.execute("DROP EXTENSION IF EXISTS pg_trgm")
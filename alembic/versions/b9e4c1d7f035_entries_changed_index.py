@@ -0,0 +1,25 @@
+"""Index for the recently changed entries feed
+
+Revision ID: b9e4c1d7f035
+Revises: a7d3e5f1c248
+Create Date: 2026-10-19 16:03:51.772410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4c1d7f035'
+down_revision = 'a7d3e5f1c248'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_entries_changed', 'entries',
+                    [sa.text('coalesce(modified, created) DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_entries_changed', table_name='entries')
@@ -0,0 +1,44 @@
+"""Indexes on foreign keys and sort columns
+
+Revision ID: c3a8f2e9d614
+Revises: b9e4c1d7f035
+Create Date: 2026-10-20 09:41:18.226953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a8f2e9d614'
+down_revision = 'b9e4c1d7f035'
+branch_labels = None
+depends_on = None
+
+# (table, column): referencing columns that ON DELETE CASCADE / SET NULL and reverse lookups have to search,
+# plus the entry filter and sort columns
+INDEXES = [
+    ('suggestions', 'child'),
+    ('translations', 'state'),
+    ('relations', 'entry2'),
+    ('category_to_entry', 'category_id'),
+    ('links', 'entry_id'),
+    ('role_to_user', 'user_id'),
+    ('entries', 'language'),
+    ('entries', 'modified'),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY doesn't block writes, but can't run inside a transaction.
+    # If a build fails, it leaves an INVALID index behind that has to be dropped before running this again.
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table, postgresql_concurrently=True)
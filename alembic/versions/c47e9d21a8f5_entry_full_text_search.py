@@ -0,0 +1,41 @@
+"""Entry full-text search
+
+Revision ID: c47e9d21a8f5
+Revises: b1d6a0f3c2e4
+Create Date: 2026-10-17 23:04:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47e9d21a8f5'
+down_revision = 'b1d6a0f3c2e4'
+branch_labels = None
+depends_on = None
+
+
+LANGUAGE_CONFIG = "CASE language WHEN 'en' THEN 'english'::regconfig WHEN 'sl' THEN 'slovene'::regconfig " \
+                  "ELSE 'simple'::regconfig END"
+
+
+def upgrade():
+    # PostgreSQL has no built-in Slovene configuration; start from "simple" (no stemming, no stop words)
+    op.execute("CREATE TEXT SEARCH CONFIGURATION slovene (COPY = simple)")
+    op.add_column('entries', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(f"setweight(to_tsvector({LANGUAGE_CONFIG}, coalesce(lemma, '')), 'A') || "
+                    f"setweight(to_tsvector({LANGUAGE_CONFIG}, coalesce(description, '')), 'B')",
+                    persisted=True),
+        nullable=True
+    ))
+    op.create_index('ix_entries_search_vector', 'entries', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_entries_search_vector', table_name='entries')
+    op.drop_column('entries', 'search_vector')
+    op.execute("DROP TEXT SEARCH CONFIGURATION slovene")
@@ -0,0 +1,25 @@
+"""Roles version of users
+
+Revision ID: d4b7e2a9c315
+Revises: c3a8f2e9d614
+Create Date: 2026-10-21 14:05:37.511204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4b7e2a9c315'
+down_revision = 'c3a8f2e9d614'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bumped whenever the user's permissions change, access tokens carry the version they were issued for
+    op.add_column('users', sa.Column('roles_version', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'roles_version')
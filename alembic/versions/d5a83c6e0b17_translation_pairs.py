@@ -0,0 +1,148 @@
+"""Translation pairs
+
+Revision ID: d5a83c6e0b17
+Revises: c47e9d21a8f5
+Create Date: 2026-10-17 23:16:52.630481
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a83c6e0b17'
+down_revision = 'c47e9d21a8f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('translation_pairs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('english_id', sa.Integer(), nullable=True),
+    sa.Column('slovene_id', sa.Integer(), nullable=True),
+    sa.Column('english_lemma', sa.String(), nullable=True),
+    sa.Column('slovene_lemma', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_translation_pairs_english_id'), 'translation_pairs', ['english_id'], unique=False)
+    op.create_index(op.f('ix_translation_pairs_slovene_id'), 'translation_pairs', ['slovene_id'], unique=False)
+    op.create_index('ix_translation_pairs_english_lemma_trgm', 'translation_pairs', ['english_lemma'],
+                    unique=False, postgresql_using='gin', postgresql_ops={'english_lemma': 'gin_trgm_ops'})
+    op.create_index('ix_translation_pairs_slovene_lemma_trgm', 'translation_pairs', ['slovene_lemma'],
+                    unique=False, postgresql_using='gin', postgresql_ops={'slovene_lemma': 'gin_trgm_ops'})
+    # Pair refreshes look translations up by child
+    op.create_index(op.f('ix_translations_child'), 'translations', ['child'], unique=False)
+
+    # Recomputes every pair that involves one of the given entries:
+    #  - English entries with their translation (or without one),
+    #  - Slovene entries that no English entry translates to.
+    op.execute("""
+        CREATE FUNCTION refresh_translation_pairs(entry_ids integer[]) RETURNS void AS $$
+        BEGIN
+            IF cardinality(entry_ids) = 0 THEN
+                RETURN;
+            END IF;
+
+            DELETE FROM translation_pairs
+            WHERE english_id = ANY(entry_ids) OR slovene_id = ANY(entry_ids);
+
+            INSERT INTO translation_pairs (english_id, slovene_id, english_lemma, slovene_lemma)
+            SELECT e1.id, e2.id, e1.lemma, e2.lemma
+            FROM entries e1 LEFT JOIN translations t ON t.parent = e1.id
+            LEFT JOIN entries e2 ON e2.id = t.child
+            WHERE e1.language = 'en'
+            AND e1.id IN (SELECT unnest(entry_ids)
+                          UNION
+                          SELECT parent FROM translations WHERE child = ANY(entry_ids))
+            UNION ALL
+            SELECT NULL, e2.id, NULL, e2.lemma
+            FROM entries e2
+            WHERE e2.language = 'sl'
+            AND e2.id = ANY(entry_ids)
+            AND NOT EXISTS (SELECT 1 FROM translations t JOIN entries e1 ON e1.id = t.parent
+                            WHERE t.child = e2.id AND e1.language = 'en');
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION entries_refresh_translation_pairs() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM refresh_translation_pairs(ARRAY(SELECT id FROM new_rows));
+            ELSIF TG_OP = 'UPDATE' THEN
+                PERFORM refresh_translation_pairs(ARRAY(
+                    SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+                    WHERE n.lemma IS DISTINCT FROM o.lemma OR n.language IS DISTINCT FROM o.language));
+            ELSE
+                PERFORM refresh_translation_pairs(ARRAY(SELECT id FROM old_rows));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE FUNCTION translations_refresh_translation_pairs() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                PERFORM refresh_translation_pairs(ARRAY(SELECT parent FROM new_rows UNION SELECT child FROM new_rows));
+            ELSIF TG_OP = 'UPDATE' THEN
+                -- State changes don't affect pairs, only changed (parent, child) combinations do
+                PERFORM refresh_translation_pairs(ARRAY(
+                    SELECT unnest(ARRAY[parent, child]) FROM (
+                        (SELECT parent, child FROM new_rows EXCEPT SELECT parent, child FROM old_rows)
+                        UNION
+                        (SELECT parent, child FROM old_rows EXCEPT SELECT parent, child FROM new_rows)
+                    ) changed));
+            ELSE
+                PERFORM refresh_translation_pairs(ARRAY(SELECT parent FROM old_rows UNION SELECT child FROM old_rows));
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('entries', 'translations'):
+        op.execute(f"""
+            CREATE TRIGGER {table}_pairs_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {table}_refresh_translation_pairs()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_pairs_update AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {table}_refresh_translation_pairs()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_pairs_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {table}_refresh_translation_pairs()
+        """)
+
+    op.execute("""
+        INSERT INTO translation_pairs (english_id, slovene_id, english_lemma, slovene_lemma)
+        SELECT e1.id, e2.id, e1.lemma, e2.lemma
+        FROM entries e1 LEFT JOIN translations t ON t.parent = e1.id
+        LEFT JOIN entries e2 ON e2.id = t.child
+        WHERE e1.language = 'en'
+        UNION ALL
+        SELECT NULL, e2.id, NULL, e2.lemma
+        FROM entries e2
+        WHERE e2.language = 'sl'
+        AND NOT EXISTS (SELECT 1 FROM translations t JOIN entries e1 ON e1.id = t.parent
+                        WHERE t.child = e2.id AND e1.language = 'en')
+    """)
+
+
+def downgrade():
+    for table in ('entries', 'translations'):
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER {table}_pairs_{event} ON {table}")
+    op.execute("DROP FUNCTION translations_refresh_translation_pairs()")
+    op.execute("DROP FUNCTION entries_refresh_translation_pairs()")
+    op.execute("DROP FUNCTION refresh_translation_pairs(integer[])")
+    op.drop_index(op.f('ix_translations_child'), table_name='translations')
+    op.drop_index('ix_translation_pairs_slovene_lemma_trgm', table_name='translation_pairs')
+    op.drop_index('ix_translation_pairs_english_lemma_trgm', table_name='translation_pairs')
+    op.drop_index(op.f('ix_translation_pairs_slovene_id'), table_name='translation_pairs')
+    op.drop_index(op.f('ix_translation_pairs_english_id'), table_name='translation_pairs')
+    op.drop_table('translation_pairs')
@@ -0,0 +1,28 @@
+"""Entry versions
+
+Revision ID: e3f1b7a92c46
+Revises: d5a83c6e0b17
+Create Date: 2026-10-18 10:12:03.481920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f1b7a92c46'
+down_revision = 'd5a83c6e0b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One sequence for all entries, so a version is also a global change counter
+    op.execute("CREATE SEQUENCE entry_version_seq")
+    op.add_column('entries', sa.Column('version', sa.BigInteger(),
+                                       server_default=sa.text("nextval('entry_version_seq')"), nullable=False))
+    op.execute("ALTER SEQUENCE entry_version_seq OWNED BY entries.version")
+
+
+def downgrade():
+    op.drop_column('entries', 'version')
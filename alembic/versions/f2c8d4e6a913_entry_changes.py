@@ -0,0 +1,71 @@
+"""Entry change log
+
+Revision ID: f2c8d4e6a913
+Revises: e3f1b7a92c46
+Create Date: 2026-10-18 14:37:21.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d4e6a913'
+down_revision = 'e3f1b7a92c46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('entry_changes',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('txid', sa.BigInteger(), server_default=sa.text('txid_current()'), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('changed', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_entry_changes_txid_id', 'entry_changes', ['txid', 'id'], unique=False)
+
+    # Every change to an entry's details bumps its version (an UPDATE of the entry),
+    # so logging entries alone covers suggestions, links, categories, ... as well.
+    op.execute("""
+        CREATE FUNCTION entries_log_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO entry_changes (entry_id, action) SELECT id, 'created' FROM new_rows ORDER BY id;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO entry_changes (entry_id, action) SELECT id, 'updated' FROM new_rows ORDER BY id;
+            ELSE
+                INSERT INTO entry_changes (entry_id, action) SELECT id, 'deleted' FROM old_rows ORDER BY id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER entries_changes_insert AFTER INSERT ON entries
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION entries_log_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER entries_changes_update AFTER UPDATE ON entries
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION entries_log_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER entries_changes_delete AFTER DELETE ON entries
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION entries_log_changes()
+    """)
+
+    # Syncing from the start of the log then returns every existing entry
+    op.execute("INSERT INTO entry_changes (entry_id, action) SELECT id, 'created' FROM entries ORDER BY id")
+
+
+def downgrade():
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER entries_changes_{event} ON entries")
+    op.execute("DROP FUNCTION entries_log_changes()")
+    op.drop_index('ix_entry_changes_txid_id', table_name='entry_changes')
+    op.drop_table('entry_changes')
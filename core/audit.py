@@ -0,0 +1,187 @@
+"""
+Audit log of changes made through the API.
+
+DALs call record() for every mutation. Events are kept on the session until it commits (events of a rolled back
+transaction are dropped), then handed to the AuditWriter, which inserts them in batches from a background task,
+so a request never waits for (or fails because of) the audit log.
+"""
+import asyncio
+import datetime
+from contextvars import ContextVar
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.configuration import config
+from core.log import logger
+from core.models.database import async_session
+import core.models.lex_model as models
+
+# (user ID, username) of the authenticated user of the current request, if any
+current_user: ContextVar[Optional[Tuple[int, str]]] = ContextVar("audit_current_user", default=None)
+
+
+def set_current_user(user_id: int, username: str):
+    current_user.set((user_id, username))
+
+
+def _month_start(time: datetime.datetime) -> datetime.date:
+    return datetime.date(time.year, time.month, 1)
+
+
+def _months_before(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 - months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+class AuditWriter:
+    """
+    Background task inserting queued events in batches (one multi-row INSERT per batch).
+    Events are dropped, and counted in `dropped`, when the queue is full or the database can't be written to.
+    """
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int, retention_months: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.retention_months = retention_months
+
+        self.written = 0
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # Months that already have a partition
+        self._partitions: Set[datetime.date] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._stopping
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(self.queue_size)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the writer after writing the events that are still queued.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        # Queued after every remaining event, the writer exits once it gets to it
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def enqueue(self, events: List[dict]):
+        dropped = 0
+        for item in events:
+            try:
+                if not self.running:
+                    raise asyncio.QueueFull
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                dropped += 1
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Dropped {dropped} audit events (writer {'busy' if self.running else 'not running'})")
+
+    def _take(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        stopped = False
+        while not stopped:
+            first = await self._queue.get()
+            if first is not None and self._queue.qsize() + 1 < self.batch_size:
+                # Give the batch a moment to fill up
+                await asyncio.sleep(self.flush_interval)
+            batch = [first] + self._take(self.batch_size - 1)
+            stopped = None in batch
+            await self._write([item for item in batch if item is not None])
+
+    async def _write(self, batch: List[dict]):
+        if not batch:
+            return
+        try:
+            for month in sorted({_month_start(item["time"]) for item in batch} - self._partitions):
+                await self._create_partition(month)
+
+            async with async_session() as session:
+                async with session.begin():
+                    await models.Event.save_all(batch, session)
+            self.written += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Couldn't write {len(batch)} audit events: {e}")
+
+    async def _create_partition(self, month: datetime.date):
+        """
+        Create the partition of a month (and drop the ones past retention while at it), each in its own
+        transaction, so another worker creating the same partition doesn't abort the batch.
+        """
+        try:
+            async with async_session() as session:
+                async with session.begin():
+                    await models.Event.create_partition(month, session)
+        except Exception as e:
+            # Most likely created concurrently by another worker, the insert fails if it really is missing
+            logger.warning(f"Couldn't create the audit log partition of {month:%Y-%m}: {e}")
+        self._partitions.add(month)
+
+        if self.retention_months > 0:
+            try:
+                async with async_session() as session:
+                    async with session.begin():
+                        await models.Event.drop_partitions_before(
+                            _months_before(month, self.retention_months), session)
+            except Exception as e:
+                logger.warning(f"Couldn't drop expired audit log partitions: {e}")
+
+
+writer = AuditWriter(config.AUDIT.BATCH_SIZE, config.AUDIT.FLUSH_INTERVAL,
+                     config.AUDIT.QUEUE_SIZE, config.AUDIT.RETENTION_MONTHS)
+
+
+def record(db_session: AsyncSession, table: str, action: str, record_id: Optional[int] = None, **details):
+    """
+    Record a change to the audit log once the session's transaction commits.
+
+    :param db_session: Session the change is made in.
+    :param table: Table that was changed.
+    :param action: What was done ("create", "update", "delete", ...).
+    :param record_id: ID of the changed row, if there is a single one.
+    :param details: Anything else worth knowing about the change (stored as JSON).
+    """
+    user = current_user.get()
+    item = {
+        "table": table,
+        "action": action,
+        "record_id": record_id,
+        "user_id": user[0] if user else None,
+        "username": user[1] if user else None,
+        "details": details or None,
+        # Events are stored in UTC (as is the column's default), whatever the database's time zone
+        "time": datetime.datetime.utcnow()
+    }
+
+    sync_session = db_session.sync_session
+    pending: list = sync_session.info.setdefault("audit", [])
+    if not pending:
+        def after_commit(_session):
+            writer.enqueue(pending[:])
+            pending.clear()
+
+        def after_rollback(_session):
+            pending.clear()
+
+        event.listen(sync_session, "after_commit", after_commit, once=True)
+        event.listen(sync_session, "after_rollback", after_rollback, once=True)
+    pending.append(item)
@@ -0,0 +1,172 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Rough per-item bookkeeping cost (key, OrderedDict node, tuple), added to the payload size
+_ITEM_OVERHEAD = 200
+
+
+class LRUCache:
+    """
+    In-process cache of byte payloads, bounded by total payload size (least recently used items are evicted first)
+    and by item age. Counts hits, misses, evictions, expirations and invalidations (see render_metrics()).
+    """
+    def __init__(self, name: str, max_bytes: int, ttl: float):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._generation = 0
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+        CACHES[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, version: Optional[Hashable] = None) -> Optional[Any]:
+        """
+        :param version: Current version of the data. A value cached for any other version counts as a miss
+            (and is dropped). Leave out to accept any version.
+        """
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+
+        value, size, expires, item_version = item
+        if expires <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if version is not None and item_version != version:
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    @property
+    def generation(self) -> int:
+        """
+        Changes on every invalidation. Read it before loading a value and pass it to set().
+        """
+        return self._generation
+
+    def set(self, key: Hashable, value: Any, payload_size: int, generation: Optional[int] = None,
+            version: Optional[Hashable] = None):
+        """
+        :param payload_size: Size of the value in bytes, used for the memory bound.
+        :param generation: Generation read before the value was loaded. If anything was invalidated since,
+            the value may already be outdated and isn't cached.
+        :param version: Version of the data the value was built from (see get()).
+        """
+        if not self.enabled or (generation is not None and generation != self._generation):
+            return
+
+        size = payload_size + _ITEM_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        if key in self._items:
+            self._remove(key)
+        self._items[key] = (value, size, time.monotonic() + self.ttl, version)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._items))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[Hashable]):
+        self._generation += 1
+        for key in keys:
+            if key in self._items:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        self._generation += 1
+        self.invalidations += len(self._items)
+        self._items.clear()
+        self.size = 0
+
+    def invalidate_on_commit(self, db_session: AsyncSession, keys: Iterable[Hashable]):
+        """
+        Invalidate the keys now and once more after the session commits. The second pass drops values
+        that concurrent requests cached from the old data while the transaction was still open.
+        """
+        keys = set(keys)
+        self.invalidate(keys)
+
+        sync_session = db_session.sync_session
+        pending: set = sync_session.info.setdefault(("invalidate", self.name), set())
+        if not pending:
+            def after_commit(_session):
+                self.invalidate(pending)
+                pending.clear()
+            event.listen(sync_session, "after_commit", after_commit, once=True)
+        pending.update(keys)
+
+    def clear_on_commit(self, db_session: AsyncSession):
+        """
+        Like invalidate_on_commit(), for every cached key (for values that depend on more than one row).
+        """
+        self.clear()
+
+        sync_session = db_session.sync_session
+        key = ("clear", self.name)
+        if not sync_session.info.get(key):
+            def after_commit(_session):
+                self.clear()
+                sync_session.info.pop(key, None)
+            event.listen(sync_session, "after_commit", after_commit, once=True)
+            sync_session.info[key] = True
+
+    def _remove(self, key: Hashable):
+        _value, size, _expires, _version = self._items.pop(key)
+        self.size -= size
+
+    def __len__(self):
+        return len(self._items)
+
+
+CACHES: Dict[str, LRUCache] = {}
+
+
+def render_metrics() -> str:
+    """
+    Cache statistics in the Prometheus text exposition format.
+    """
+    metrics = [
+        ("kolomoni_cache_hits_total", "counter", "Cache lookups that returned a value.", "hits"),
+        ("kolomoni_cache_misses_total", "counter", "Cache lookups that found no (valid) value.", "misses"),
+        ("kolomoni_cache_evictions_total", "counter", "Items evicted to stay within the memory bound.", "evictions"),
+        ("kolomoni_cache_expirations_total", "counter", "Items dropped after their TTL ran out.", "expirations"),
+        ("kolomoni_cache_invalidations_total", "counter", "Items dropped because the data changed.", "invalidations"),
+        ("kolomoni_cache_items", "gauge", "Items currently cached.", None),
+        ("kolomoni_cache_bytes", "gauge", "Approximate memory used by cached items.", "size"),
+    ]
+
+    lines = []
+    for metric, metric_type, description, attribute in metrics:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for name, cache in CACHES.items():
+            value = len(cache) if attribute is None else getattr(cache, attribute)
+            lines.append(f'{metric}{{cache="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
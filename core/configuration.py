@@ -2,6 +2,7 @@ from pathlib import Path
 from typing import Union
 
 from .configuration_base import TOMLConfig, BASE_PROJECT_DIR
+from .exceptions import ConfigurationException
 
 
 class _DatabaseConfiguration:
@@ -18,6 +19,49 @@ class _DatabaseConfiguration:
         self.DATABASE_NAME = database_table.get("database_name", raise_on_missing_key=True)
 
 
+class _DatabasePoolConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "database.pool" table.
+    """
+    ECHO_LEVELS = (False, True, "debug")
+
+    def __init__(self, pool_table: TOMLConfig):
+        self.POOL_SIZE = int(pool_table.get("pool_size", fallback=5))
+        self.MAX_OVERFLOW = int(pool_table.get("max_overflow", fallback=10))
+        self.POOL_TIMEOUT = float(pool_table.get("pool_timeout", fallback=30))
+        self.PRE_PING = bool(pool_table.get("pre_ping", fallback=False))
+        self.RECYCLE = int(pool_table.get("recycle", fallback=-1))
+
+        self.STATEMENT_CACHE_SIZE = int(pool_table.get("statement_cache_size", fallback=100))
+        self.COMMAND_TIMEOUT = float(pool_table.get("command_timeout", fallback=0)) or None
+        self.STATEMENT_TIMEOUT = int(pool_table.get("statement_timeout", fallback=0))
+        self.PGBOUNCER = bool(pool_table.get("pgbouncer", fallback=False))
+
+        self.ECHO = pool_table.get("echo", fallback=False)
+        if self.ECHO not in self.ECHO_LEVELS:
+            raise ConfigurationException(f"database.pool.echo should be false, true or \"debug\", got {self.ECHO!r}")
+
+
+class _DatabaseReplicaConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "database.replica" table (connection settings default to the primary's).
+    """
+    def __init__(self, replica_table: TOMLConfig, database_table: TOMLConfig):
+        self.HOST = replica_table.get("host", fallback=None)
+        self.ENABLED = self.HOST is not None
+        self.PORT = replica_table.get("port", fallback=database_table.get("port"))
+
+        self.USER = replica_table.get("user", fallback=database_table.get("user"))
+        self.PASSWORD = replica_table.get("password", fallback=database_table.get("password"))
+        self.DATABASE_NAME = replica_table.get("database_name", fallback=database_table.get("database_name"))
+
+        self.MAX_LAG = float(replica_table.get("max_lag", fallback=5))
+        self.LAG_CHECK_INTERVAL = float(replica_table.get("lag_check_interval", fallback=1))
+        self.READ_YOUR_WRITES = float(replica_table.get("read_your_writes", fallback=10))
+
+
 class _TestDatabaseConfiguration:
     """
     A smaller portion of the configuration.
@@ -43,6 +87,64 @@ class _JWTConfiguration:
         self.ACCESS_TOKEN_EXPIRE_MINUTES = jwt_table.get("access_token_expire_minutes", raise_on_missing_key=True)
 
 
+class _PasswordsConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "passwords" table.
+    """
+    def __init__(self, passwords_table: TOMLConfig):
+        self.BCRYPT_ROUNDS = int(passwords_table.get("bcrypt_rounds", fallback=12))
+        self.WORKERS = int(passwords_table.get("workers", fallback=2))
+        self.QUEUE_SIZE = int(passwords_table.get("queue_size", fallback=16))
+
+
+class _SearchConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "search" table.
+    """
+    def __init__(self, search_table: TOMLConfig):
+        self.SIMILARITY_THRESHOLD = float(search_table.get("similarity_threshold", fallback=0.3))
+
+
+class _PaginationConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "pagination" table.
+    """
+    def __init__(self, pagination_table: TOMLConfig):
+        self.COUNT_STRATEGY = pagination_table.get("count_strategy", fallback="exact")
+        self.COUNT_CACHE_TTL = float(pagination_table.get("count_cache_ttl", fallback=60))
+        self.COUNT_CACHE_SIZE = int(pagination_table.get("count_cache_size", fallback=1024))
+
+
+class _CacheConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "cache" table.
+    """
+    def __init__(self, cache_table: TOMLConfig):
+        self.ENTRY_CACHE_MAX_BYTES = int(cache_table.get("entry_cache_max_bytes", fallback=64 * 1024 * 1024))
+        self.ENTRY_CACHE_TTL = float(cache_table.get("entry_cache_ttl", fallback=300))
+        self.LATEST_ENTRIES_CACHE_TTL = float(cache_table.get("latest_entries_cache_ttl", fallback=30))
+        self.USER_CACHE_MAX_BYTES = int(cache_table.get("user_cache_max_bytes", fallback=1024 * 1024))
+        self.USER_CACHE_TTL = float(cache_table.get("user_cache_ttl", fallback=30))
+        self.REGISTRY_MAX_AGE = float(cache_table.get("registry_max_age", fallback=300))
+        self.REGISTRY_LISTEN = bool(cache_table.get("registry_listen", fallback=True))
+
+
+class _AuditConfiguration:
+    """
+    A smaller portion of the configuration.
+    This class parses values in the "audit" table.
+    """
+    def __init__(self, audit_table: TOMLConfig):
+        self.BATCH_SIZE = int(audit_table.get("batch_size", fallback=500))
+        self.FLUSH_INTERVAL = float(audit_table.get("flush_interval", fallback=1.0))
+        self.QUEUE_SIZE = int(audit_table.get("queue_size", fallback=10000))
+        self.RETENTION_MONTHS = int(audit_table.get("retention_months", fallback=0))
+
+
 class KolomoniConfiguration:
     """
     Main configuration class that contains all the available options for Stari Kolomoni's configuration.
@@ -52,12 +154,26 @@ class KolomoniConfiguration:
 
         ### Tables
         self._database = self._config.get_table("database", raise_on_missing_key=True)
+        self._database_pool = self._database.get_table("pool") or TOMLConfig({})
+        self._database_replica = self._database.get_table("replica") or TOMLConfig({})
         self._jwt = self._config.get_table("JWT", raise_on_missing_key=True)
+        self._passwords = self._config.get_table("passwords") or TOMLConfig({})
+        self._search = self._config.get_table("search") or TOMLConfig({})
+        self._pagination = self._config.get_table("pagination") or TOMLConfig({})
+        self._cache = self._config.get_table("cache") or TOMLConfig({})
+        self._audit = self._config.get_table("audit") or TOMLConfig({})
 
         ### Pass individual tables around to each specific "group" of the configuration.
         self.DATABASE = _DatabaseConfiguration(self._database)
+        self.DATABASE_POOL = _DatabasePoolConfiguration(self._database_pool)
+        self.DATABASE_REPLICA = _DatabaseReplicaConfiguration(self._database_replica, self._database)
         self.TEST_DATABASE = _TestDatabaseConfiguration(self._database)
         self.JWT = _JWTConfiguration(self._jwt)
+        self.PASSWORDS = _PasswordsConfiguration(self._passwords)
+        self.SEARCH = _SearchConfiguration(self._search)
+        self.PAGINATION = _PaginationConfiguration(self._pagination)
+        self.CACHE = _CacheConfiguration(self._cache)
+        self.AUDIT = _AuditConfiguration(self._audit)
 
     @classmethod
     def from_file_path(cls, configuration_filepath: Union[str, Path]) -> "KolomoniConfiguration":
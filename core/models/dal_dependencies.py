@@ -1,20 +1,301 @@
+import base64
+import binascii
+import datetime
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, or_, false, tuple_, func
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
 from sqlalchemy.sql import Select
 from starlette.datastructures import QueryParams
 
+from core.configuration import config
+from core.exceptions import GeneralBackendException
+
 
 # noinspection PyNoneFunctionAssignment
-def paging_filter_sort(query: Select, params: QueryParams) -> Select:
+def paging_filter_sort(query: Select, params: QueryParams, peek: bool = False) -> Select:
     """
     Parse the QueryParams dictionary and apply pagination accordingly.
 
     :param query: Select statement to paginate.
     :param params: Pagination parameters.
         Expected: "skip" integer to specify the offset, "limit" to specify the amount to return.
+    :param peek: Request one row more than the limit (see trim_peeked_row()).
     :return:
     """
     if skip := params.get("skip"):
         query = query.offset(skip)
     if limit := params.get("limit"):
-        query = query.limit(limit)
+        query = query.limit(int(limit) + 1 if peek else limit)
 
     return query
+
+
+def trim_peeked_row(rows: list, params: QueryParams) -> (list, bool):
+    """
+    Trim the extra row requested by paging_filter_sort(peek=True).
+
+    :return: A tuple containing the rows of this page and a boolean indicating whether more rows follow.
+    """
+    limit = params.get("limit")
+    if not limit or len(rows) <= int(limit):
+        return rows, False
+    return rows[:int(limit)], True
+
+
+####
+# Keyset (cursor) pagination
+####
+class SortKey(NamedTuple):
+    """
+    One column (or expression) of a keyset ordering.
+    """
+    name: str
+    expression: Any
+    descending: bool = False
+    nullable: bool = False
+
+
+class Page(NamedTuple):
+    """
+    A page of results together with the total count and the cursor of the next page (None on the last page).
+    """
+    items: list
+    count: Optional[int]
+    next_cursor: Optional[str] = None
+    count_strategy: str = "exact"
+    has_more: bool = False
+
+
+def parse_sort(sort: Optional[str], sortable: List[SortKey], tiebreaker: SortKey) -> List[SortKey]:
+    """
+    Turn the "sort" query parameter into a list of sort keys.
+
+    :param sort: Sort string, e.g. "lemma" or "-lemma,description". A leading "-" means descending.
+    :param sortable: Sort keys that may be requested, in the order they are applied.
+    :param tiebreaker: Unique sort key (usually the ID) appended last to make the ordering deterministic.
+    :return: List of SortKey instances.
+    """
+    sort = sort or ""
+    keys = []
+    for key in sortable:
+        if f"-{key.name}" in sort:
+            keys.append(key._replace(descending=True))
+        elif key.name in sort:
+            keys.append(key)
+    keys.append(tiebreaker)
+    return keys
+
+
+def keyset_order_by(keys: List[SortKey]) -> list:
+    """
+    ORDER BY clauses for the given sort keys (NULL values always sort last).
+    """
+    clauses = []
+    for key in keys:
+        clause = key.expression.desc() if key.descending else key.expression.asc()
+        if key.nullable:
+            clause = clause.nulls_last()
+        clauses.append(clause)
+    return clauses
+
+
+def _signature(keys: List[SortKey]) -> str:
+    return ",".join(("-" if key.descending else "") + key.name for key in keys)
+
+
+def encode_cursor(keys: List[SortKey], values: list) -> str:
+    """
+    Encode the sort key values of the last row on a page into an opaque cursor.
+    """
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    payload = json.dumps({"s": _signature(keys), "v": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(keys: List[SortKey], cursor: str) -> list:
+    """
+    Decode a cursor created by encode_cursor with the same sort keys.
+
+    :raises GeneralBackendException: (400) If the cursor is malformed or was created for a different sort.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        signature, values = payload["s"], payload["v"]
+    except (ValueError, TypeError, KeyError, binascii.Error) as error:
+        raise GeneralBackendException(400, "Invalid cursor") from error
+
+    if signature != _signature(keys) or not isinstance(values, list) or len(values) != len(keys):
+        raise GeneralBackendException(400, "Cursor does not match the requested sort")
+
+    decoded = []
+    for key, value in zip(keys, values):
+        if isinstance(value, str) and isinstance(key.expression.type, DateTime):
+            try:
+                value = datetime.datetime.fromisoformat(value)
+            except ValueError as error:
+                raise GeneralBackendException(400, "Invalid cursor") from error
+        decoded.append(value)
+    return decoded
+
+
+def keyset_condition(keys: List[SortKey], values: list):
+    """
+    Seek predicate selecting the rows that come after the given sort key values.
+    """
+    if all(not key.nullable and key.descending == keys[0].descending for key in keys):
+        # Uniform direction: a row comparison, which an index on the sort columns can serve directly
+        row = tuple_(*[key.expression for key in keys])
+        return row < tuple_(*values) if keys[0].descending else row > tuple_(*values)
+
+    branches = []
+    for index, (key, value) in enumerate(zip(keys, values)):
+        if value is None:
+            # Nothing sorts after NULL (NULLs last) apart from other NULLs, handled by the next keys
+            after = false()
+        else:
+            after = key.expression < value if key.descending else key.expression > value
+            if key.nullable:
+                after = or_(after, key.expression.is_(None))
+
+        equal = [prior.expression.is_(None) if prior_value is None else prior.expression == prior_value
+                 for prior, prior_value in zip(keys[:index], values[:index])]
+        branches.append(and_(*equal, after))
+    return or_(*branches)
+
+
+def paginate(stmt: Select, keys: List[SortKey], cursor: Optional[str],
+             offset: Optional[int], limit: Optional[int]) -> Select:
+    """
+    Order the statement by the sort keys and apply either the cursor (if given) or the offset.
+    One row more than the limit is requested, so trim_page() can tell whether another page follows.
+    """
+    stmt = stmt.order_by(*keyset_order_by(keys))
+
+    if cursor:
+        stmt = stmt.where(keyset_condition(keys, decode_cursor(keys, cursor)))
+    else:
+        stmt = stmt.offset(offset)
+
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def trim_page(rows: list, keys: List[SortKey], limit: Optional[int],
+              key_values: Optional[Callable[[Any], list]] = None) -> (list, Optional[str]):
+    """
+    Trim the extra row requested by paginate() and compute the cursor of the next page.
+
+    :param rows: Rows returned by the paginated statement.
+    :param keys: Sort keys used in paginate().
+    :param limit: Limit used in paginate().
+    :param key_values: Function returning the sort key values of a row.
+        By default, each value is read from the row attribute named after the sort key.
+    :return: A tuple containing the rows of this page and the next cursor (None if this is the last page).
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if not rows:
+        return rows, None
+
+    last = rows[-1]
+    if key_values is None:
+        values = [getattr(last, key.name) for key in keys]
+    else:
+        values = key_values(last)
+    return rows, encode_cursor(keys, values)
+
+
+####
+# Result counting
+####
+COUNT_STRATEGIES = ("exact", "estimated", "cached", "none")
+
+# scope -> {(statement, parameters): (count, expiry time)}
+_count_cache: Dict[str, "OrderedDict[Tuple, Tuple[int, float]]"] = {}
+
+
+def count_strategy(params: Optional[Mapping]) -> str:
+    """
+    Read the requested count strategy from the "count" parameter, falling back to the configured default.
+
+    :raises GeneralBackendException: (400) If the strategy is unknown.
+    """
+    strategy = (params or {}).get("count") or config.PAGINATION.COUNT_STRATEGY
+    if strategy not in COUNT_STRATEGIES:
+        raise GeneralBackendException(400, f"Unknown count strategy, expected one of: {', '.join(COUNT_STRATEGIES)}")
+    return strategy
+
+
+async def _exact_count(stmt: Select, db_session: Session) -> int:
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    count_result = await db_session.execute(count_stmt)
+    return count_result.scalar()
+
+
+async def _estimated_count(stmt: Select, db_session: Session) -> int:
+    # The planner's row estimate comes from table statistics, so the rows themselves are never visited
+    connection = await db_session.connection()
+    compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup or ())
+
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", parameters)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _cached_count(stmt: Select, db_session: Session, scope: str, cache_key: tuple) -> int:
+    compiled = stmt.compile()
+    key = (str(compiled), tuple(sorted(compiled.params.items(), key=lambda item: item[0])), cache_key)
+    cache = _count_cache.setdefault(scope, OrderedDict())
+
+    cached = cache.get(key)
+    if cached is not None and cached[1] > time.monotonic():
+        cache.move_to_end(key)
+        return cached[0]
+
+    count = await _exact_count(stmt, db_session)
+    cache[key] = (count, time.monotonic() + config.PAGINATION.COUNT_CACHE_TTL)
+    cache.move_to_end(key)
+    while len(cache) > config.PAGINATION.COUNT_CACHE_SIZE:
+        cache.popitem(last=False)
+    return count
+
+
+async def count_rows(stmt: Select, params: Optional[Mapping], db_session: Session,
+                     scope: str, cache_key: tuple = ()) -> (Optional[int], str):
+    """
+    Count the rows matched by a statement using the strategy requested in the parameters.
+
+    :param stmt: Filtered select statement (without ordering or pagination).
+    :param params: Filters or QueryParams containing the optional "count" parameter.
+    :param db_session: Database session.
+    :param scope: Name of the data the statement reads, writes to which are announced with invalidate_counts().
+    :param cache_key: Values that affect the result without appearing in the statement itself.
+    :return: A tuple containing the count (None with the "none" strategy) and the strategy used.
+    """
+    strategy = count_strategy(params)
+    if strategy == "exact":
+        return await _exact_count(stmt, db_session), strategy
+    if strategy == "estimated":
+        return await _estimated_count(stmt, db_session), strategy
+    if strategy == "cached":
+        return await _cached_count(stmt, db_session, scope, cache_key), strategy
+    return None, strategy
+
+
+def invalidate_counts(*scopes: str):
+    """
+    Drop the cached counts of the given scopes. Call this whenever their data changes.
+    """
+    for scope in scopes:
+        _count_cache.pop(scope, None)
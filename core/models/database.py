@@ -1,3 +1,6 @@
+import uuid
+
+from asyncpg import Connection
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
 
@@ -5,14 +8,72 @@ from ..configuration import config
 
 DATABASE_URL = f"postgresql+asyncpg://" \
                f"{config.DATABASE.USER}:{config.DATABASE.PASSWORD}" \
-               f"@{config.DATABASE.HOST}/{config.DATABASE.DATABASE_NAME}"
+               f"@{config.DATABASE.HOST}:{config.DATABASE.PORT}/{config.DATABASE.DATABASE_NAME}"
+
+
+class _PgBouncerConnection(Connection):
+    """
+    asyncpg connection naming its prepared statements uniquely across processes. Behind PgBouncer in transaction
+    pooling mode, clients share server connections, so the default per-process counter names would collide.
+    """
+    def _get_unique_id(self, prefix: str) -> str:
+        return f"__asyncpg_{prefix}_{uuid.uuid4()}__"
+
+
+def engine_options(pool_config) -> dict:
+    """
+    Keyword arguments of create_async_engine() for the "database.pool" configuration.
+    """
+    connect_args = {
+        "statement_cache_size": pool_config.STATEMENT_CACHE_SIZE,
+        # SQLAlchemy's own cache of prepared statements (on top of asyncpg's)
+        "prepared_statement_cache_size": pool_config.STATEMENT_CACHE_SIZE,
+        "command_timeout": pool_config.COMMAND_TIMEOUT,
+    }
+    if pool_config.PGBOUNCER:
+        # Server connections change between transactions, so nothing prepared can be relied on later.
+        # PgBouncer doesn't pass startup parameters on either (statement_timeout belongs on the database role).
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+        connect_args["connection_class"] = _PgBouncerConnection
+    elif pool_config.STATEMENT_TIMEOUT:
+        connect_args["server_settings"] = {"statement_timeout": str(pool_config.STATEMENT_TIMEOUT)}
+
+    return {
+        "echo": pool_config.ECHO,
+        "pool_size": pool_config.POOL_SIZE,
+        "max_overflow": pool_config.MAX_OVERFLOW,
+        "pool_timeout": pool_config.POOL_TIMEOUT,
+        "pool_pre_ping": pool_config.PRE_PING,
+        "pool_recycle": pool_config.RECYCLE,
+        "connect_args": connect_args,
+    }
+
 
 # TODO: Add SSL = True in deployment!
-engine = create_async_engine(DATABASE_URL, echo=True)
+engine = create_async_engine(DATABASE_URL, **engine_options(config.DATABASE_POOL))
 
 async_session = sessionmaker(
     engine, expire_on_commit=False, class_=AsyncSession
 )
+# For requests that only read: BEGIN READ ONLY (no extra round trip with asyncpg), and nothing to autoflush
+read_only_session = sessionmaker(
+    engine.execution_options(postgresql_readonly=True), expire_on_commit=False, autoflush=False, class_=AsyncSession
+)
+
+# Optional read-only replica, see core/replica.py for when it's used
+replica_engine = None
+replica_session = None
+if config.DATABASE_REPLICA.ENABLED:
+    REPLICA_URL = f"postgresql+asyncpg://" \
+                  f"{config.DATABASE_REPLICA.USER}:{config.DATABASE_REPLICA.PASSWORD}" \
+                  f"@{config.DATABASE_REPLICA.HOST}:{config.DATABASE_REPLICA.PORT}" \
+                  f"/{config.DATABASE_REPLICA.DATABASE_NAME}"
+    replica_engine = create_async_engine(REPLICA_URL, **engine_options(config.DATABASE_POOL))
+    replica_session = sessionmaker(
+        replica_engine.execution_options(postgresql_readonly=True), expire_on_commit=False, autoflush=False,
+        class_=AsyncSession
+    )
 
 Base = declarative_base()
 
@@ -23,6 +84,8 @@ async def connect_db():
 
 async def disconnect_db():
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 async def get_session():
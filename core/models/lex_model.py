@@ -1,15 +1,79 @@
+import datetime
 from typing import Optional, List
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey
-from sqlalchemy.orm import Session
-from sqlalchemy import insert, update, delete, desc, and_, text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func, ForeignKey, Index, Computed, Sequence, \
+    text, MetaData, Table, cast, exists, true, any_, union, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR, JSON, ARRAY, REGCLASS, aggregate_order_by
+from sqlalchemy.orm import Session, deferred, aliased
+from sqlalchemy import insert, update, delete, desc, and_, or_, case, literal, literal_column, tuple_
 from sqlalchemy.future import select
 
+import core.models.dal_dependencies as dd
 from .database import Base
 
 
 LIMIT_SIZE = 25
 
+# Text search configuration per entry language. PostgreSQL doesn't ship a Slovene one, so "slovene"
+# is created by the migration as a copy of "simple" (a dictionary can be plugged into it later).
+TEXT_SEARCH_CONFIGS = {
+    'en': 'english',
+    'sl': 'slovene'
+}
+DEFAULT_TEXT_SEARCH_CONFIG = 'simple'
+
+
+def _regconfig(config_name: str):
+    return literal_column(f"'{config_name}'::regconfig")
+
+
+def _language_regconfig(language_column):
+    return case(
+        *[(language_column == language, _regconfig(config_name))
+          for language, config_name in TEXT_SEARCH_CONFIGS.items()],
+        else_=_regconfig(DEFAULT_TEXT_SEARCH_CONFIG)
+    )
+
+
+_LANGUAGE_CONFIG_SQL = "CASE language " \
+    + " ".join(f"WHEN '{language}' THEN '{config_name}'::regconfig"
+               for language, config_name in TEXT_SEARCH_CONFIGS.items()) \
+    + f" ELSE '{DEFAULT_TEXT_SEARCH_CONFIG}'::regconfig END"
+
+# Lemma matches rank above description matches
+SEARCH_VECTOR_EXPRESSION = f"setweight(to_tsvector({_LANGUAGE_CONFIG_SQL}, coalesce(lemma, '')), 'A') || " \
+                           f"setweight(to_tsvector({_LANGUAGE_CONFIG_SQL}, coalesce(description, '')), 'B')"
+
+
+def _json_object(**columns):
+    """
+    json_build_object() with the given keys and values.
+    """
+    arguments = []
+    for key, value in columns.items():
+        arguments += [key, value]
+    return func.json_build_object(*arguments, type_=JSON)
+
+
+def _json_list(json_object, order_by):
+    """
+    Aggregate JSON objects into a JSON array (an empty one if there are no rows).
+    """
+    return func.coalesce(func.json_agg(aggregate_order_by(json_object, order_by)),
+                         literal_column("'[]'::json"), type_=JSON)
+
+
+def _entry_json(entry):
+    """
+    JSON object of an entry, shaped like the Entry schema.
+    """
+    return _json_object(id=entry.id, lemma=entry.lemma, description=entry.description, language=entry.language,
+                        additional_info=literal_column("'{}'::json"), created=entry.created, edited=entry.modified)
+
+
+# Shared by all entries, so versions also order changes globally
+ENTRY_VERSION_SEQUENCE = Sequence('entry_version_seq', metadata=Base.metadata)
+
 
 class Entry(Base):
     __tablename__ = "entries"
@@ -17,12 +81,24 @@ class Entry(Base):
     id = Column(Integer, primary_key=True, index=True)
     lemma = Column(String, index=True)
     description = Column(String, nullable=True)
-    language = Column(String, nullable=True)
+    language = Column(String, nullable=True, index=True)
     created = Column(DateTime, server_default=func.now())
-    modified = Column(DateTime, onupdate=func.now(), nullable=True)
+    modified = Column(DateTime, onupdate=func.now(), nullable=True, index=True)
+    # Maintained by PostgreSQL on every insert/update, never loaded with the entry
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+    # Bumped whenever anything shown in the entry's details changes (see EntryDAL)
+    version = Column(BigInteger, server_default=text("nextval('entry_version_seq')"), nullable=False)
     extra_data = {}
 
     __mapper__args = {'eager_defaults': True}
+    __table_args__ = (
+        # Trigram index (pg_trgm), serves both fuzzy search and LIKE '%...%' lemma filters
+        Index('ix_entries_lemma_trgm', 'lemma',
+              postgresql_using='gin', postgresql_ops={'lemma': 'gin_trgm_ops'}),
+        Index('ix_entries_search_vector', 'search_vector', postgresql_using='gin'),
+        # Recently changed feed (see retrieve_latest)
+        Index('ix_entries_changed', func.coalesce(modified, created).desc(), id.desc()),
+    )
 
     def __eq__(self, other):
         if not isinstance(self, other.__class__):
@@ -92,163 +168,327 @@ class Entry(Base):
         return entry
 
     @staticmethod
-    async def retrieve_all(filters: dict, db_session: Session) -> (List['Entry'], int):
-        offset: int = filters.get('offset', 0)
-        limit: int = filters.get('limit', LIMIT_SIZE)
-        sort: str = filters.get('sort', '')
+    async def stream_export(db_session: Session):
+        """
+        All entries with their alternative form, category names, translation lemmas, translation state
+        and links, in ID order. Rows are fetched through a server-side cursor as the result is consumed.
+
+        :return: AsyncResult, read it in partitions.
+        """
+        translated = aliased(Entry)
+        categories = select(func.array_agg(aggregate_order_by(Category.name, Category.name))) \
+            .join(CategoryToEntry, CategoryToEntry.category_id == Category.id) \
+            .where(CategoryToEntry.entry_id == Entry.id) \
+            .scalar_subquery()
+        translations = select(func.array_agg(aggregate_order_by(translated.lemma, translated.id))) \
+            .join(Translation, Translation.child == translated.id) \
+            .where(Translation.parent == Entry.id) \
+            .scalar_subquery()
+        translation_state = select(TranslationState.label) \
+            .join(Translation, Translation.state == TranslationState.id) \
+            .where(Translation.parent == Entry.id) \
+            .limit(1) \
+            .scalar_subquery()
+        links = select(_json_list(_json_object(title=Link.title, url=Link.url), Link.id)) \
+            .where(Link.entry_id == Entry.id) \
+            .scalar_subquery()
+
+        stmt = select(Entry.id, Entry.lemma, Entry.description, Entry.language,
+                      Slovene.alt_form.label("alternative_form"),
+                      categories.label("categories"),
+                      translations.label("translations"),
+                      translation_state.label("translation_state"),
+                      links.label("links"),
+                      Entry.created, Entry.modified.label("edited")) \
+            .outerjoin(Slovene, Slovene.id == Entry.id) \
+            .order_by(Entry.id)
+        return await db_session.stream(stmt)
 
-        count_stmt = select(func.count(Entry.id))
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
+    @staticmethod
+    async def retrieve_detail(entry_id: int, db_session: Session):
+        """
+        Load an entry together with everything shown on its detail page in a single statement.
+        Related rows are aggregated into JSON by correlated subqueries.
+
+        :return: Row containing the Entry, its Slovene counterpart (if any) and the "suggestions", "translation",
+            "translation_state", "links", "related_entries" and "categories" JSON columns, or None if not found.
+        """
+        related = aliased(Entry)
+
+        suggestions = select(_json_list(_entry_json(related), related.id)) \
+            .where(Suggestion.parent == Entry.id, related.id == Suggestion.child)
+        translation = select(_entry_json(related)) \
+            .where(Translation.parent == Entry.id, related.id == Translation.child) \
+            .limit(1)
+        translation_state = select(_json_object(id=TranslationState.id, label=TranslationState.label)) \
+            .where(Translation.parent == Entry.id, TranslationState.id == Translation.state) \
+            .limit(1)
+        links = select(_json_list(_json_object(id=Link.id, title=Link.title, url=Link.url), Link.id)) \
+            .where(Link.entry_id == Entry.id)
+        related_entries = select(_json_list(_json_object(id=related.id, lemma=related.lemma, created=related.created,
+                                                         edited=related.modified), related.id)) \
+            .where(Relation.entry1 == Entry.id, related.id == Relation.entry2)
+        categories = select(_json_list(_json_object(id=Category.id, name=Category.name,
+                                                    description=Category.description), Category.id)) \
+            .where(CategoryToEntry.entry_id == Entry.id, Category.id == CategoryToEntry.category_id)
+
+        stmt = select(
+            Entry,
+            Slovene,
+            *[subquery.scalar_subquery().label(name) for name, subquery in (
+                ('suggestions', suggestions),
+                ('translation', translation),
+                ('translation_state', translation_state),
+                ('links', links),
+                ('related_entries', related_entries),
+                ('categories', categories)
+            )]
+        ).outerjoin(Slovene, Slovene.id == Entry.id).where(Entry.id == entry_id)
+        result = await db_session.execute(stmt)
 
-        stmt = select(Entry)
+        row = result.first()
+        if not row:
+            return None
 
-        sort_list = []
-        if "-lemma" in sort:
-            sort_list.append(desc("lemma"))
-        elif "lemma" in sort:
-            sort_list.append("lemma")
-        if "-description" in sort:
-            sort_list.append(desc("description"))
-        elif "description" in sort:
-            sort_list.append("description")
-        if "-language" in sort:
-            sort_list.append(desc("language"))
-        elif "language" in sort:
-            sort_list.append("language")
-        stmt = stmt.order_by(*sort_list)
-        stmt = stmt.offset(offset).limit(limit)
+        if row.Entry.language == 'sl' and row.Slovene:
+            row.Entry.extra_data = {
+                "alternative_form": row.Slovene.alt_form
+            }
+        return row
 
+    @staticmethod
+    async def retrieve_version(entry_id: int, db_session: Session) -> Optional[int]:
+        stmt = select(Entry.version).where(Entry.id == entry_id)
         result = await db_session.execute(stmt)
+        return result.scalar()
+
+    @staticmethod
+    async def bump_versions(entry_ids: List[int], db_session: Session):
+        """
+        Give the entries new versions, without touching their modification time.
+        """
+        # Lock in ID order, so concurrent bumps of overlapping entries can't deadlock
+        locked = select(Entry.id).where(Entry.id.in_(entry_ids)).order_by(Entry.id).with_for_update()
+        stmt = update(Entry) \
+            .where(Entry.id.in_(locked.scalar_subquery())) \
+            .values(version=ENTRY_VERSION_SEQUENCE.next_value(), modified=Entry.modified) \
+            .execution_options(synchronize_session=False)
+        await db_session.execute(stmt)
 
-        entries = result.scalars().all()
-        return entries, count
+    @staticmethod
+    async def retrieve_referrer_ids(entry_id: int, db_session: Session) -> List[int]:
+        """
+        IDs of entries whose details show this entry (as a suggestion, translation or related entry).
+        """
+        stmt = select(Suggestion.parent).where(Suggestion.child == entry_id) \
+            .union(select(Translation.parent).where(Translation.child == entry_id),
+                   select(Relation.entry1).where(Relation.entry2 == entry_id))
+        result = await db_session.execute(stmt)
+        return result.scalars().all()
 
     @staticmethod
-    async def retrieve_by_category(filters: dict, category_id: int, db_session: Session) -> (List['Entry'], int):
+    async def retrieve_by_ids(entry_ids: List[int], db_session: Session) -> List[tuple]:
+        """
+        Load several entries at once, in no particular order.
+
+        :return: List of (Entry, Slovene or None) rows.
+        """
+        stmt = select(Entry, Slovene).outerjoin(Slovene, Slovene.id == Entry.id).where(Entry.id.in_(entry_ids))
+        result = await db_session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    def listing_columns() -> list:
+        """
+        Columns of listed entries. Selected instead of the model, they load as plain rows with the same attributes
+        (apart from extra_data, which listings don't fill in anyway), without building ORM instances
+        or filling the identity map.
+        """
+        return [Entry.id, Entry.lemma, Entry.description, Entry.language, Entry.created, Entry.modified,
+                Entry.version]
+
+    @staticmethod
+    def sort_keys(sort: str) -> List[dd.SortKey]:
+        return dd.parse_sort(sort, [
+            dd.SortKey('lemma', Entry.lemma, nullable=True),
+            dd.SortKey('description', Entry.description, nullable=True),
+            dd.SortKey('language', Entry.language, nullable=True)
+        ], dd.SortKey('id', Entry.id))
+
+    @staticmethod
+    async def retrieve_all(filters: dict, db_session: Session) -> dd.Page:
         offset: int = filters.get('offset', 0)
         limit: int = filters.get('limit', LIMIT_SIZE)
-        sort: str = filters.get('sort', '')
+        keys = Entry.sort_keys(filters.get('sort', ''))
 
-        count_stmt = select(func.count(Entry.id)).where(CategoryToEntry.category_id == category_id,
-                                                        Entry == CategoryToEntry.entry_id)
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
+        count, strategy = await dd.count_rows(select(Entry.id), filters, db_session, 'entries')
 
-        stmt = select(Entry).where(CategoryToEntry.category_id == category_id,
-                                   Entry == CategoryToEntry.entry_id)
+        stmt = dd.paginate(select(*Entry.listing_columns()), keys, filters.get('cursor'), offset, limit)
+        result = await db_session.execute(stmt)
+
+        entries, next_cursor = dd.trim_page(result.all(), keys, limit)
+        return dd.Page(entries, count, next_cursor, strategy, next_cursor is not None)
+
+    @staticmethod
+    async def retrieve_by_category(filters: dict, category_id: int, db_session: Session) -> dd.Page:
+        offset: int = filters.get('offset', 0)
+        limit: int = filters.get('limit', LIMIT_SIZE)
+        keys = Entry.sort_keys(filters.get('sort', ''))
+        conditions = [CategoryToEntry.category_id == category_id,
+                      Entry.id == CategoryToEntry.entry_id]
 
-        sort_list = []
-        if "-lemma" in sort:
-            sort_list.append(desc("lemma"))
-        elif "lemma" in sort:
-            sort_list.append("lemma")
-        if "-description" in sort:
-            sort_list.append(desc("description"))
-        elif "description" in sort:
-            sort_list.append("description")
-        if "-language" in sort:
-            sort_list.append(desc("language"))
-        elif "language" in sort:
-            sort_list.append("language")
-        stmt = stmt.order_by(*sort_list)
-        stmt = stmt.offset(offset).limit(limit)
+        count, strategy = await dd.count_rows(select(Entry.id).where(*conditions), filters, db_session, 'entries')
 
+        stmt = dd.paginate(select(*Entry.listing_columns()).where(*conditions), keys, filters.get('cursor'),
+                           offset, limit)
         result = await db_session.execute(stmt)
 
-        entries = result.scalars().all()
-        return entries, count
+        entries, next_cursor = dd.trim_page(result.all(), keys, limit)
+        return dd.Page(entries, count, next_cursor, strategy, next_cursor is not None)
+
+    @staticmethod
+    def latest_keys() -> List[dd.SortKey]:
+        return [dd.SortKey('changed', func.coalesce(Entry.modified, Entry.created), descending=True),
+                dd.SortKey('id', Entry.id, descending=True)]
 
     @staticmethod
-    async def retrieve_n_latest(n: int, db_session: Session) -> List['Entry']:
-        stmt = select(Entry).order_by(Entry.modified, Entry.created).limit(n)
+    async def retrieve_latest(filters: dict, db_session: Session) -> dd.Page:
+        """
+        Entries from the most recently created or modified on (served by the ix_entries_changed index).
+        Paginated by cursor only, without a count.
+        """
+        limit: int = filters.get('limit', LIMIT_SIZE)
+        keys = Entry.latest_keys()
+
+        conditions = []
+        if filters.get('language'):
+            conditions.append(Entry.language == filters['language'])
+
+        stmt = dd.paginate(select(*Entry.listing_columns()).where(*conditions), keys, filters.get('cursor'),
+                           None, limit)
         result = await db_session.execute(stmt)
-        entries = result.scalars().all()
-        return entries
+
+        entries, next_cursor = dd.trim_page(result.all(), keys, limit,
+                                            lambda entry: [entry.modified or entry.created, entry.id])
+        return dd.Page(entries, None, next_cursor, "none", next_cursor is not None)
+
+    @staticmethod
+    async def simple_search_all(query: str, filters: dict, db_session: Session) -> dd.Page:
+        return await Entry.simple_search_lang(query, None, filters, db_session)
 
     @staticmethod
-    async def simple_search_all(query: str, filters: dict, db_session: Session) -> (List['Entry'], int):
+    async def simple_search_lang(query: str, lang: Optional[str], filters: dict, db_session: Session) -> dd.Page:
         offset: int = filters.get('offset', 0)
         limit: int = filters.get('limit', LIMIT_SIZE)
+        keys = [dd.SortKey('id', Entry.id)]
         query = f"%{query}%"
 
-        count_stmt = select(func.count(Entry.id)).where(Entry.lemma.like(query))
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
+        conditions = [Entry.lemma.like(query)]
+        if lang:
+            conditions.append(Entry.language == lang)
+
+        count, strategy = await dd.count_rows(select(Entry.id).where(*conditions), filters, db_session, 'entries')
 
-        stmt = select(Entry).where(Entry.lemma.like(query)).offset(offset).limit(limit)
+        stmt = dd.paginate(select(*Entry.listing_columns()).where(*conditions), keys, filters.get('cursor'),
+                           offset, limit)
         result = await db_session.execute(stmt)
-        entries = result.scalars().all()
-        return entries, count
+
+        entries, next_cursor = dd.trim_page(result.all(), keys, limit)
+        return dd.Page(entries, count, next_cursor, strategy, next_cursor is not None)
 
     @staticmethod
-    async def simple_search_lang(query: str, lang: str, filters: dict, db_session: Session) -> (List['Entry'], int):
+    async def fuzzy_search(query: str, lang: Optional[str], threshold: float,
+                           filters: dict, db_session: Session) -> dd.Page:
         offset: int = filters.get('offset', 0)
         limit: int = filters.get('limit', LIMIT_SIZE)
-        query = f"%{query}%"
 
-        count_stmt = select(func.count(Entry.id)).where(and_(Entry.lemma.like(query),
-                                                             Entry.language == lang))
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
+        # The % operator compares against this setting, which lets the trigram index do the filtering
+        threshold_stmt = select(func.set_config('pg_trgm.similarity_threshold', str(threshold), True))
+        await db_session.execute(threshold_stmt)
+
+        conditions = [Entry.lemma.op('%')(query)]
+        if lang:
+            conditions.append(Entry.language == lang)
 
-        stmt = select(Entry).where(and_(Entry.language == lang,
-                                        Entry.lemma.like(query))).offset(offset).limit(limit)
+        count, strategy = await dd.count_rows(select(Entry.id).where(*conditions), filters, db_session, 'entries',
+                                              cache_key=(threshold,))
+
+        similarity = func.similarity(Entry.lemma, query)
+        keys = [dd.SortKey('similarity', similarity, descending=True), dd.SortKey('id', Entry.id)]
+        stmt = dd.paginate(select(*Entry.listing_columns(), similarity.label('similarity')).where(*conditions),
+                           keys, filters.get('cursor'), offset, limit)
         result = await db_session.execute(stmt)
-        entries = result.scalars().all()
-        return entries, count
+
+        entries, next_cursor = dd.trim_page(result.all(), keys, limit)
+        return dd.Page(entries, count, next_cursor, strategy, next_cursor is not None)
 
     @staticmethod
-    async def full_search_lang(query: str, lang: str, filters: dict, db_session: Session) -> (List['EntryPair'], int):
+    async def text_search(query: str, lang: Optional[str], filters: dict, db_session: Session) -> dd.Page:
+        """
+        Full-text search over lemma and description, ranked with ts_rank.
+
+        :return: A page of entry rows (see listing_columns()) with the rank, lemma headline and description headline.
+        """
         offset: int = filters.get('offset', 0)
         limit: int = filters.get('limit', LIMIT_SIZE)
+
+        if lang in TEXT_SEARCH_CONFIGS:
+            config = _regconfig(TEXT_SEARCH_CONFIGS[lang])
+            ts_query = func.websearch_to_tsquery(config, query)
+            condition = and_(Entry.language == lang, Entry.search_vector.op('@@')(ts_query))
+        else:
+            # One branch per configuration keeps every branch usable by the GIN index
+            branches = [and_(Entry.language == language,
+                             Entry.search_vector.op('@@')(func.websearch_to_tsquery(_regconfig(config_name), query)))
+                        for language, config_name in TEXT_SEARCH_CONFIGS.items()]
+            default_query = func.websearch_to_tsquery(_regconfig(DEFAULT_TEXT_SEARCH_CONFIG), query)
+            branches.append(and_(or_(Entry.language.is_(None), Entry.language.notin_(list(TEXT_SEARCH_CONFIGS))),
+                                 Entry.search_vector.op('@@')(default_query)))
+            condition = or_(*branches)
+
+            config = _language_regconfig(Entry.language)
+            ts_query = func.websearch_to_tsquery(config, query)
+
+        count, strategy = await dd.count_rows(select(Entry.id).where(condition), filters, db_session, 'entries')
+
+        rank = func.ts_rank(Entry.search_vector, ts_query)
+        keys = [dd.SortKey('rank', rank, descending=True), dd.SortKey('id', Entry.id)]
+        stmt = select(
+            *Entry.listing_columns(),
+            rank.label('rank'),
+            func.ts_headline(config, Entry.lemma, ts_query, 'HighlightAll=true').label('lemma_headline'),
+            func.ts_headline(config, func.coalesce(Entry.description, ''), ts_query).label('description_headline')
+        ).where(condition)
+        stmt = dd.paginate(stmt, keys, filters.get('cursor'), offset, limit)
+        result = await db_session.execute(stmt)
+
+        rows, next_cursor = dd.trim_page(result.all(), keys, limit)
+        return dd.Page(rows, count, next_cursor, strategy, next_cursor is not None)
+
+    @staticmethod
+    async def full_search_lang(query: str, lang: str, filters: dict, db_session: Session) -> dd.Page:
+        offset: int = filters.get('offset', 0)
+        limit: int = filters.get('limit', LIMIT_SIZE)
+        keys = [dd.SortKey('id', TranslationPair.id)]
         query = f"%{query}%"
 
         if lang == 'sl':
-            stmt = text("""SELECT e1.id, e1.lemma, e1.description, e1.language, e1.created, e1.modified, e2.id, e2.lemma, e2.description, e2.language, e2.created, e2.modified
-                        FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                        FULL OUTER JOIN entries e2 ON t.child = e2.id
-                        WHERE (e1.language = 'en' OR e2.language = 'sl')
-                        AND (e2.lemma LIKE :query)
-                        OFFSET :offset LIMIT :limit""")
-            count_stmt = text("""SELECT COUNT(*)
-                                FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                                FULL OUTER JOIN entries e2 ON t.child = e2.id
-                                WHERE (e1.language = 'en' OR e2.language = 'sl')
-                                AND (e2.lemma LIKE :query)""")
+            condition = TranslationPair.slovene_lemma.like(query)
         elif lang == 'en':
-            stmt = text("""SELECT e1.id, e1.lemma, e1.description, e1.language, e1.created, e1.modified, e2.id, e2.lemma, e2.description, e2.language, e2.created, e2.modified
-                        FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                        FULL OUTER JOIN entries e2 ON t.child = e2.id
-                        WHERE (e1.language = 'en' OR e2.language = 'sl')
-                        AND (e1.lemma LIKE :query)
-                        OFFSET :offset LIMIT :limit""")
-            count_stmt = text("""SELECT COUNT(*)
-                                FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                                FULL OUTER JOIN entries e2 ON t.child = e2.id
-                                WHERE (e1.language = 'en' OR e2.language = 'sl')
-                                AND (e1.lemma LIKE :query)""")
+            condition = TranslationPair.english_lemma.like(query)
         else:
-            stmt = text("""SELECT e1.id, e1.lemma, e1.description, e1.language, e1.created, e1.modified, e2.id, e2.lemma, e2.description, e2.language, e2.created, e2.modified
-                        FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                        FULL OUTER JOIN entries e2 ON t.child = e2.id
-                        WHERE (e1.language = 'en' OR e2.language = 'sl')
-                        AND (e1.lemma LIKE :query OR e2.lemma LIKE :query)
-                        OFFSET :offset LIMIT :limit""")
-            count_stmt = text("""SELECT COUNT(*)
-                                FROM entries e1 FULL OUTER JOIN translations t ON e1.id = t.parent AND e1.language = 'en'
-                                FULL OUTER JOIN entries e2 ON t.child = e2.id
-                                WHERE (e1.language = 'en' OR e2.language = 'sl')
-                                AND (e1.lemma LIKE '%%' OR e2.lemma LIKE '%%')""")
-
-        count_result = await db_session.execute(count_stmt, {"query": query})
-        count: int = count_result.scalar()
-
-        result = await db_session.execute(stmt, {"query": query,
-                                                 "offset": offset,
-                                                 "limit": limit})
-        entries = result.all()
-        return EntryPair.from_row_list(entries), count
+            condition = or_(TranslationPair.english_lemma.like(query),
+                            TranslationPair.slovene_lemma.like(query))
+
+        count, strategy = await dd.count_rows(select(TranslationPair.id).where(condition), filters, db_session,
+                                              'entries')
+
+        stmt = TranslationPair.select_entries().add_columns(TranslationPair.id.label('pair_id')).where(condition)
+        stmt = dd.paginate(stmt, keys, filters.get('cursor'), offset, limit)
+        result = await db_session.execute(stmt)
+
+        rows, next_cursor = dd.trim_page(result.all(), keys, limit, lambda row: [row.pair_id])
+        return dd.Page(EntryPair.from_row_list(rows), count, next_cursor, strategy, next_cursor is not None)
 
 
 class Link(Base):
@@ -257,7 +497,7 @@ class Link(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=True)
     url = Column(String, index=True)
-    entry_id = Column(Integer, ForeignKey('entries.id'))
+    entry_id = Column(Integer, ForeignKey('entries.id'), index=True)
 
     async def save(self, db_session: Session):
         stmt = insert(Link).values(
@@ -273,9 +513,13 @@ class Link(Base):
         pass
 
     @staticmethod
-    async def delete(link_id: int, db_session: Session):
-        stmt = delete(Link).where(Link.id == link_id)
-        await db_session.execute(stmt)
+    async def delete(link_id: int, db_session: Session) -> Optional[int]:
+        """
+        :return: ID of the entry the link belonged to (None if there was no such link).
+        """
+        stmt = delete(Link).where(Link.id == link_id).returning(Link.entry_id)
+        result = await db_session.execute(stmt)
+        return result.scalar()
 
     @staticmethod
     async def retrieve_by_entry(entry_id: int, db_session: Session) -> List['Link']:
@@ -285,6 +529,14 @@ class Link(Base):
         links: List[Link] = result.scalars().all()
         return links
 
+    @staticmethod
+    async def retrieve_by_entries(entry_ids: List[int], db_session: Session) -> List['Link']:
+        stmt = select(Link).where(Link.entry_id.in_(entry_ids)).order_by(Link.id)
+        result = await db_session.execute(stmt)
+
+        links: List[Link] = result.scalars().all()
+        return links
+
     @staticmethod
     async def retrieve_by_id(link_id: int, db_session: Session) -> Optional['Link']:
         stmt = select(Link).where(Link.id == link_id)
@@ -337,6 +589,23 @@ class Category(Base):
         categories: List[Category] = result.scalars().all()
         return categories
 
+    @staticmethod
+    async def retrieve_by_entries(entry_ids: List[int], db_session: Session) -> List[tuple]:
+        """
+        :return: List of (entry ID, Category) rows.
+        """
+        stmt = select(CategoryToEntry.entry_id, Category) \
+            .where(CategoryToEntry.entry_id.in_(entry_ids), Category.id == CategoryToEntry.category_id) \
+            .order_by(Category.id)
+        result = await db_session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def retrieve_entry_ids(category_id: int, db_session: Session) -> List[int]:
+        stmt = select(CategoryToEntry.entry_id).where(CategoryToEntry.category_id == category_id)
+        result = await db_session.execute(stmt)
+        return result.scalars().all()
+
     @staticmethod
     async def bind_to_entry(entry_id: int, category_id: int, db_session: Session):
         stmt = insert(CategoryToEntry).values(
@@ -362,28 +631,20 @@ class Category(Base):
         return category
 
     @staticmethod
-    async def retrieve_all(filters: dict, db_session: Session) -> (List['Category'], int):
+    async def retrieve_all(filters: dict, db_session: Session) -> dd.Page:
         offset: int = filters.get('offset', 0)
         limit: int = filters.get('limit', LIMIT_SIZE)
-        sort: str = filters.get('sort', '')
-
-        count_stmt = select(func.count(Category.id))
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
-
-        stmt = select(Category)
+        keys = dd.parse_sort(filters.get('sort', ''), [
+            dd.SortKey('name', Category.name)
+        ], dd.SortKey('id', Category.id))
 
-        sort_list = []
-        if "-name" in sort:
-            sort_list.append(desc("name"))
-        elif "name" in sort:
-            sort_list.append("name")
-        stmt = stmt.order_by(*sort_list)
-        stmt = stmt.offset(offset).limit(limit)
+        count, strategy = await dd.count_rows(select(Category.id), filters, db_session, 'categories')
 
+        stmt = dd.paginate(select(Category), keys, filters.get('cursor'), offset, limit)
         result = await db_session.execute(stmt)
-        entries: List[Category] = result.scalars().all()
-        return entries, count
+
+        categories, next_cursor = dd.trim_page(result.scalars().all(), keys, limit)
+        return dd.Page(categories, count, next_cursor, strategy, next_cursor is not None)
 
 
 class Slovene(Base):
@@ -461,7 +722,7 @@ class Suggestion(Base):
     parent = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
                     primary_key=True)
     child = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
-                   primary_key=True)
+                   primary_key=True, index=True)
 
     @staticmethod
     async def save(parent_id: int, child_id: int, db_session: Session):
@@ -485,6 +746,17 @@ class Suggestion(Base):
         entries: List[Entry] = result.scalars().all()
         return entries
 
+    @staticmethod
+    async def retrieve_by_parents(parent_ids: List[int], db_session: Session) -> List[tuple]:
+        """
+        :return: List of (parent ID, suggested Entry) rows.
+        """
+        stmt = select(Suggestion.parent, Entry) \
+            .where(Suggestion.parent.in_(parent_ids), Entry.id == Suggestion.child) \
+            .order_by(Entry.id)
+        result = await db_session.execute(stmt)
+        return result.all()
+
     @staticmethod
     async def retrieve_by_child(entry_id: int, db_session: Session) -> List['Entry']:
         stmt = select(Entry).filter(Suggestion.child == entry_id, Entry.id == Suggestion.parent)
@@ -500,9 +772,9 @@ class Translation(Base):
     parent = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
                     primary_key=True)
     child = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
-                   primary_key=True)
+                   primary_key=True, index=True)
     state = Column(Integer, ForeignKey('translation_states.id',
-                                       ondelete="SET NULL"))
+                                       ondelete="SET NULL"), index=True)
 
     @staticmethod
     async def save(parent_id: int, child_id: int, state_id: Optional[int], db_session: Session):
@@ -544,6 +816,24 @@ class Translation(Base):
 
         return entry, state
 
+    @staticmethod
+    async def retrieve_by_parents(parent_ids: List[int], db_session: Session) -> List[tuple]:
+        """
+        :return: List of (parent ID, translation Entry, TranslationState or None) rows.
+        """
+        stmt = select(Translation.parent, Entry, TranslationState) \
+            .join(Entry, Entry.id == Translation.child) \
+            .outerjoin(TranslationState, TranslationState.id == Translation.state) \
+            .where(Translation.parent.in_(parent_ids))
+        result = await db_session.execute(stmt)
+        return result.all()
+
+    @staticmethod
+    async def retrieve_parent_ids_by_state(state_id: int, db_session: Session) -> List[int]:
+        stmt = select(Translation.parent).where(Translation.state == state_id)
+        result = await db_session.execute(stmt)
+        return result.scalars().all()
+
     @staticmethod
     async def retrieve_by_child(child_id: int, db_session: Session) -> List['Entry']:
         stmt = select(Entry).filter(Translation.child == child_id, Entry.id == Translation.parent)
@@ -615,7 +905,7 @@ class Relation(Base):
     entry1 = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
                     primary_key=True)
     entry2 = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
-                    primary_key=True)
+                    primary_key=True, index=True)
 
     @staticmethod
     async def save(entry1, entry2, db_session: Session):
@@ -638,6 +928,17 @@ class Relation(Base):
         entries: List[Entry] = result.scalars().all()
         return entries
 
+    @staticmethod
+    async def retrieve_by_entries1(entry1_ids: List[int], db_session: Session) -> List[tuple]:
+        """
+        :return: List of (entry1 ID, related Entry) rows.
+        """
+        stmt = select(Relation.entry1, Entry) \
+            .where(Relation.entry1.in_(entry1_ids), Relation.entry2 == Entry.id) \
+            .order_by(Entry.id)
+        result = await db_session.execute(stmt)
+        return result.all()
+
     @staticmethod
     async def retrieve_by_entry2(entry2: int, db_session: Session) -> List['Entry']:
         stmt = select(Entry).filter(Relation.entry2 == entry2, Relation.entry1 == Entry.id)
@@ -653,44 +954,393 @@ class CategoryToEntry(Base):
     entry_id = Column(Integer, ForeignKey('entries.id', ondelete="CASCADE"),
                       primary_key=True)
     category_id = Column(Integer, ForeignKey('categories.id', ondelete="CASCADE"),
-                         primary_key=True)
+                         primary_key=True, index=True)
 
 
 class Event(Base):
+    """
+    Audit log, written in batches by core.audit.AuditWriter. The table is partitioned by month
+    (events_YYYY_MM), so old events are removed by dropping a whole partition.
+    """
     __tablename__ = "events"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     table = Column(String)
     action = Column(String)
     record_id = Column(Integer)
     user_id = Column(Integer)
     username = Column(String)
-    time = Column(DateTime, server_default=func.now())
+    details = Column(JSON, nullable=True)
+    # UTC, like the times core.audit.record() stamps
+    time = Column(DateTime, primary_key=True, server_default=func.timezone('utc', func.now()))
 
-    async def save(self, db_session: Session):
-        stmt = insert(Event).values(
-            table=self.table,
-            action=self.action,
-            record_id=self.record_id,
-            user_id=self.user_id,
-            username=self.username
-        )
-        await db_session.execute(stmt)
+    __table_args__ = (
+        Index('ix_events_table_record_id_time', 'table', 'record_id', 'time'),
+        Index('ix_events_user_id_time', 'user_id', 'time'),
+        {'postgresql_partition_by': 'RANGE (time)'}
+    )
+
+    FEED_KEYS = [dd.SortKey('time', time, descending=True), dd.SortKey('id', id, descending=True)]
 
     @staticmethod
-    async def retrieve_all(filters: dict, db_session: Session) -> (List['Event'], int):
-        count_stmt = select([func.count]).select_from(Event)
-        count_result = await db_session.execute(count_stmt)
-        count = count_result.scalar()
+    def partition_name(month: datetime.date) -> str:
+        return f"events_{month:%Y_%m}"
 
-        offset: int = filters.get('offset', 0)
+    @staticmethod
+    async def save_all(events: List[dict], db_session: Session):
+        """
+        Insert events (dictionaries of column values) with one multi-row INSERT.
+        """
+        await db_session.execute(insert(Event).values(events))
+
+    @staticmethod
+    async def create_partition(month: datetime.date, db_session: Session):
+        """
+        Create the partition holding the events of a month (starting on the given date), if it doesn't exist yet.
+        """
+        next_month = datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+        await db_session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {Event.partition_name(month)} PARTITION OF events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        ))
+
+    @staticmethod
+    async def drop_partitions_before(month: datetime.date, db_session: Session) -> List[str]:
+        """
+        Drop the partitions of the months before the given one.
+
+        :return: Names of the dropped partitions.
+        """
+        stmt = text("SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'events'::regclass")
+        result = await db_session.execute(stmt)
+        oldest = Event.partition_name(month)
+        # events_YYYY_MM names sort in month order
+        expired = [name for name in result.scalars().all()
+                   if len(name) == len(oldest) and name < oldest]
+        for name in expired:
+            await db_session.execute(text(f"DROP TABLE {name}"))
+        return expired
+
+    @staticmethod
+    async def retrieve_all(filters: dict, db_session: Session) -> dd.Page:
+        """
+        Events from the newest on, optionally only those of a table, record and/or user.
+        Paginated by cursor only, the log is too large to count or skip through.
+        """
         limit: int = filters.get('limit', LIMIT_SIZE)
 
-        stmt = select(Entry).order_by("time").offset(offset).limit(limit)
+        conditions = []
+        if filters.get('table') is not None:
+            conditions.append(Event.table == filters['table'])
+        if filters.get('record_id') is not None:
+            conditions.append(Event.record_id == filters['record_id'])
+        if filters.get('user_id') is not None:
+            conditions.append(Event.user_id == filters['user_id'])
+
+        stmt = dd.paginate(select(Event).where(*conditions), Event.FEED_KEYS, filters.get('cursor'), None, limit)
+        result = await db_session.execute(stmt)
+
+        events, next_cursor = dd.trim_page(result.scalars().all(), Event.FEED_KEYS, limit)
+        return dd.Page(events, None, next_cursor, "none", next_cursor is not None)
+
+
+class EntryChange(Base):
+    """
+    Log of created, updated and deleted entries, written by database triggers on entries
+    (see the "Entry change log" migration), read-only from here.
+    """
+    __tablename__ = "entry_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    # Transaction that made the change, used to return changes only once their transaction has ended
+    txid = Column(BigInteger, server_default=text("txid_current()"), nullable=False)
+    entry_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    changed = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_entry_changes_txid_id', 'txid', 'id'),
+    )
 
+    @staticmethod
+    async def retrieve_horizon(db_session: Session) -> int:
+        """
+        Oldest transaction still in progress. All changes made by earlier transactions are visible.
+        """
+        result = await db_session.execute(select(func.txid_snapshot_xmin(func.txid_current_snapshot())))
+        return result.scalar()
+
+    @staticmethod
+    async def retrieve_since(position: tuple, horizon: int, limit: int, db_session: Session) -> List['EntryChange']:
+        """
+        Changes after a (txid, id) position, made by transactions older than the horizon,
+        in (txid, id) order.
+        """
+        after = tuple_(*[literal(value, BigInteger) for value in position])
+        stmt = select(EntryChange) \
+            .where(tuple_(EntryChange.txid, EntryChange.id) > after,
+                   EntryChange.txid < horizon) \
+            .order_by(EntryChange.txid, EntryChange.id) \
+            .limit(limit)
         result = await db_session.execute(stmt)
-        entries = result.scalars().all()
-        return entries, count
+        return result.scalars().all()
+
+
+class TranslationPair(Base):
+    """
+    Precomputed English-Slovene pairs, one row per translation, English entry without a translation
+    and Slovene entry without an English original. Maintained by database triggers on
+    entries and translations (see the "Translation pairs" migration), read-only from here.
+    """
+    __tablename__ = "translation_pairs"
+
+    id = Column(Integer, primary_key=True)
+    english_id = Column(Integer, index=True, nullable=True)
+    slovene_id = Column(Integer, index=True, nullable=True)
+    english_lemma = Column(String, nullable=True)
+    slovene_lemma = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index('ix_translation_pairs_english_lemma_trgm', 'english_lemma',
+              postgresql_using='gin', postgresql_ops={'english_lemma': 'gin_trgm_ops'}),
+        Index('ix_translation_pairs_slovene_lemma_trgm', 'slovene_lemma',
+              postgresql_using='gin', postgresql_ops={'slovene_lemma': 'gin_trgm_ops'}),
+    )
+
+    @staticmethod
+    def select_entries():
+        """
+        Select both entries of each pair, in the row layout expected by EntryPair.from_row.
+        """
+        english = aliased(Entry)
+        slovene = aliased(Entry)
+        return select(english.id, english.lemma, english.description, english.language,
+                      english.created, english.modified,
+                      slovene.id, slovene.lemma, slovene.description, slovene.language,
+                      slovene.created, slovene.modified) \
+            .select_from(TranslationPair) \
+            .outerjoin(english, english.id == TranslationPair.english_id) \
+            .outerjoin(slovene, slovene.id == TranslationPair.slovene_id)
+
+
+# Staging tables of EntryImport. Temporary, so kept out of the models' metadata (and migrations).
+_import_metadata = MetaData()
+
+entry_import_table = Table(
+    "entry_import", _import_metadata,
+    Column("line", Integer, primary_key=True, autoincrement=False),
+    Column("lemma", String, nullable=False),
+    Column("description", String),
+    Column("language", String),
+    Column("alt_form", String),
+    Column("categories", ARRAY(String), nullable=False),
+    Column("translations", ARRAY(String), nullable=False),
+    Column("translation_state", String),
+    # Filled in while importing: ID of the new entry, or why the row was rejected
+    Column("entry_id", Integer),
+    Column("error", String),
+    Index("ix_entry_import_lemma", "lemma", "language"),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP"
+)
+
+entry_import_translation_table = Table(
+    "entry_import_translation", _import_metadata,
+    Column("parent", Integer, primary_key=True, autoincrement=False),
+    Column("child", Integer, nullable=False),
+    Column("state", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP"
+)
+
+
+class EntryImport:
+    """
+    Set-based bulk import of entries. Rows are staged in a temporary table with COPY (see stage()),
+    checked and then inserted into the entry tables with one statement per table (see apply()).
+    The staging tables are dropped at the end of the transaction.
+    """
+    COLUMNS = ["line", "lemma", "description", "language", "alt_form", "categories", "translations",
+               "translation_state"]
+
+    @staticmethod
+    async def create_staging_tables(db_session: Session):
+        connection = await db_session.connection()
+        await connection.run_sync(_import_metadata.create_all)
+
+    @staticmethod
+    async def stage(records: List[tuple], db_session: Session):
+        """
+        Copy rows into the staging table.
+
+        :param records: Tuples with values of EntryImport.COLUMNS.
+        """
+        connection = await db_session.connection()
+        raw_connection = await connection.get_raw_connection()
+        # COPY isn't available through SQLAlchemy, use asyncpg directly (same connection and transaction)
+        await raw_connection.driver_connection.copy_records_to_table(
+            entry_import_table.name, records=records, columns=EntryImport.COLUMNS)
+
+    @staticmethod
+    async def apply(db_session: Session) -> (int, List[tuple], List[int]):
+        """
+        Import the staged rows. Rows referencing unknown categories, translation states or translation
+        targets are rejected, the rest are imported.
+
+        :return: Number of imported entries, (line, error) rows of rejected ones and IDs of existing entries
+            affected by new translations.
+        """
+        staged = entry_import_table
+        await db_session.execute(text(f"ANALYZE {staged.name}"))
+
+        category = func.unnest(staged.c.categories).table_valued("name").render_derived(name="category")
+        unknown_categories = select(staged.c.line, func.string_agg(category.c.name, ', ').label("names")) \
+            .select_from(staged.join(category, true())) \
+            .where(staged.c.error.is_(None), ~exists().where(Category.name == category.c.name)) \
+            .group_by(staged.c.line) \
+            .subquery()
+        await db_session.execute(
+            update(staged)
+            .values(error=func.concat("Unknown categories: ", unknown_categories.c.names))
+            .where(staged.c.line == unknown_categories.c.line))
+
+        await db_session.execute(
+            update(staged)
+            .values(error=func.concat("Unknown translation state: ", staged.c.translation_state))
+            .where(staged.c.error.is_(None), staged.c.translation_state.isnot(None),
+                   ~exists().where(TranslationState.label == staged.c.translation_state)))
+
+        # Take IDs up front, so translations between staged rows can be resolved before inserting them
+        await db_session.execute(
+            update(staged)
+            .values(entry_id=func.nextval(cast(func.pg_get_serial_sequence(Entry.__tablename__, 'id'), REGCLASS)))
+            .where(staged.c.error.is_(None)))
+
+        # A rejected row can't be a translation target, which may reject the rows translated to it, ...
+        while await EntryImport._reject_unresolved_translations(db_session):
+            pass
+
+        pairs = entry_import_translation_table
+        await db_session.execute(
+            insert(pairs).from_select(["parent", "child", "state"], EntryImport._select_translations()))
+
+        result = await db_session.execute(
+            insert(Entry).from_select(
+                ["id", "lemma", "description", "language"],
+                select(staged.c.entry_id, staged.c.lemma, staged.c.description, staged.c.language)
+                .where(staged.c.error.is_(None))
+                .order_by(staged.c.line)))
+        imported = result.rowcount
+
+        await db_session.execute(
+            insert(Slovene).from_select(
+                ["id", "alt_form"],
+                select(staged.c.entry_id, staged.c.alt_form)
+                .where(staged.c.error.is_(None), staged.c.language == 'sl')))
+        await db_session.execute(
+            insert(English).from_select(
+                ["id"],
+                select(staged.c.entry_id).where(staged.c.error.is_(None), staged.c.language == 'en')))
+        await db_session.execute(
+            insert(CategoryToEntry).from_select(
+                ["entry_id", "category_id"],
+                select(staged.c.entry_id, Category.id).distinct()
+                .join(Category, Category.name == any_(staged.c.categories))
+                .where(staged.c.error.is_(None))))
+
+        # New translations replace the existing ones of their parents
+        result = await db_session.execute(
+            delete(Translation)
+            .where(Translation.parent.in_(select(pairs.c.parent)))
+            .returning(Translation.child)
+            .execution_options(synchronize_session=False))
+        affected_ids = set(result.scalars().all())
+        await db_session.execute(
+            insert(Translation).from_select(["parent", "child", "state"],
+                                            select(pairs.c.parent, pairs.c.child, pairs.c.state)))
+
+        pair_ids = union(select(pairs.c.parent.label("id")), select(pairs.c.child)).subquery()
+        result = await db_session.execute(
+            select(pair_ids.c.id).where(~exists().where(staged.c.entry_id == pair_ids.c.id)))
+        affected_ids.update(result.scalars().all())
+
+        result = await db_session.execute(
+            select(staged.c.line, staged.c.error).where(staged.c.error.isnot(None)).order_by(staged.c.line))
+        return imported, result.all(), sorted(affected_ids)
+
+    @staticmethod
+    def _translation_candidates():
+        """
+        Entries a translation can point to: existing and accepted staged English and Slovene entries.
+        """
+        staged = entry_import_table
+        return union_all(
+            select(Entry.id, Entry.lemma, Entry.language).where(Entry.language.in_(('en', 'sl'))),
+            select(staged.c.entry_id, staged.c.lemma, staged.c.language).where(staged.c.error.is_(None))
+        ).subquery("candidate")
+
+    @staticmethod
+    def _opposite_language(language):
+        return case((language == 'en', 'sl'), else_='en')
+
+    @staticmethod
+    async def _reject_unresolved_translations(db_session: Session) -> int:
+        """
+        Reject staged rows with translation targets that match no entry or more than one.
+
+        :return: Number of newly rejected rows.
+        """
+        row = entry_import_table.alias("row")
+        target = func.unnest(row.c.translations).table_valued("lemma").render_derived(name="target")
+        candidate = EntryImport._translation_candidates()
+        matches = select(func.count()) \
+            .where(candidate.c.lemma == target.c.lemma,
+                   candidate.c.language == EntryImport._opposite_language(row.c.language)) \
+            .scalar_subquery()
+        unresolved = select(row.c.line, matches.label("matches"), target.c.lemma) \
+            .select_from(row.join(target, true())) \
+            .where(row.c.error.is_(None)) \
+            .subquery()
+        described = func.concat(unresolved.c.lemma, ' (',
+                                case((unresolved.c.matches == 0, 'not found'),
+                                     else_=func.concat(unresolved.c.matches, ' matches')), ')')
+        rejected = select(unresolved.c.line, func.string_agg(described, ', ').label("targets")) \
+            .where(unresolved.c.matches != 1) \
+            .group_by(unresolved.c.line) \
+            .subquery()
+
+        staged = entry_import_table
+        result = await db_session.execute(
+            update(staged)
+            .values(error=func.concat("Unresolved translation targets: ", rejected.c.targets))
+            .where(staged.c.line == rejected.c.line))
+        return result.rowcount
+
+    @staticmethod
+    def _select_translations():
+        """
+        Translations (parent, child, state) of the accepted staged rows. An English entry has one translation,
+        when several rows set it, the last one wins (as if the rows were added one by one).
+        """
+        row = entry_import_table.alias("row")
+        target = func.unnest(row.c.translations).table_valued("lemma").render_derived(name="target")
+        candidate = EntryImport._translation_candidates()
+        parent = case((row.c.language == 'en', row.c.entry_id), else_=candidate.c.id)
+        child = case((row.c.language == 'en', candidate.c.id), else_=row.c.entry_id)
+        state = select(func.min(TranslationState.id)) \
+            .where(TranslationState.label == row.c.translation_state) \
+            .scalar_subquery()
+        translations = select(row.c.line, parent.label("parent"), child.label("child"), state.label("state")) \
+            .select_from(row.join(target, true())
+                         .join(candidate, and_(candidate.c.lemma == target.c.lemma,
+                                               candidate.c.language == EntryImport._opposite_language(
+                                                   row.c.language)))) \
+            .where(row.c.error.is_(None)) \
+            .subquery()
+        return select(translations.c.parent, translations.c.child, translations.c.state) \
+            .distinct(translations.c.parent) \
+            .order_by(translations.c.parent, translations.c.line.desc())
 
 
 class EntryPair:
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func, Boolean, ForeignKey, text
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -15,6 +15,8 @@ class User(Base):
     modified = Column(DateTime, onupdate=func.now(), nullable=True)
     last_active = Column(DateTime, server_default=func.now())
     is_active = Column(Boolean, default=False)
+    # Bumped whenever the user's permissions change (see UserDAL), access tokens carry the version they were issued for
+    roles_version = Column(BigInteger, server_default=text("0"), nullable=False)
     roles = relationship("Role", secondary="role_to_user",
                          back_populates="users")
 
@@ -55,6 +57,6 @@ class RoleToUser(Base):
     __tablename__ = "role_to_user"
 
     role_id = Column(Integer, ForeignKey("roles.id", ondelete="CASCADE"), primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
 
     __mapper__args = {"eager_defaults": True}
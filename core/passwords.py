@@ -0,0 +1,84 @@
+"""
+Password hashing and verification (bcrypt) on a dedicated thread pool.
+
+bcrypt is deliberately slow (a fraction of a second per call), so running it in a request handler would stall every
+other request of the worker. The pool runs at most `workers` hashes at once and queues at most `queue_size` more;
+anything beyond that is refused with 503 instead of piling up.
+"""
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from core.configuration import config
+from core.exceptions import GeneralBackendException
+from core.log import logger
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, workers: int, queue_size: int):
+        self.context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+        self.workers = workers
+        self.queue_size = queue_size
+
+        # Calls submitted and not finished yet (running or queued)
+        self.pending = 0
+        self.rejected = 0
+        # Verified against for users that don't exist, created on first use
+        self._dummy_hash: Optional[str] = None
+        # bcrypt releases the GIL, so threads hash in parallel
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+
+    async def _run(self, function, *args):
+        """
+        :raises GeneralBackendException: (503) If the pool and its queue are full.
+        """
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            if self.rejected % 100 == 1:
+                logger.warning(f"Password hashing saturated, {self.rejected} requests refused so far")
+            raise GeneralBackendException(503, "Too many password checks in progress, try again later")
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        future = self._executor.submit(function, *args)
+        # Counted until the hash is really done, even if the request waiting for it is cancelled
+        future.add_done_callback(lambda _future: self._finished(loop))
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, loop: asyncio.AbstractEventLoop):
+        # Called from the pool's thread
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._decrement_pending)
+
+    def _decrement_pending(self):
+        self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self._verify, plain_password, hashed_password)
+
+    async def verify_dummy(self, plain_password: str) -> bool:
+        """
+        Take as long as verify() does, for a user that doesn't exist, so the time a login takes doesn't tell
+        whether the username does. Always False.
+        """
+        if self._dummy_hash is None:
+            # Hashing costs the same as verifying
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+            return False
+        await self.verify(plain_password, self._dummy_hash)
+        return False
+
+    def _verify(self, plain_password: str, hashed_password: str) -> bool:
+        try:
+            return self.context.verify(plain_password, hashed_password)
+        except (ValueError, TypeError):
+            return False
+
+
+hasher = PasswordHasher(config.PASSWORDS.BCRYPT_ROUNDS, config.PASSWORDS.WORKERS, config.PASSWORDS.QUEUE_SIZE)
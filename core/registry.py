@@ -0,0 +1,196 @@
+"""
+Process-wide registries of small, rarely changed tables (roles and translation states), served from memory.
+
+The registries are loaded at startup and reloaded (on first use) after a change. A DAL changing one of the tables
+calls changed(), which invalidates the registry in this process and announces the change to the other processes
+with NOTIFY (delivered when the transaction commits). RegistryListener LISTENs for those announcements.
+Registries are also reloaded once they are older than "cache.registry_max_age", in case an announcement was missed.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from core.configuration import config
+from core.log import logger
+from core.models.database import read_only_session
+import core.models.dal_dependencies as dd
+import core.models.lex_model as models
+import core.models.users_model as um
+import core.schemas.lex_schema as schemas
+import core.schemas.users_schema as us
+
+CHANNEL = "kolomoni_registries"
+
+
+class Registry:
+    """
+    All rows of a table (as schemas with an "id"), ordered by ID.
+    """
+    def __init__(self, name: str, load: Callable[[AsyncSession], Awaitable[List[Any]]], max_age: float):
+        """
+        :param name: Name of the table, also announced to the other processes.
+        :param load: Loads the rows in the given session.
+        :param max_age: Seconds after which the rows are reloaded even if no change was announced, 0 for never.
+        """
+        self.name = name
+        self.max_age = max_age
+        self._load = load
+
+        self._items: Dict[int, Any] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self.loads = 0
+
+    @property
+    def stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.max_age > 0 and time.monotonic() - self._loaded_at > self.max_age
+
+    def invalidate(self):
+        self._generation += 1
+        self._loaded_at = None
+
+    async def refresh(self):
+        """
+        Load the rows from the primary (a replica might not have the latest change yet).
+        """
+        generation = self._generation
+        async with read_only_session() as session:
+            async with session.begin():
+                items = await self._load(session)
+
+        self._items = {item.id: item for item in items}
+        self.loads += 1
+        # Stays stale if it was invalidated while loading, the rows may be older than the change
+        if generation == self._generation:
+            self._loaded_at = time.monotonic()
+
+    async def _current(self) -> Dict[int, Any]:
+        if self.stale:
+            async with self._lock:
+                if self.stale:
+                    await self.refresh()
+        return self._items
+
+    async def all(self) -> List[Any]:
+        return list((await self._current()).values())
+
+    async def get(self, item_id: int) -> Optional[Any]:
+        return (await self._current()).get(item_id)
+
+    async def changed(self, db_session: AsyncSession):
+        """
+        Call after changing the table in the session. The registry is reloaded once the change is committed,
+        in this process and in the others.
+        """
+        await db_session.execute(text("SELECT pg_notify(:channel, :name)"), {"channel": CHANNEL, "name": self.name})
+        self.invalidate()
+
+        # Once more after the commit, in case it was reloaded (from the old rows) while the transaction was open
+        sync_session = db_session.sync_session
+        key = ("registry", self.name)
+        if not sync_session.info.get(key):
+            def after_commit(_session):
+                self.invalidate()
+                sync_session.info.pop(key, None)
+            event.listen(sync_session, "after_commit", after_commit, once=True)
+            sync_session.info[key] = True
+
+
+class RegistryListener:
+    """
+    Background task listening (on its own connection) for changes announced by other processes.
+    """
+    def __init__(self, registries: Dict[str, Registry], retry_interval: float = 5):
+        self.registries = registries
+        self.retry_interval = retry_interval
+
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _notified(self, _connection, _pid, _channel, name: str):
+        registry = self.registries.get(name)
+        if registry is not None:
+            registry.invalidate()
+
+    async def _run(self):
+        while True:
+            try:
+                connection = await asyncpg.connect(
+                    host=config.DATABASE.HOST, port=config.DATABASE.PORT, user=config.DATABASE.USER,
+                    password=config.DATABASE.PASSWORD, database=config.DATABASE.DATABASE_NAME)
+            except Exception as e:
+                logger.warning(f"Couldn't connect to listen for registry changes: {e!r}")
+                await asyncio.sleep(self.retry_interval)
+                continue
+
+            closed = asyncio.Event()
+            try:
+                connection.add_termination_listener(lambda _connection: closed.set())
+                await connection.add_listener(CHANNEL, self._notified)
+                # Anything announced while no one was listening was missed
+                for registry in self.registries.values():
+                    registry.invalidate()
+                await closed.wait()
+                logger.warning("Lost the connection listening for registry changes, reconnecting")
+            except Exception as e:
+                logger.warning(f"Couldn't listen for registry changes: {e!r}")
+            finally:
+                await asyncio.shield(connection.close(timeout=self.retry_interval))
+            await asyncio.sleep(self.retry_interval)
+
+
+async def _load_roles(db_session: AsyncSession) -> List[us.Role]:
+    result = await db_session.execute(select(um.Role).order_by(um.Role.id))
+    return [us.Role.from_model(role) for role in result.scalars()]
+
+
+async def _load_translation_states(db_session: AsyncSession) -> List[schemas.TranslationState]:
+    result = await db_session.execute(select(models.TranslationState).order_by(models.TranslationState.id))
+    return schemas.TranslationState.list_from_model(result.scalars().all())
+
+
+roles = Registry("roles", _load_roles, config.CACHE.REGISTRY_MAX_AGE)
+translation_states = Registry("translation_states", _load_translation_states, config.CACHE.REGISTRY_MAX_AGE)
+REGISTRIES: Dict[str, Registry] = {registry.name: registry for registry in (roles, translation_states)}
+
+listener = RegistryListener(REGISTRIES)
+
+
+async def load_all():
+    for registry in REGISTRIES.values():
+        await registry.refresh()
+
+
+def page(items: list, offset, limit, strategy: str) -> dd.Page:
+    """
+    Slice a page out of registry items, like OFFSET and LIMIT would (None for no offset or limit).
+    All the items are at hand, so they are counted exactly whichever strategy was requested, unless it is "none".
+    """
+    start = int(offset or 0)
+    content = items[start:start + int(limit)] if limit else items[start:]
+    has_more = start + len(content) < len(items)
+    if strategy == "none":
+        return dd.Page(content, None, None, "none", has_more)
+    return dd.Page(content, len(items), None, "exact", has_more)
@@ -0,0 +1,156 @@
+"""
+Routing of reads to the read-only replica (configured in "database.replica").
+
+GET requests are served from the replica while it is reachable and no further behind the primary than MAX_LAG.
+A client that changed something is pinned to the primary for READ_YOUR_WRITES seconds afterwards, so it doesn't
+read (from a lagging replica) data older than its own change: by a cookie, and in this process also by its
+Authorization header (or address), for clients that don't keep cookies.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.configuration import config
+from core.log import logger
+from core.models.database import async_session, read_only_session, replica_engine, replica_session
+
+READ_METHODS = ("GET", "HEAD")
+PIN_COOKIE = "kolomoni_primary_until"
+# Pins remembered in this process before expired ones are cleaned up
+_MAX_PINS = 10000
+
+# Seconds the replica is behind the primary: 0 when it isn't a standby at all, or when it streams from the primary
+# and has replayed everything it received. NULL when it isn't streaming (a standby that lost its upstream has
+# replayed everything it received too) or never replayed anything. Reading the WAL receiver's status takes
+# pg_read_all_stats (e.g. through pg_monitor), without it the status is NULL and the replica is never used.
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class ReplicaMonitor:
+    """
+    Background task checking the replica's lag every `interval` seconds.
+    The replica is only used while the last check succeeded, and isn't used at all while the monitor isn't running.
+    """
+    def __init__(self, max_lag: float, interval: float):
+        self.max_lag = max_lag
+        self.interval = interval
+
+        self.lag: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def usable(self) -> bool:
+        return self._task is not None and self.lag is not None and self.lag <= self.max_lag
+
+    def start(self):
+        if replica_engine is None or self._task is not None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.lag = None
+
+    async def check(self) -> Optional[float]:
+        async with replica_engine.connect() as connection:
+            lag = (await connection.execute(LAG_QUERY)).scalar()
+        return None if lag is None else float(lag)
+
+    async def _run(self):
+        while True:
+            was_usable = self.usable
+            try:
+                self.lag = await asyncio.wait_for(self.check(), timeout=max(self.interval, 1))
+            except Exception as e:
+                self.lag = None
+                if was_usable:
+                    logger.warning(f"Read replica unavailable, reading from the primary: {e!r}")
+            else:
+                if was_usable and self.lag is None:
+                    logger.warning("Read replica not streaming from the primary, reading from the primary")
+                elif was_usable and not self.usable:
+                    logger.warning(f"Read replica lagging ({self.lag}s behind), reading from the primary")
+                elif self.usable and not was_usable:
+                    logger.info("Reading from the replica")
+            await asyncio.sleep(self.interval)
+
+
+monitor = ReplicaMonitor(config.DATABASE_REPLICA.MAX_LAG, config.DATABASE_REPLICA.LAG_CHECK_INTERVAL)
+
+# Client key -> time.time() until which its reads go to the primary
+_pins: Dict[str, float] = {}
+
+
+def _client_key(request: Request) -> str:
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else ""
+
+
+def _is_pinned(request: Request, now: float) -> bool:
+    try:
+        if float(request.cookies.get(PIN_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    return _pins.get(_client_key(request), 0) > now
+
+
+def pin_to_primary(request: Request, response: Response):
+    """
+    Send the client's reads to the primary for the read-your-writes window, after it changed something.
+    """
+    window = config.DATABASE_REPLICA.READ_YOUR_WRITES
+    if window <= 0:
+        return
+    now = time.time()
+    if len(_pins) >= _MAX_PINS:
+        for key in [key for key, until in _pins.items() if until <= now]:
+            del _pins[key]
+    _pins[_client_key(request)] = now + window
+    response.set_cookie(PIN_COOKIE, f"{now + window:.3f}", max_age=int(window) + 1, httponly=True, samesite="lax")
+
+
+def writes(request: Request) -> bool:
+    """
+    Whether the request may change data: any but a reading method, and GET endpoints that change data anyway
+    (marked with v1.dependencies.writing_endpoint()).
+    """
+    return request.method not in READ_METHODS or getattr(request.state, "writes", False)
+
+
+def use_replica(request: Request) -> bool:
+    return not writes(request) and monitor.usable and not _is_pinned(request, time.time())
+
+
+def session_for(request: Request, primary_only: bool = False) -> AsyncSession:
+    """
+    New session for a request: on the replica if the request can be served from it, on the primary otherwise.
+    Sessions of requests that don't write run read-only transactions.
+
+    :param primary_only: Never use the replica (for data that has to be up to date with the primary).
+    """
+    if writes(request):
+        return async_session()
+    if not primary_only and use_replica(request):
+        return replica_session()
+    return read_only_session()
@@ -1,7 +1,7 @@
 import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 
 from core.models import lex_model as models
 
@@ -27,7 +27,9 @@ class TranslationState(BaseModel):
 
 class TranslationStateList(BaseModel):
     translation_states: List[TranslationState]
-    full_count: int
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
 
 
 class TranslationStateCreate(BaseModel):
@@ -97,7 +99,10 @@ class Category(BaseModel):
 
 class CategoryList(BaseModel):
     categories: List[Category]
-    full_count: int
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class CategoryCreate(BaseModel):
@@ -158,7 +163,8 @@ class Entry(BaseModel):
             lemma=model.lemma,
             description=model.description,
             language=model.language,
-            additional_info=model.extra_data,
+            # Rows of listings (see models.Entry.listing_columns) have no extra data
+            additional_info=getattr(model, 'extra_data', {}),
             created=model.created,
             edited=model.modified
         )
@@ -173,8 +179,12 @@ class Entry(BaseModel):
 
 
 class EntryList(BaseModel):
-    entries: List[Entry]
-    full_count: int
+    # Entries are expanded when related data is requested with "include" (Entry first, so it's kept as it is)
+    entries: List[Union[Entry, 'EntryExpanded']]
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class EntryMinimal(BaseModel):
@@ -201,6 +211,98 @@ class EntryMinimal(BaseModel):
         return entries
 
 
+class EntrySearchResult(BaseModel):
+    id: int
+    lemma: str
+    language: Optional[str]
+    rank: float
+    lemma_headline: str
+    description_headline: Optional[str]
+    created: datetime.datetime
+    edited: Optional[datetime.datetime]
+
+    @staticmethod
+    def from_row(row) -> 'EntrySearchResult':
+        result = EntrySearchResult(
+            id=row.id,
+            lemma=row.lemma,
+            language=row.language,
+            rank=row.rank,
+            lemma_headline=row.lemma_headline,
+            description_headline=row.description_headline or None,
+            created=row.created,
+            edited=row.modified
+        )
+        return result
+
+    @staticmethod
+    def list_from_rows(rows) -> List['EntrySearchResult']:
+        results = []
+        for row in rows:
+            results.append(EntrySearchResult.from_row(row))
+        return results
+
+
+class EntryRelations(BaseModel):
+    """
+    Related data of a listed entry, filled in for the relations requested with the "include" parameter.
+    """
+    suggestions: Optional[List[Entry]] = None
+    translation: Optional[Entry] = None
+    translation_state: Optional[TranslationState] = None
+    links: Optional[List[Link]] = None
+    related_entries: Optional[List[EntryMinimal]] = None
+    categories: Optional[List[Category]] = None
+
+    @staticmethod
+    def expand(items: list, relations: Dict[str, dict]) -> list:
+        """
+        Attach related data to listed entries.
+
+        :param items: Entry, EntryMinimal or EntrySearchResult instances.
+        :param relations: Related models grouped by relation name and entry ID (see v1.lex.entry_dal.load_relations).
+        :return: List of the matching *Expanded instances.
+        """
+        expanded = []
+        for item in items:
+            values = item.dict()
+            if "suggestions" in relations:
+                values["suggestions"] = Entry.list_from_model(relations["suggestions"][item.id])
+            if "translation" in relations:
+                translation, state = relations["translation"].get(item.id, (None, None))
+                values["translation"] = Entry.from_model(translation) if translation else None
+                values["translation_state"] = TranslationState.from_model(state) if state else None
+            if "links" in relations:
+                values["links"] = Link.list_from_model(relations["links"][item.id])
+            if "related" in relations:
+                values["related_entries"] = EntryMinimal.list_from_model(relations["related"][item.id])
+            if "categories" in relations:
+                values["categories"] = Category.list_from_model(relations["categories"][item.id])
+            expanded.append(_EXPANDED_SCHEMAS[type(item)](**values))
+        return expanded
+
+
+class EntryExpanded(EntryRelations, Entry):
+    pass
+
+
+class EntryMinimalExpanded(EntryRelations, EntryMinimal):
+    pass
+
+
+class EntrySearchResultExpanded(EntryRelations, EntrySearchResult):
+    pass
+
+
+EntryList.update_forward_refs(EntryExpanded=EntryExpanded)
+
+_EXPANDED_SCHEMAS = {
+    Entry: EntryExpanded,
+    EntryMinimal: EntryMinimalExpanded,
+    EntrySearchResult: EntrySearchResultExpanded
+}
+
+
 class EntryDetail(BaseModel):
     id: int
     lemma: str
@@ -261,10 +363,142 @@ class EntryDetail(BaseModel):
         )
         return entry
 
+    @staticmethod
+    def from_row(row) -> 'EntryDetail':
+        """
+        Build the schema from a row returned by models.Entry.retrieve_detail.
+        """
+        entry_model: models.Entry = row.Entry
+
+        translation = None
+        if row.translation:
+            translation = Entry(**row.translation)
+        state = None
+        if row.translation_state:
+            state = TranslationState(**row.translation_state)
+
+        entry = EntryDetail(
+            id=entry_model.id,
+            lemma=entry_model.lemma,
+            description=entry_model.description,
+            language=entry_model.language,
+            additional_info=entry_model.extra_data,
+
+            suggestions=[Entry(**suggestion) for suggestion in row.suggestions],
+            translation=translation,
+            translation_state=state,
+            links=[Link(**link) for link in row.links],
+            related_entries=[EntryMinimal(**related) for related in row.related_entries],
+            categories=[Category(**category) for category in row.categories],
+
+            created=entry_model.created,
+            edited=entry_model.modified
+        )
+        return entry
+
+
+class EntryDetailList(BaseModel):
+    entries: List[EntryDetail]
+    not_found: List[int]
+
+
+class EntryBatchRequest(BaseModel):
+    ids: List[int]
+
+
+# noinspection PyMethodParameters
+class EntryImportRow(BaseModel):
+    """
+    One row of a bulk import. Categories are given by name, translations by the lemmas of the translated
+    entries (English entries translate to Slovene ones and the other way around).
+    """
+    lemma: str
+    description: Optional[str]
+    language: Optional[str]
+    alternative_form: Optional[str]
+    categories: List[str] = []
+    translations: List[str] = []
+    translation_state: Optional[str]
+
+    @validator('lemma')
+    def lemma_must_not_be_empty(cls, lemma: str) -> str:
+        if not lemma.strip():
+            raise ValueError("Lemma is empty")
+        return lemma
+
+    @validator('translations')
+    def translations_must_match_language(cls, translations: List[str], values: dict) -> List[str]:
+        language = values.get('language')
+        if translations and language not in ('en', 'sl'):
+            raise ValueError("Only English and Slovene entries can have translations")
+        if len(translations) > 1 and language == 'en':
+            raise ValueError("An English entry can only have one translation")
+        return translations
+
+    def to_record(self, line: int) -> tuple:
+        """
+        Values in the order of models.EntryImport.COLUMNS.
+        """
+        alt_form = self.alternative_form if self.language == 'sl' else None
+        return (line, self.lemma, self.description, self.language, alt_form, self.categories, self.translations,
+                self.translation_state)
+
+
+class EntryImportError(BaseModel):
+    line: int
+    error: str
+
+
+class EntryImportResult(BaseModel):
+    imported: int
+    errors: List[EntryImportError]
+
+
+class EntryChanges(BaseModel):
+    created: List[int]
+    updated: List[int]
+    deleted: List[int]
+    next_token: str
+    has_more: bool
+
+
+class Event(BaseModel):
+    id: int
+    table: Optional[str]
+    action: Optional[str]
+    record_id: Optional[int]
+    user_id: Optional[int]
+    username: Optional[str]
+    details: Optional[dict]
+    time: datetime.datetime
+
+    @staticmethod
+    def from_model(event_model: models.Event):
+        return Event(
+            id=event_model.id,
+            table=event_model.table,
+            action=event_model.action,
+            record_id=event_model.record_id,
+            user_id=event_model.user_id,
+            username=event_model.username,
+            details=event_model.details,
+            time=event_model.time
+        )
+
+    @staticmethod
+    def list_from_model(events_model: List[models.Event]) -> List['Event']:
+        return [Event.from_model(model) for model in events_model]
+
+
+class EventList(BaseModel):
+    events: List[Event]
+    has_more: bool = False
+    next_cursor: Optional[str] = None
+
 
 class EntryPair(BaseModel):
-    english: Optional[Entry]
-    slovene: Optional[Entry]
+    english: Optional[Union[Entry, EntryExpanded]]
+    slovene: Optional[Union[Entry, EntryExpanded]]
 
     @staticmethod
     def from_model(pair_model: models.EntryPair):
@@ -292,9 +526,23 @@ class EntryPair(BaseModel):
 
 class EntryPairList(BaseModel):
     entries: List[EntryPair]
-    full_count: int
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class MinimalEntryList(BaseModel):
-    entries: List[EntryMinimal]
-    full_count: int
+    entries: List[Union[EntryMinimal, EntryMinimalExpanded]]
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
+    next_cursor: Optional[str] = None
+
+
+class EntrySearchResultList(BaseModel):
+    entries: List[Union[EntrySearchResult, EntrySearchResultExpanded]]
+    full_count: Optional[int]
+    count_strategy: str = "exact"
+    has_more: bool = False
+    next_cursor: Optional[str] = None
@@ -1,7 +1,12 @@
 import datetime
-from typing import Optional
+from typing import Optional, List
 from pydantic import BaseModel, validator
 
+# Permission bits: a role's permissions are a mask of them, a user has those of all their roles
+MANAGE_ROLES = 1 << 0  # create, change and delete roles, assign them to users
+MANAGE_USERS = 1 << 1  # delete users
+READ_AUDIT_LOG = 1 << 2  # read everyone's changes in the audit log
+
 
 class RoleBase(BaseModel):
     name: str
@@ -125,6 +130,18 @@ class UserLogin(BaseModel):
         orm_mode = True
 
 
+class UserRolesChange(BaseModel):
+    user_ids: List[int]
+    role_ids: List[int]
+
+
+class UserRolesChangeResult(BaseModel):
+    # Role assignments made (or removed)
+    changed: int
+    missing_user_ids: List[int]
+    missing_role_ids: List[int]
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -132,3 +149,6 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+    # Aggregated (OR-ed) permissions of the user's roles, as of roles_version
+    permissions: int = 0
+    roles_version: Optional[int] = None
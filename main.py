@@ -1,7 +1,10 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+from core import audit, registry, replica
+from core.cache import render_metrics
+from core.configuration import config
 from core.exceptions import GeneralBackendException
 from core.models.lex_model import Entry
 from core.schemas.message_types import Message
@@ -32,15 +35,32 @@ async def not_found_exception_handler(_request: Request, exc: GeneralBackendExce
     )
 
 
+if replica.replica_engine is not None:
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        response = await call_next(request)
+        if replica.writes(request) and response.status_code < 400:
+            replica.pin_to_primary(request, response)
+        return response
+
+
 @app.on_event("startup")
 async def startup():
     logger.info("Starting up...")
     await connect_db()
     logger.info("Database connected!")
+    await registry.load_all()
+    if config.CACHE.REGISTRY_LISTEN:
+        registry.listener.start()
+    audit.writer.start()
+    replica.monitor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    await replica.monitor.stop()
+    await registry.listener.stop()
+    await audit.writer.stop()
     await disconnect_db()
     logger.info("Database disconnected!")
 
@@ -50,4 +70,9 @@ async def check(_: Request):
     return Response(status_code=200)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(_: Request):
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(v1_router)
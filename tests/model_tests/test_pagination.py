@@ -0,0 +1,150 @@
+"""
+Keyset pagination: cursors, and walking a listing page by page with them.
+
+Entries are seeded into a category of their own, in a transaction that is rolled back.
+"""
+import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from core.exceptions import GeneralBackendException
+from core.models.database import async_session, engine
+import core.models.dal_dependencies as dd
+import core.models.lex_model as models
+
+# (lemma, description), several sharing a lemma, and NULLs among both
+SEED_ENTRIES = [
+    ("apple", "fruit"), ("banana", None), ("apple", "tree"), (None, "no lemma"), ("cherry", "fruit"),
+    (None, None), ("banana", "fruit"), ("apple", None), ("date", "fruit"), (None, "also no lemma"),
+]
+
+
+@pytest_asyncio.fixture
+async def category_entries():
+    """
+    Session with the seeded entries, the ID of their category and the entries' (id, lemma, description).
+    """
+    session = async_session()
+    await session.begin()
+
+    category_id = (await session.execute(text(
+        "INSERT INTO categories (name, description) VALUES ('pagination test', '') RETURNING id"
+    ))).scalar()
+    entries = []
+    for lemma, description in SEED_ENTRIES:
+        entry_id = (await session.execute(text(
+            "INSERT INTO entries (lemma, description, language) VALUES (:lemma, :description, 'en') RETURNING id"
+        ), {"lemma": lemma, "description": description})).scalar()
+        await session.execute(text(
+            "INSERT INTO category_to_entry (entry_id, category_id) VALUES (:entry_id, :category_id)"
+        ), {"entry_id": entry_id, "category_id": category_id})
+        entries.append((entry_id, lemma, description))
+
+    yield session, category_id, entries
+
+    await session.rollback()
+    await session.close()
+    # Each test runs in its own event loop, pooled connections can't be reused by the next one
+    await engine.dispose()
+
+
+def _expected_order(entries: list, sort: str) -> list:
+    """
+    IDs in the order the sort should list them: NULLs last in either direction, ties broken by ascending ID.
+    """
+    keys = []
+    for name in sort.split(","):
+        descending = name.startswith("-")
+        column = {"lemma": 1, "description": 2}[name.lstrip("-")]
+        keys.append((column, descending))
+
+    ordered = sorted(entries, key=lambda entry: entry[0])
+    for column, descending in reversed(keys):
+        present = sorted([entry for entry in ordered if entry[column] is not None],
+                         key=lambda entry: entry[column], reverse=descending)
+        ordered = present + [entry for entry in ordered if entry[column] is None]
+    return [entry[0] for entry in ordered]
+
+
+async def _walk(session, category_id: int, sort: str, limit: int) -> list:
+    """
+    List the category page by page, following the cursors, and return the pages' entry IDs.
+    """
+    pages = []
+    cursor = None
+    while True:
+        filters = {"sort": sort, "limit": limit, "cursor": cursor, "count": "none"}
+        page = await models.Entry.retrieve_by_category(filters, category_id, session)
+        pages.append([entry.id for entry in page.items])
+        assert page.has_more == (page.next_cursor is not None)
+        if page.next_cursor is None:
+            return pages
+        assert len(pages) <= len(SEED_ENTRIES), "Pagination doesn't end"
+        cursor = page.next_cursor
+
+
+def test_cursor_round_trip():
+    keys = models.Entry.sort_keys("-lemma") + [dd.SortKey("created", models.Entry.created)]
+    values = ["apple", 42, datetime.datetime(2022, 6, 6, 12, 30, 15, 250000)]
+
+    assert dd.decode_cursor(keys, dd.encode_cursor(keys, values)) == values
+
+
+def test_cursor_round_trip_null():
+    keys = models.Entry.sort_keys("lemma,description")
+    values = [None, None, 7]
+
+    assert dd.decode_cursor(keys, dd.encode_cursor(keys, values)) == values
+
+
+def test_cursor_of_another_sort_is_rejected():
+    cursor = dd.encode_cursor(models.Entry.sort_keys("lemma"), ["apple", 1])
+
+    with pytest.raises(GeneralBackendException) as error:
+        dd.decode_cursor(models.Entry.sort_keys("-lemma"), cursor)
+    assert error.value.code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "e30", dd.encode_cursor([], [])[:-2]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(GeneralBackendException) as error:
+        dd.decode_cursor(models.Entry.sort_keys("lemma"), cursor)
+    assert error.value.code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort", ["lemma", "-lemma", "description", "-description", "lemma,-description"])
+@pytest.mark.parametrize("limit", [1, 3, 4, 10])
+async def test_pages_cover_the_listing_once(category_entries, sort, limit):
+    session, category_id, entries = category_entries
+
+    pages = await _walk(session, category_id, sort, limit)
+
+    assert [entry_id for page in pages for entry_id in page] == _expected_order(entries, sort)
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+
+@pytest.mark.asyncio
+async def test_last_full_page_has_no_cursor(category_entries):
+    session, category_id, entries = category_entries
+
+    page = await models.Entry.retrieve_by_category({"limit": len(entries), "count": "exact"}, category_id, session)
+
+    assert len(page.items) == len(entries)
+    assert page.count == len(entries)
+    assert page.next_cursor is None and not page.has_more
+
+
+@pytest.mark.asyncio
+async def test_cursor_starts_after_a_null_lemma(category_entries):
+    session, category_id, entries = category_entries
+    keys = models.Entry.sort_keys("lemma")
+    first_null = min(entry_id for entry_id, lemma, _description in entries if lemma is None)
+
+    filters = {"sort": "lemma", "limit": 10, "count": "none", "cursor": dd.encode_cursor(keys, [None, first_null])}
+    page = await models.Entry.retrieve_by_category(filters, category_id, session)
+
+    assert [entry.id for entry in page.items] == _expected_order(entries, "lemma")[-2:]
@@ -0,0 +1,195 @@
+"""
+Query plan regression tests: every model query is planned (EXPLAIN) against seeded tables
+and fails if PostgreSQL would read a large table with a sequential scan, i.e. if an index it needs is missing.
+
+The seed data is inserted in a transaction that is rolled back, so these tests can run on the development database.
+"""
+import json
+from contextlib import contextmanager
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import Select, CompoundSelect
+from sqlalchemy.sql.expression import Executable, ClauseElement
+
+from core.models.database import async_session, engine
+import core.models.lex_model as models
+import core.models.users_model as um
+from v1.users.users_dal import UserDAL
+
+# Sequential scans of tables with more (estimated) rows than this fail the test
+SEQ_SCAN_ROW_THRESHOLD = 1000
+
+SEED_ENTRIES = 20000
+SEED_CATEGORIES = 50
+SEED_USERS = 2000
+SEED_ROLES = 20
+
+NO_COUNT = {"limit": 25, "count": "none"}
+
+SEED_SQL = [
+    "INSERT INTO entries (lemma, description, language) "
+    "SELECT 'plan' || n, 'description ' || n, CASE WHEN n % 2 = 0 THEN 'en' ELSE 'sl' END "
+    "FROM generate_series(1, :entries) n",
+    "CREATE TEMPORARY TABLE plan_entries ON COMMIT DROP AS "
+    "SELECT id, language, row_number() OVER (ORDER BY id) AS n FROM entries WHERE lemma LIKE 'plan%'",
+    "INSERT INTO english (id) SELECT id FROM plan_entries WHERE language = 'en'",
+    "INSERT INTO slovene (id) SELECT id FROM plan_entries WHERE language = 'sl'",
+    "INSERT INTO translation_states (label) SELECT 'plan state ' || n FROM generate_series(1, 5) n",
+    # Every English entry is translated to, suggests and relates to the Slovene one after it
+    "INSERT INTO translations (parent, child, state) "
+    "SELECT e.id, s.id, (SELECT min(id) FROM translation_states) "
+    "FROM plan_entries e JOIN plan_entries s ON s.n = e.n + 1 WHERE e.language = 'en'",
+    "INSERT INTO suggestions (parent, child) "
+    "SELECT e.id, s.id FROM plan_entries e JOIN plan_entries s ON s.n = e.n + 1 WHERE e.language = 'en'",
+    "INSERT INTO relations (entry1, entry2) "
+    "SELECT e.id, s.id FROM plan_entries e JOIN plan_entries s ON s.n = e.n + 1 WHERE e.language = 'en'",
+    "INSERT INTO links (title, url, entry_id) SELECT 'link', 'https://example.com/' || n, id FROM plan_entries",
+    "INSERT INTO categories (name, description) "
+    "SELECT 'plan category ' || n, '' FROM generate_series(1, :categories) n",
+    "INSERT INTO category_to_entry (entry_id, category_id) "
+    "SELECT e.id, c.id FROM plan_entries e "
+    "JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM categories "
+    "      WHERE name LIKE 'plan category %') c ON c.n = e.n % :categories",
+    "INSERT INTO users (username, display_name, hashed_passcode, is_active) "
+    "SELECT 'plan_user' || n, 'Plan user', '', true FROM generate_series(1, :users) n",
+    "INSERT INTO roles (name, permissions) SELECT 'plan role ' || n, 0 FROM generate_series(1, :roles) n",
+    "INSERT INTO role_to_user (role_id, user_id) "
+    "SELECT r.id, u.id FROM roles r JOIN users u ON u.id % :roles = r.id % :roles "
+    "WHERE r.name LIKE 'plan role %' AND u.username LIKE 'plan_user%'",
+    "ANALYZE",
+]
+
+
+@pytest_asyncio.fixture
+async def seeded():
+    """
+    Session with the seed data, and a dictionary of IDs to query for.
+    """
+    session = async_session()
+    await session.begin()
+
+    parameters = {"entries": SEED_ENTRIES, "categories": SEED_CATEGORIES, "users": SEED_USERS, "roles": SEED_ROLES}
+    for statement in SEED_SQL:
+        await session.execute(text(statement), parameters)
+
+    result = await session.execute(text(
+        "SELECT (SELECT min(parent) FROM translations WHERE parent IN (SELECT id FROM plan_entries)) AS english, "
+        "       (SELECT min(child) FROM translations WHERE parent IN (SELECT id FROM plan_entries)) AS slovene, "
+        "       (SELECT min(id) FROM categories WHERE name LIKE 'plan category %') AS category, "
+        "       (SELECT min(id) FROM translation_states WHERE label LIKE 'plan state %') AS state, "
+        "       (SELECT min(id) FROM users WHERE username LIKE 'plan_user%') AS user"
+    ))
+    ids = dict(result.one()._mapping)
+
+    yield session, ids
+
+    await session.rollback()
+    await session.close()
+    # Each test runs in its own event loop, pooled connections can't be reused by the next one
+    await engine.dispose()
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a statement, compiled (and its parameters typed) the same way as the statement itself.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+@contextmanager
+def captured_queries():
+    """
+    Collect the (statement, parameters) of every SELECT executed in the block.
+    """
+    statements = []
+
+    def before_execute(_connection, statement, multiparams, params, _execution_options):
+        if isinstance(statement, (Select, CompoundSelect)):
+            statements.append((statement, multiparams[0] if multiparams else params))
+
+    event.listen(engine.sync_engine, "before_execute", before_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_execute", before_execute)
+
+
+def sequential_scans(plan: dict):
+    """
+    (table, estimated rows) of every sequential scan in a JSON query plan.
+    """
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"], plan["Plan Rows"]
+    for child in plan.get("Plans", []):
+        yield from sequential_scans(child)
+
+
+async def large_sequential_scans(session, statements) -> list:
+    sizes = dict((await session.execute(text(
+        "SELECT relname, reltuples FROM pg_class WHERE relnamespace = 'public'::regnamespace"
+    ))).all())
+
+    found = []
+    for statement, parameters in statements:
+        result = await session.execute(Explain(statement), parameters or {})
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        for table, _rows in sequential_scans(plan[0]["Plan"]):
+            if sizes.get(table, 0) > SEQ_SCAN_ROW_THRESHOLD:
+                found.append(f"{table} ({sizes[table]:.0f} rows) in: {statement}")
+    return found
+
+
+QUERIES = {
+    "entry by id": lambda s, ids: models.Entry.retrieve_by_id(ids["english"], s),
+    "entry detail": lambda s, ids: models.Entry.retrieve_detail(ids["english"], s),
+    "entry version": lambda s, ids: models.Entry.retrieve_version(ids["english"], s),
+    "entry referrers": lambda s, ids: models.Entry.retrieve_referrer_ids(ids["slovene"], s),
+    "entries by ids": lambda s, ids: models.Entry.retrieve_by_ids([ids["english"], ids["slovene"]], s),
+    "entry list": lambda s, ids: models.Entry.retrieve_all({**NO_COUNT, "sort": "lemma"}, s),
+    "entries by category": lambda s, ids: models.Entry.retrieve_by_category(NO_COUNT, ids["category"], s),
+    "latest entries": lambda s, ids: models.Entry.retrieve_latest({"limit": 10, "language": "sl"}, s),
+    "simple search": lambda s, ids: models.Entry.simple_search_lang("plan1234", "en", NO_COUNT, s),
+    "text search": lambda s, ids: models.Entry.text_search("1234", "en", NO_COUNT, s),
+    "links by entry": lambda s, ids: models.Link.retrieve_by_entry(ids["english"], s),
+    "links by entries": lambda s, ids: models.Link.retrieve_by_entries([ids["english"], ids["slovene"]], s),
+    "categories by entry": lambda s, ids: models.Category.retrieve_by_entry(ids["english"], s),
+    "categories by entries": lambda s, ids: models.Category.retrieve_by_entries([ids["english"]], s),
+    "category entry ids": lambda s, ids: models.Category.retrieve_entry_ids(ids["category"], s),
+    "suggestions by parent": lambda s, ids: models.Suggestion.retrieve_by_parent(ids["english"], s),
+    "suggestions by parents": lambda s, ids: models.Suggestion.retrieve_by_parents([ids["english"]], s),
+    "suggestions by child": lambda s, ids: models.Suggestion.retrieve_by_child(ids["slovene"], s),
+    "translation by parent": lambda s, ids: models.Translation.retrieve_by_parent(ids["english"], s),
+    "translations by parents": lambda s, ids: models.Translation.retrieve_by_parents([ids["english"]], s),
+    "translations by child": lambda s, ids: models.Translation.retrieve_by_child(ids["slovene"], s),
+    "translations by state": lambda s, ids: models.Translation.retrieve_parent_ids_by_state(ids["state"], s),
+    "relations by entry1": lambda s, ids: models.Relation.retrieve_by_entry1(ids["english"], s),
+    "relations by entries1": lambda s, ids: models.Relation.retrieve_by_entries1([ids["english"]], s),
+    "relations by entry2": lambda s, ids: models.Relation.retrieve_by_entry2(ids["slovene"], s),
+    "events": lambda s, ids: models.Event.retrieve_all({"table": "entries", "record_id": ids["english"]}, s),
+    "entry changes": lambda s, ids: models.EntryChange.retrieve_since((0, 0), 2 ** 62, 100, s),
+    "user by id": lambda s, ids: s.get(um.User, ids["user"]),
+    "user roles": lambda s, ids: UserDAL(s).get_user_roles(ids["user"], {"limit": 25}),
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("name", QUERIES)
+async def test_no_large_sequential_scans(seeded, name):
+    session, ids = seeded
+    with captured_queries() as statements:
+        await QUERIES[name](session, ids)
+
+    assert statements, "The query didn't run any SELECT statements"
+    assert await large_sequential_scans(session, statements) == []
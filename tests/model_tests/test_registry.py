@@ -0,0 +1,25 @@
+"""
+Pages of registry items, which are counted exactly whichever count strategy was requested.
+"""
+import pytest
+
+from core import registry
+
+
+@pytest.mark.parametrize("strategy", ["exact", "estimated", "cached"])
+def test_page_count_is_exact(strategy):
+    page = registry.page(list(range(5)), 1, 2, strategy)
+
+    assert page.items == [1, 2]
+    assert page.count == 5
+    assert page.count_strategy == "exact"
+    assert page.has_more
+
+
+def test_page_count_skipped():
+    page = registry.page(list(range(5)), 3, None, "none")
+
+    assert page.items == [3, 4]
+    assert page.count is None
+    assert page.count_strategy == "none"
+    assert not page.has_more
@@ -0,0 +1,128 @@
+"""
+Assigning roles to and removing them from users in bulk, and reporting the users and roles that don't exist.
+
+Users and roles are seeded in a transaction that is rolled back.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from core.models.database import async_session, engine
+from v1.users.users_dal import UserDAL
+
+
+@pytest_asyncio.fixture
+async def users_roles():
+    """
+    Session with two seeded users and two seeded roles, their IDs and IDs no user or role has.
+    """
+    session = async_session()
+    await session.begin()
+
+    user_ids = [(await session.execute(text(
+        "INSERT INTO users (username, hashed_passcode) VALUES (:username, '') RETURNING id"
+    ), {"username": f"role test {index}"})).scalar() for index in range(2)]
+    role_ids = [(await session.execute(text(
+        "INSERT INTO roles (name, permissions) VALUES (:name, 0) RETURNING id"
+    ), {"name": f"role test {index}"})).scalar() for index in range(2)]
+    unused_user_id = (await session.execute(text("SELECT max(id) + 1 FROM users"))).scalar()
+    unused_role_id = (await session.execute(text("SELECT max(id) + 1 FROM roles"))).scalar()
+
+    yield session, user_ids, role_ids, unused_user_id, unused_role_id
+
+    await session.rollback()
+    await session.close()
+    # Each test runs in its own event loop, pooled connections can't be reused by the next one
+    await engine.dispose()
+
+
+async def _assignments(session, user_ids: list) -> set:
+    query = await session.execute(text(
+        "SELECT user_id, role_id FROM role_to_user WHERE user_id = ANY(:user_ids)"
+    ), {"user_ids": user_ids})
+    return set(query.all())
+
+
+async def _roles_versions(session, user_ids: list) -> list:
+    query = await session.execute(text(
+        "SELECT roles_version FROM users WHERE id = ANY(:user_ids) ORDER BY id"
+    ), {"user_ids": user_ids})
+    return query.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_assign_roles(users_roles):
+    session, user_ids, role_ids, _unused_user_id, _unused_role_id = users_roles
+    dal = UserDAL(session)
+
+    result = await dal.assign_roles(user_ids, role_ids)
+
+    assert result.changed == 4
+    assert result.missing_user_ids == [] and result.missing_role_ids == []
+    assert await _assignments(session, user_ids) == {(user_id, role_id) for user_id in user_ids for role_id in role_ids}
+    assert await _roles_versions(session, user_ids) == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_assign_roles_skips_existing(users_roles):
+    session, user_ids, role_ids, _unused_user_id, _unused_role_id = users_roles
+    dal = UserDAL(session)
+    await dal.assign_roles(user_ids[:1], role_ids)
+
+    result = await dal.assign_roles(user_ids, role_ids)
+
+    assert result.changed == 2
+    # Only the user who got new roles has outdated tokens
+    assert await _roles_versions(session, user_ids) == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_assign_roles_reports_missing(users_roles):
+    session, user_ids, role_ids, unused_user_id, unused_role_id = users_roles
+    dal = UserDAL(session)
+
+    result = await dal.assign_roles([user_ids[0], unused_user_id], [role_ids[0], unused_role_id])
+
+    assert result.changed == 1
+    assert result.missing_user_ids == [unused_user_id]
+    assert result.missing_role_ids == [unused_role_id]
+    assert await _assignments(session, user_ids) == {(user_ids[0], role_ids[0])}
+
+
+@pytest.mark.asyncio
+async def test_remove_roles(users_roles):
+    session, user_ids, role_ids, _unused_user_id, _unused_role_id = users_roles
+    dal = UserDAL(session)
+    await dal.assign_roles(user_ids, role_ids)
+
+    result = await dal.remove_roles(user_ids, role_ids[:1])
+
+    assert result.changed == 2
+    assert result.missing_user_ids == [] and result.missing_role_ids == []
+    assert await _assignments(session, user_ids) == {(user_id, role_ids[1]) for user_id in user_ids}
+    assert await _roles_versions(session, user_ids) == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_remove_roles_reports_missing(users_roles):
+    session, user_ids, role_ids, unused_user_id, unused_role_id = users_roles
+    dal = UserDAL(session)
+    await dal.assign_roles(user_ids[:1], role_ids)
+
+    result = await dal.remove_roles([user_ids[1], unused_user_id], [role_ids[0], unused_role_id])
+
+    assert result.changed == 0
+    assert result.missing_user_ids == [unused_user_id]
+    assert result.missing_role_ids == [unused_role_id]
+    # Nothing was removed, nor were any tokens outdated
+    assert await _assignments(session, user_ids) == {(user_ids[0], role_id) for role_id in role_ids}
+    assert await _roles_versions(session, user_ids) == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_single_user_role_change_reports_missing_user(users_roles):
+    session, _user_ids, role_ids, unused_user_id, _unused_role_id = users_roles
+    dal = UserDAL(session)
+
+    assert await dal.create_user_roles(unused_user_id, role_ids) == (False, "User not found")
+    assert await dal.remove_user_roles(unused_user_id, role_ids) == (False, "User not found")
@@ -0,0 +1,28 @@
+"""
+The audit log is only open to users allowed to read it.
+"""
+from fastapi.testclient import TestClient
+
+from core.schemas.users_schema import TokenData, MANAGE_ROLES, MANAGE_USERS
+from main import app
+from v1.users.users_router import get_token_data
+
+client = TestClient(app)
+
+
+def test_events_require_token():
+    response = client.get("/v1/audit/events/")
+
+    assert response.status_code == 401
+
+
+def test_events_require_permission():
+    app.dependency_overrides[get_token_data] = \
+        lambda: TokenData(username="audit routes test", permissions=MANAGE_ROLES | MANAGE_USERS, roles_version=0)
+    try:
+        response = client.get("/v1/audit/events/")
+    finally:
+        app.dependency_overrides.pop(get_token_data, None)
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Insufficient permissions"
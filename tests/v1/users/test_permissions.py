@@ -0,0 +1,74 @@
+"""
+Permission checks against the access token's claims, and reloading the claims once the user's roles change.
+
+Users and roles are seeded in a transaction that is rolled back.
+"""
+import uuid
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from core.exceptions import GeneralBackendException
+from core.models.database import async_session, engine
+from core.schemas.users_schema import TokenData, MANAGE_ROLES, MANAGE_USERS
+from v1.users.users_dal import UserDAL
+from v1.users.users_router import create_access_token, get_token_data, require_permissions
+
+
+@pytest_asyncio.fixture
+async def user_role():
+    """
+    Session with a seeded user (without roles) and a role allowed to manage roles, their IDs and the username.
+    """
+    session = async_session()
+    await session.begin()
+
+    # Unique, so users and roles versions cached by earlier tests don't apply
+    username = f"permissions test {uuid.uuid4().hex}"
+    user_id = (await session.execute(text(
+        "INSERT INTO users (username, hashed_passcode, is_active) VALUES (:username, '', true) RETURNING id"
+    ), {"username": username})).scalar()
+    role_id = (await session.execute(text(
+        "INSERT INTO roles (name, permissions) VALUES ('permissions test', :permissions) RETURNING id"
+    ), {"permissions": MANAGE_ROLES})).scalar()
+
+    yield session, user_id, role_id, username
+
+    await session.rollback()
+    await session.close()
+    # Each test runs in its own event loop, pooled connections can't be reused by the next one
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_missing_permission_is_forbidden():
+    check_permissions = require_permissions(MANAGE_ROLES | MANAGE_USERS)
+
+    with pytest.raises(GeneralBackendException) as error:
+        await check_permissions(TokenData(username="anyone", permissions=MANAGE_ROLES, roles_version=0), None)
+    assert error.value.code == 403
+
+
+@pytest.mark.asyncio
+async def test_current_claims_are_trusted(user_role):
+    session, _user_id, _role_id, username = user_role
+    token = create_access_token({"sub": username}, permissions=MANAGE_ROLES, roles_version=0)
+
+    token_data = await get_token_data(UserDAL(session), token)
+
+    assert token_data.permissions == MANAGE_ROLES
+    assert await require_permissions(MANAGE_ROLES)(token_data, UserDAL(session)) == token_data
+
+
+@pytest.mark.asyncio
+async def test_bumped_roles_version_reloads_permissions(user_role):
+    session, user_id, role_id, username = user_role
+    token = create_access_token({"sub": username}, permissions=0, roles_version=0)
+    await UserDAL(session).assign_roles([user_id], [role_id])
+
+    token_data = await get_token_data(UserDAL(session), token)
+
+    assert token_data.permissions == MANAGE_ROLES
+    assert token_data.roles_version == 1
+    assert await require_permissions(MANAGE_ROLES)(token_data, UserDAL(session)) == token_data
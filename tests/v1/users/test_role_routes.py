@@ -0,0 +1,49 @@
+"""
+Routes changing which users have which roles are only open to users allowed to manage roles.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from core.schemas.users_schema import TokenData, MANAGE_USERS
+from main import app
+from v1.users.users_router import get_token_data
+
+client = TestClient(app)
+
+ROLE_CHANGES = [
+    ("POST", "/v1/users/roles", {"user_ids": [1], "role_ids": [1]}),
+    ("DELETE", "/v1/users/roles", {"user_ids": [1], "role_ids": [1]}),
+    ("POST", "/v1/users/1/roles", [1]),
+    ("DELETE", "/v1/users/1/roles", [1]),
+]
+
+
+@pytest.fixture
+def token_permissions():
+    """
+    Set the permissions every request's token has (instead of checking the token).
+    """
+    def set_permissions(permissions: int):
+        app.dependency_overrides[get_token_data] = \
+            lambda: TokenData(username="role routes test", permissions=permissions, roles_version=0)
+
+    yield set_permissions
+    app.dependency_overrides.pop(get_token_data, None)
+
+
+@pytest.mark.parametrize("method,url,body", ROLE_CHANGES)
+def test_role_change_requires_token(method, url, body):
+    response = client.request(method, url, json=body)
+
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("method,url,body", ROLE_CHANGES)
+def test_role_change_requires_permission(token_permissions, method, url, body):
+    token_permissions(MANAGE_USERS)
+
+    response = client.request(method, url, json=body)
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Insufficient permissions"
+
@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from .users.users_router import router as users_router
 from .users.roles_router import router as roles_router
 from .lex.lex_router import router as lex_router
+from .audit.audit_router import router as audit_router
 
 
 router = APIRouter(
@@ -12,3 +13,4 @@ router = APIRouter(
 router.include_router(users_router)
 router.include_router(roles_router)
 router.include_router(lex_router)
+router.include_router(audit_router)
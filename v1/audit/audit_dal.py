@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Session
+
+import core.models.lex_model as models
+import core.schemas.lex_schema as schemas
+
+
+class AuditDAL:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    async def retrieve_events(self, filters: dict) -> schemas.EventList:
+        page = await models.Event.retrieve_all(filters, self.db_session)
+        return schemas.EventList(
+            events=schemas.Event.list_from_model(page.items),
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
+        )
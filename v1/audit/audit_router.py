@@ -0,0 +1,56 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import core.schemas.message_types as mt
+from core.exceptions import GeneralBackendException
+from core.schemas.lex_schema import EventList
+from core.schemas.users_schema import TokenData, READ_AUDIT_LOG
+from v1 import doc_strings
+from v1.dependencies import get_db_session, PrimaryUnitOfWorkRoute
+from v1.audit.audit_dal import AuditDAL
+from v1.users.users_router import require_permissions
+
+router = APIRouter(
+    prefix="/audit",
+    tags=["Audit"],
+    route_class=PrimaryUnitOfWorkRoute
+)
+
+MAX_EVENTS = 1000
+
+
+async def get_audit_dal(db_session: AsyncSession = Depends(get_db_session)) -> AuditDAL:
+    return AuditDAL(db_session)
+
+
+@router.get("/events/", status_code=200,
+            responses={500: {"model": mt.Message},
+                       400: {"model": mt.Message},
+                       401: {"model": mt.Message},
+                       403: {"model": mt.Message},
+                       200: {"model": EventList}},
+            description=doc_strings.LIST_EVENTS)
+async def retrieve_events(table: Optional[str] = None, record_id: Optional[int] = None,
+                          user_id: Optional[int] = None, cursor: Optional[str] = None,
+                          limit: int = Query(100, ge=1, le=MAX_EVENTS),
+                          _: TokenData = Depends(require_permissions(READ_AUDIT_LOG)),
+                          db: AuditDAL = Depends(get_audit_dal)):
+    filters = {
+        "table": table,
+        "record_id": record_id,
+        "user_id": user_id,
+        "cursor": cursor,
+        "limit": limit
+    }
+    try:
+        return await db.retrieve_events(filters)
+    except GeneralBackendException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
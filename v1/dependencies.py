@@ -1,3 +1,162 @@
+import hashlib
+import json
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse
+
+from core.models.dal_dependencies import Page
+from core.replica import session_for
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+
+async def get_db_session(request: Request) -> AsyncSession:
+    """
+    FastAPI injectable providing the request's session, shared by every DAL (and the authentication) of the request.
+    Requests that don't write get a read-only transaction (see core.replica.session_for()).
+
+    The session is created on first use and only checks out a connection with its first query. The route
+    (see UnitOfWorkRoute) commits it once the endpoint returns, or rolls it back if the endpoint raises.
+    """
+    session = getattr(request.state, "db_session", None)
+    if session is None:
+        session = session_for(request, getattr(request.state, "primary_only", False))
+        await session.begin()
+        request.state.db_session = session
+    return session
+
+
+async def end_db_session(request: Request, commit: bool):
+    """
+    Commit (or roll back) and close the request's session, returning its connection to the pool.
+    """
+    session: Optional[AsyncSession] = getattr(request.state, "db_session", None)
+    if session is None:
+        return
+    request.state.db_session = None
+    try:
+        if commit and session.in_transaction():
+            await session.commit()
+    finally:
+        await session.close()
+
+
+def writing_endpoint(endpoint: Callable) -> Callable:
+    """
+    Mark a GET endpoint that changes data, so it gets a writable session on the primary like other methods do
+    (see core.replica.writes()). Goes below the route decorator.
+    """
+    endpoint.writes = True
+    return endpoint
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Route ending the request's session (see get_db_session()) as soon as the endpoint returns, before the response
+    is sent. Streamed responses keep the session until the stream ends.
+    """
+    # Routes reading data that has to be up to date with the primary (see core/replica.py) set this
+    primary_only = False
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        primary_only = self.primary_only
+        writes = getattr(self.endpoint, "writes", False)
+
+        async def unit_of_work_handler(request: Request) -> Response:
+            request.state.primary_only = primary_only
+            request.state.writes = writes
+            try:
+                response = await handler(request)
+            except BaseException:
+                await end_db_session(request, commit=False)
+                raise
+
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = _ending_db_session(request, response.body_iterator)
+            else:
+                await end_db_session(request, commit=True)
+            return response
+
+        return unit_of_work_handler
+
+
+class PrimaryUnitOfWorkRoute(UnitOfWorkRoute):
+    primary_only = True
+
+
+async def _ending_db_session(request: Request, body_iterator):
+    commit = False
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+        commit = True
+    finally:
+        await end_db_session(request, commit)
+
+
+def count_headers(page: Page) -> dict:
+    """
+    Response headers describing the size of a paginated list.
+    X-Total-Count is omitted when the "none" count strategy was used.
+    """
+    headers = {
+        "X-Count-Strategy": page.count_strategy,
+        "X-Has-More": str(page.has_more).lower()
+    }
+    if page.count is not None:
+        headers["X-Total-Count"] = str(page.count)
+    return headers
+
+
+def render_json(content: Any) -> bytes:
+    """
+    Render a schema (or anything else jsonable_encoder accepts) the same way FastAPI's JSONResponse does.
+    """
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison, as the header requires).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strong = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == strong:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: dict = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
+
+
+def conditional_json(content: Any, if_none_match: Optional[str], headers: dict = None) -> Response:
+    """
+    JSON response for content without a version of its own, tagged with a hash of the rendered JSON.
+    That still costs the query, but saves sending unchanged lists again.
+    """
+    return conditional_payload(render_json(content), if_none_match, headers)
+
+
+def conditional_payload(payload: bytes, if_none_match: Optional[str], headers: dict = None) -> Response:
+    """
+    Like conditional_json(), for JSON that was already rendered.
+    """
+    etag = '"' + hashlib.blake2b(payload, digest_size=16).hexdigest() + '"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, headers)
+    return Response(content=payload, media_type="application/json", headers={**(headers or {}), "ETag": etag})
@@ -1,14 +1,23 @@
-GET_ROLES = "Retrieves a list of roles. Use 'limit' and 'skip' for pagination."
+GET_ROLES = "Retrieves a list of roles. Use 'limit' and 'skip' for pagination, " \
+            "'count' = 'none' to leave out X-Total-Count. Roles are held in memory, so any other 'count' " \
+            "strategy gives an exact count (and X-Count-Strategy says 'exact')."
 GET_ROLE = "Retrieves existing role. Role ID required."
-POST_ROLE = "Creates a new role. Requires name and permission number, where each bit represent a permission."
-PUT_ROLE = "Updates existing role. Role ID required. No field is required, which makes it similar to PATCH method."
-DELETE_ROLE = "Deletes an existing role. Role ID required."
+POST_ROLE = "Creates a new role. Requires name and permission number, where each bit represent a permission. " \
+            "Requires the permission to manage roles."
+PUT_ROLE = "Updates existing role. Role ID required. No field is required, which makes it similar to PATCH method. " \
+           "Requires the permission to manage roles."
+DELETE_ROLE = "Deletes an existing role. Role ID required. Requires the permission to manage roles."
 
 # LOGIN = "Uses OAuth2 authentication. Use like in docs. Username and password required."
 
 
 CREATE_ENTRY = "Creates a new entry. Requires 'lemma' field, the rest is optional (if supported and the 'language' " \
                "attribute is specified, it handles additional row insertions in language tables)."
+LIST_ENTRIES = "Retrieves a page of entries. 'include' accepts a comma-separated list of related data to embed in " \
+               "each entry: suggestions, translation, links, related, categories."
+LATEST_ENTRIES = "Lists the most recently created or modified entries, newest first, optionally only those of " \
+                 "one 'language'. Pass 'next_cursor' as 'cursor' for the next page. 'number_of_entries' is the " \
+                 "old name of 'limit'."
 UPDATE_ENTRY = "Updates entry information. Requires all entry attributes to be passed."
 DELETE_ENTRY = "Deletes the entry. Also removes any foreign references to it. If entry is not found, throws 404 error."
 LINK_CREATE = "Creates a new link and adds it to the entry with given ID. Only 'url' field is required, " \
@@ -25,3 +34,35 @@ DELETE_SUGGESTION = "Removes specific suggestion with ID <child_id> from entry w
                     "weather suggestion connection already exists."
 DELETE_TRANSLATION = "Removes all translations from entry with ID <entry_id>."
 DELETE_RELATION = "Removes specific relation with ID <related_id> from entry with ID <entry_id>."
+GET_ENTRY = "Retrieves entry details. The response carries an ETag that changes whenever anything shown in the " \
+            "details changes; send it back in If-None-Match to get an empty 304 response if nothing did."
+BATCH_ENTRIES = "Retrieves details of multiple entries at once. Pass comma-separated IDs in 'ids' " \
+                "(or use the POST variant with a JSON list for long lists). Entries are returned in the requested " \
+                "order, IDs of missing entries are listed in 'not_found'."
+IMPORT_ENTRIES = "Imports many entries at once from the request body, either newline-delimited JSON (one object " \
+                 "per line) or CSV with a header row ('format' parameter, or the text/csv and " \
+                 "application/x-ndjson content types). Fields: lemma (required), description, language, " \
+                 "alternative_form, categories (category names), translations (lemmas of the translated " \
+                 "entries) and translation_state (label). In CSV, list values are separated by '|'. Invalid " \
+                 "rows and rows with unknown categories, states or translations are skipped and listed in " \
+                 "'errors' by line number, the rest are imported."
+EXPORT_ENTRIES = "Streams all entries with their categories, translation, translation state and links, as " \
+                 "newline-delimited JSON or CSV ('format'), optionally gzip-compressed ('compression=gzip'). " \
+                 "The fields match the import, so an export can be imported again."
+ENTRY_CHANGES = "Lists IDs of entries created, updated (including their suggestions, translation, links, related " \
+                "entries and categories) and deleted since 'since', a token from an earlier response. Pass " \
+                "'next_token' as 'since' next time, repeating while 'has_more' is true. Without 'since', only " \
+                "returns a token for the current state: get one before downloading the dictionary, then sync " \
+                "from it. 'since=0.0' lists all changes from the start of the log."
+
+SIMPLE_SEARCH = "Searches entries by lemma. By default matches lemmas containing 'query'. With 'fuzzy' enabled, " \
+                "returns lemmas similar to 'query' (trigram similarity), best matches first. 'threshold' " \
+                "(0 - 1) overrides the configured minimum similarity."
+TEXT_SEARCH = "Full-text search over entry lemmas and descriptions, using the text search configuration of " \
+              "each entry's language. Supports web search syntax (\"quoted phrases\", or, -excluded). Results are " \
+              "ranked by relevance and include highlighted lemma and description snippets."
+
+LIST_EVENTS = "Lists the audit log of changes, newest first, optionally only those of a 'table', 'record_id' " \
+              "and/or 'user_id'. Pass 'next_cursor' as 'cursor' for the next page. Events are written shortly " \
+              "after the change commits, so the latest changes may take a moment to appear. " \
+              "Requires the permission to read the audit log."
@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
 
+from core import audit
+import core.models.dal_dependencies as dd
 import core.models.lex_model as models
 import core.schemas.lex_schema as schemas
+from v1.lex.entry_dal import parse_include, load_relations, entries_changed
 
 
 class CategoryDAL:
@@ -11,23 +14,48 @@ class CategoryDAL:
     async def add_category(self, category_create: schemas.CategoryCreate):
         category = category_create.to_category_instance()
         await category.save(self.db_session)
+        dd.invalidate_counts('categories')
+        audit.record(self.db_session, 'categories', 'create', category.id, name=category.name)
 
     async def remove_category(self, category_id: int):
+        entry_ids = await models.Category.retrieve_entry_ids(category_id, self.db_session)
         await models.Category.delete(category_id, self.db_session)
+        dd.invalidate_counts('categories', 'entries')
+        audit.record(self.db_session, 'categories', 'delete', category_id)
+        await entries_changed(entry_ids, self.db_session)
 
     async def update_category(self, category_id: int, category_update: schemas.CategoryCreate):
         category = category_update.to_category_instance()
         category.id = category_id
         await category.update(self.db_session)
+        audit.record(self.db_session, 'categories', 'update', category_id)
+        entry_ids = await models.Category.retrieve_entry_ids(category_id, self.db_session)
+        await entries_changed(entry_ids, self.db_session)
 
     async def retrieve_categories(self, filters: dict):
-        model, count = await models.Category.retrieve_all(filters, self.db_session)
-        list_schema = schemas.Category.list_from_model(model)
+        page = await models.Category.retrieve_all(filters, self.db_session)
+        list_schema = schemas.Category.list_from_model(page.items)
         schema = schemas.CategoryList(
             categories=list_schema,
-            full_count=count
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
         )
         return schema
 
     async def retrieve_entries_by_category(self, filters: dict, category_id: int):
-        return await models.Entry.retrieve_by_category(filters, category_id, self.db_session)
+        include = parse_include(filters.get('include'))
+        page = await models.Entry.retrieve_by_category(filters, category_id, self.db_session)
+        schema_entries = schemas.Entry.list_from_model(page.items)
+        if include:
+            relations = await load_relations([entry.id for entry in page.items], include, self.db_session)
+            schema_entries = schemas.EntryRelations.expand(schema_entries, relations)
+        schema = schemas.EntryList(
+            entries=schema_entries,
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
+        )
+        return schema
@@ -1,22 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import core.schemas.message_types as mt
-from core.models.database import async_session
+from core.exceptions import GeneralBackendException
 from core.schemas.lex_schema import *
+from v1 import doc_strings
+from v1.dependencies import conditional_json, get_db_session, UnitOfWorkRoute
 from v1.lex.category_dal import CategoryDAL
 
 
 router = APIRouter(
     prefix="/categories",
-    tags=["Categories"]
+    tags=["Categories"],
+    route_class=UnitOfWorkRoute
 )
 
 
-async def get_category_dal():
-    async with async_session() as session:
-        async with session.begin():
-            yield CategoryDAL(session)
+async def get_category_dal(db_session: AsyncSession = Depends(get_db_session)) -> CategoryDAL:
+    return CategoryDAL(db_session)
 
 
 @router.post("/", status_code=201,
@@ -38,15 +40,21 @@ async def add_category(category: CategoryCreate, db: CategoryDAL = Depends(get_c
 @router.get("/", status_code=200,
             responses={500: {"model": mt.Message}})
 async def retrieve_categories(sort: str = "name", offset: int = None, limit: int = None,
+                              cursor: str = None, count: str = None,
+                              if_none_match: Optional[str] = Header(None),
                               db: CategoryDAL = Depends(get_category_dal)):
     filters = {
         "sort": sort,
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "cursor": cursor,
+        "count": count
     }
     try:
         schema = await db.retrieve_categories(filters)
-        return schema
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -56,18 +64,27 @@ async def retrieve_categories(sort: str = "name", offset: int = None, limit: int
 
 
 @router.get("/{category_id}/entries", status_code=200,
-            responses={500: {"model": mt.Message}})
+            responses={500: {"model": mt.Message},
+                       200: {"model": EntryList}},
+            description=doc_strings.LIST_ENTRIES)
 async def retrieve_entries(category_id: int, sort: str = "lemma",
                            offset: int = None, limit: int = None,
+                           cursor: str = None, count: str = None, include: str = None,
+                           if_none_match: Optional[str] = Header(None),
                            db: CategoryDAL = Depends(get_category_dal)):
     filters = {
         "sort": sort,
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "cursor": cursor,
+        "count": count,
+        "include": include
     }
     try:
         schema = await db.retrieve_entries_by_category(filters, category_id)
-        return schema
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -0,0 +1,71 @@
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from core.exceptions import GeneralBackendException
+import core.models.lex_model as models
+import core.schemas.lex_schema as schemas
+
+# Position after every change of a transaction (change log IDs never get this high)
+_END_OF_TRANSACTION = 2 ** 63 - 1
+
+
+def encode_token(txid: int, change_id: int) -> str:
+    return f"{txid}.{change_id}"
+
+
+def decode_token(token: str) -> tuple:
+    """
+    :raises GeneralBackendException: (400) If the token is malformed.
+    """
+    try:
+        txid, change_id = token.split(".")
+        return int(txid), int(change_id)
+    except ValueError:
+        raise GeneralBackendException(400, "Invalid change token")
+
+
+class ChangesDAL:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    async def retrieve_changes(self, since: Optional[str], limit: int) -> schemas.EntryChanges:
+        """
+        Entries created, updated and deleted after the position of a token, with the token to continue from.
+        Without a token, only returns the token of the current position.
+
+        Changes are read in transaction order and only from transactions that have ended, so a transaction
+        committing late can't slip behind a token that was already handed out.
+        """
+        horizon = await models.EntryChange.retrieve_horizon(self.db_session)
+        # Everything before the horizon has been committed (or rolled back)
+        current = (horizon - 1, _END_OF_TRANSACTION)
+        if since is None:
+            return schemas.EntryChanges(created=[], updated=[], deleted=[],
+                                        next_token=encode_token(*current), has_more=False)
+
+        position = decode_token(since)
+        changes = await models.EntryChange.retrieve_since(position, horizon, limit + 1, self.db_session)
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        if has_more:
+            position = (changes[-1].txid, changes[-1].id)
+        else:
+            position = max(position, current)
+
+        # Only the net effect per entry: created then updated is still created, created then deleted is nothing
+        actions = {}
+        for change in changes:
+            previous = actions.get(change.entry_id)
+            if change.action == 'deleted':
+                actions[change.entry_id] = None if previous == 'created' else 'deleted'
+            elif change.action == 'created' or previous is None:
+                actions[change.entry_id] = change.action
+
+        return schemas.EntryChanges(
+            created=[entry_id for entry_id, action in actions.items() if action == 'created'],
+            updated=[entry_id for entry_id, action in actions.items() if action == 'updated'],
+            deleted=[entry_id for entry_id, action in actions.items() if action == 'deleted'],
+            next_token=encode_token(*position),
+            has_more=has_more
+        )
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import core.schemas.message_types as mt
+from core.exceptions import GeneralBackendException
+from core.schemas.lex_schema import EntryChanges
+from v1 import doc_strings
+from v1.dependencies import get_db_session, PrimaryUnitOfWorkRoute
+from v1.lex.changes_dal import ChangesDAL
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Changes"],
+    route_class=PrimaryUnitOfWorkRoute
+)
+
+MAX_CHANGES = 10000
+
+
+async def get_changes_dal(db_session: AsyncSession = Depends(get_db_session)) -> ChangesDAL:
+    return ChangesDAL(db_session)
+
+
+@router.get("/", status_code=200,
+            responses={500: {"model": mt.Message},
+                       400: {"model": mt.Message},
+                       200: {"model": EntryChanges}},
+            description=doc_strings.ENTRY_CHANGES)
+async def retrieve_changes(since: Optional[str] = None, limit: int = Query(1000, ge=1, le=MAX_CHANGES),
+                           db: ChangesDAL = Depends(get_changes_dal)):
+    try:
+        return await db.retrieve_changes(since, limit)
+    except GeneralBackendException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
@@ -1,58 +1,235 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
 from sqlalchemy.orm import Session
 
+from core import audit
+from core.cache import LRUCache
+from core.configuration import config
+from core.exceptions import GeneralBackendException
+import core.models.dal_dependencies as dd
 import core.models.lex_model as models
 import core.schemas.lex_schema as schemas
+from v1.dependencies import render_json
+
+ENTRY_RELATIONS = ("suggestions", "translation", "links", "related", "categories")
+
+# (version, rendered EntryDetail JSON) by entry ID, tagged with the entry version
+entry_cache = LRUCache("entry_detail", config.CACHE.ENTRY_CACHE_MAX_BYTES, config.CACHE.ENTRY_CACHE_TTL)
+# Rendered first pages of the latest entries feed by (language, limit), cleared on every entry write
+LATEST_CACHE_MAX_BYTES = 1024 * 1024
+latest_cache = LRUCache("latest_entries", LATEST_CACHE_MAX_BYTES, config.CACHE.LATEST_ENTRIES_CACHE_TTL)
+
+
+def parse_include(include: Optional[str]) -> List[str]:
+    """
+    Parse the "include" parameter (comma-separated relation names) of entry listings.
+
+    :raises GeneralBackendException: (400) If an unknown relation is requested.
+    """
+    relations = [relation.strip() for relation in (include or "").split(",") if relation.strip()]
+    unknown = [relation for relation in relations if relation not in ENTRY_RELATIONS]
+    if unknown:
+        raise GeneralBackendException(400, f"Unknown include: {', '.join(unknown)} "
+                                           f"(expected any of: {', '.join(ENTRY_RELATIONS)})")
+    return list(dict.fromkeys(relations))
+
+
+async def load_relations(entry_ids: List[int], relations: List[str], db_session: Session) -> Dict[str, dict]:
+    """
+    Load the requested relations of many entries, with one query per relation.
+
+    :return: Dictionary mapping each relation name to a dictionary of related models by entry ID
+        (a (translation, state) tuple for "translation", lists otherwise).
+    """
+    loaded = {relation: defaultdict(list) for relation in relations}
+    if not entry_ids:
+        return loaded
+
+    if "suggestions" in relations:
+        for parent, suggestion in await models.Suggestion.retrieve_by_parents(entry_ids, db_session):
+            loaded["suggestions"][parent].append(suggestion)
+    if "translation" in relations:
+        loaded["translation"] = {}
+        for parent, translation, state in await models.Translation.retrieve_by_parents(entry_ids, db_session):
+            loaded["translation"].setdefault(parent, (translation, state))
+    if "links" in relations:
+        for link in await models.Link.retrieve_by_entries(entry_ids, db_session):
+            loaded["links"][link.entry_id].append(link)
+    if "related" in relations:
+        for entry1, related_entry in await models.Relation.retrieve_by_entries1(entry_ids, db_session):
+            loaded["related"][entry1].append(related_entry)
+    if "categories" in relations:
+        for entry_id, category in await models.Category.retrieve_by_entries(entry_ids, db_session):
+            loaded["categories"][entry_id].append(category)
+    return loaded
+
+
+async def entries_changed(entry_ids: List[Optional[int]], db_session: Session):
+    """
+    Mark the details of entries as changed in this transaction: bump their versions (and so their ETags)
+    and drop their cached details.
+    """
+    entry_ids = sorted({entry_id for entry_id in entry_ids if entry_id})
+    if not entry_ids:
+        return
+    await models.Entry.bump_versions(entry_ids, db_session)
+    entry_cache.invalidate_on_commit(db_session, entry_ids)
+    latest_cache.clear_on_commit(db_session)
 
 
 class EntryDAL:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
+    async def _changed(self, *entry_ids: Optional[int]):
+        await entries_changed(list(entry_ids), self.db_session)
+
     async def add_entry(self, entry_create: schemas.EntryCreate):
         entry = entry_create.to_entry_instance()
         await entry.save(self.db_session)
+        dd.invalidate_counts('entries')
+        latest_cache.clear_on_commit(self.db_session)
+        audit.record(self.db_session, 'entries', 'create', entry.id, lemma=entry.lemma, language=entry.language)
 
     async def retrieve_entries(self, filters):
-        entries, count = await models.Entry.retrieve_all(filters, self.db_session)
-        schema_entries = schemas.Entry.list_from_model(entries)
+        include = parse_include(filters.get('include'))
+        page = await models.Entry.retrieve_all(filters, self.db_session)
+        schema_entries = schemas.Entry.list_from_model(page.items)
+        if include:
+            relations = await load_relations([entry.id for entry in page.items], include, self.db_session)
+            schema_entries = schemas.EntryRelations.expand(schema_entries, relations)
         schema = schemas.EntryList(
             entries=schema_entries,
-            full_count=count
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
         )
         return schema
 
-    async def retrieve_latest_n_entries(self, n: int):
-        entries = await models.Entry.retrieve_n_latest(n, self.db_session)
-        schema_entries = schemas.Entry.list_from_model(entries)
-        schema = schemas.EntryList(
-            entries=schema_entries,
-            full_count=len(schema_entries)
-        )
-        return schema
+    async def retrieve_latest_entries(self, filters: dict) -> bytes:
+        """
+        Get the rendered (JSON) EntryList of the most recently created or modified entries.
+        First pages (without a cursor) come from the latest entries cache if possible.
+        """
+        cache_key = (filters.get('language'), filters.get('limit'))
+        first_page = filters.get('cursor') is None
+        if first_page:
+            payload = latest_cache.get(cache_key)
+            if payload is not None:
+                return payload
+
+        generation = latest_cache.generation
+        page = await models.Entry.retrieve_latest(filters, self.db_session)
+        payload = render_json(schemas.EntryList(
+            entries=schemas.Entry.list_from_model(page.items),
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
+        ))
+        if first_page:
+            latest_cache.set(cache_key, payload, len(payload), generation)
+        return payload
 
     async def retrieve_entry_by_id(self, entry_id: int):
-        entry = await models.Entry.retrieve_by_id(entry_id, self.db_session)
-        suggestions = await models.Suggestion.retrieve_by_parent(entry_id, self.db_session)
-        translation, state = await models.Translation.retrieve_by_parent(entry_id, self.db_session)
-        links = await models.Link.retrieve_by_entry(entry_id, self.db_session)
-        related = await models.Relation.retrieve_by_entry1(entry_id, self.db_session)
-        categories = await models.Category.retrieve_by_entry(entry_id, self.db_session)
+        row = await models.Entry.retrieve_detail(entry_id, self.db_session)
 
         schema = None
-        if entry:
-            schema = schemas.EntryDetail.from_models(entry, suggestions, translation,
-                                                     state, links, related, categories)
+        if row:
+            schema = schemas.EntryDetail.from_row(row)
         return schema
 
+    async def retrieve_entry_version(self, entry_id: int) -> Optional[int]:
+        return await models.Entry.retrieve_version(entry_id, self.db_session)
+
+    @staticmethod
+    def cached_entry_payload(entry_id: int) -> Optional[Tuple[int, bytes]]:
+        """
+        Get the rendered (JSON) EntryDetail of an entry if it is cached, without touching the database.
+        Writes through this process drop it once they commit, writes through other processes only once
+        it expires ("cache.entry_cache_ttl").
+
+        :return: (version, JSON payload) or None if it isn't cached.
+        """
+        return entry_cache.get(entry_id)
+
+    async def retrieve_entry_payload(self, entry_id: int,
+                                     version: Optional[int] = None) -> Optional[Tuple[int, bytes]]:
+        """
+        Get the rendered (JSON) EntryDetail of an entry, from the entry cache if possible.
+
+        :param version: Current version of the entry (see retrieve_entry_version). Without it the cache is skipped.
+        :return: (version, JSON payload) or None if there is no such entry.
+        """
+        if version is not None:
+            cached = entry_cache.get(entry_id, version)
+            if cached is not None:
+                return cached
+
+        generation = entry_cache.generation
+        row = await models.Entry.retrieve_detail(entry_id, self.db_session)
+        if row is None:
+            return None
+
+        payload = render_json(schemas.EntryDetail.from_row(row))
+        version = row.Entry.version
+        entry_cache.set(entry_id, (version, payload), len(payload), generation, version)
+        return version, payload
+
+    async def retrieve_entries_by_ids(self, entry_ids: List[int]) -> schemas.EntryDetailList:
+        """
+        Load the details of several entries with one query per relation, stitched together in memory.
+
+        :param entry_ids: Entry IDs, the response keeps their order (duplicates are ignored).
+        :return: EntryDetailList containing found entries and the IDs that were not found.
+        """
+        entry_ids = list(dict.fromkeys(entry_ids))
+        entries = {}
+        additional_info = {}
+        for entry, slovene in await models.Entry.retrieve_by_ids(entry_ids, self.db_session):
+            entries[entry.id] = entry
+            if entry.language == 'sl' and slovene:
+                # Kept off the model instance, which may also appear nested in another entry's details
+                additional_info[entry.id] = {
+                    "alternative_form": slovene.alt_form
+                }
+        relations = await load_relations(list(entries), list(ENTRY_RELATIONS), self.db_session)
+
+        details = []
+        for entry_id in entry_ids:
+            if entry_id not in entries:
+                continue
+            translation, state = relations["translation"].get(entry_id, (None, None))
+            detail = schemas.EntryDetail.from_models(entries[entry_id], relations["suggestions"][entry_id],
+                                                     translation, state, relations["links"][entry_id],
+                                                     relations["related"][entry_id],
+                                                     relations["categories"][entry_id])
+            detail.additional_info = additional_info.get(entry_id, {})
+            details.append(detail)
+
+        return schemas.EntryDetailList(
+            entries=details,
+            not_found=[entry_id for entry_id in entry_ids if entry_id not in entries]
+        )
+
     async def update_entry(self, entry_update: schemas.EntryUpdate, entry_id: int):
         entry = entry_update.to_model(entry_id)
         await entry.update(self.db_session)
+        dd.invalidate_counts('entries')
+        audit.record(self.db_session, 'entries', 'update', entry_id)
+        await self._changed(entry_id, *await models.Entry.retrieve_referrer_ids(entry_id, self.db_session))
 
     async def add_suggestion(self, original_term: int, translation: int):
         await models.Suggestion.save(original_term, translation, self.db_session)
+        audit.record(self.db_session, 'suggestions', 'create', original_term, translation=translation)
+        await self._changed(original_term, translation)
 
     async def remove_suggestion(self, original_term: int, translation: int):
         await models.Suggestion.delete(original_term, translation, self.db_session)
+        audit.record(self.db_session, 'suggestions', 'delete', original_term, translation=translation)
+        await self._changed(original_term, translation)
 
     async def add_translation(self, original_term: int, translation: int, state: int):
         # Because fucking edge case
@@ -61,33 +238,57 @@ class EntryDAL:
         if entry1.language == 'en' and entry2.language == 'sl':
             await models.Translation.delete(original_term, self.db_session)
             await models.Translation.save(original_term, translation, state, self.db_session)
+            dd.invalidate_counts('entries')
+            audit.record(self.db_session, 'translations', 'create', original_term, translation=translation, state=state)
+            await self._changed(original_term, translation)
 
     async def manage_translation_state(self, original_term: int, translation: int, state: int):
         await models.Translation.update(original_term, translation, state, self.db_session)
+        audit.record(self.db_session, 'translations', 'update', original_term, translation=translation, state=state)
+        await self._changed(original_term, translation)
 
     async def remove_translation(self, original_term: int):
         await models.Translation.delete(original_term, self.db_session)
+        dd.invalidate_counts('entries')
+        audit.record(self.db_session, 'translations', 'delete', original_term)
+        await self._changed(original_term)
 
     async def add_relation(self, entry1: int, entry2: int):
         await models.Relation.save(entry1, entry2, self.db_session)
+        audit.record(self.db_session, 'relations', 'create', entry1, related=entry2)
+        await self._changed(entry1, entry2)
 
     async def remove_relation(self, entry1: int, entry2: int):
         await models.Relation.delete(entry1, entry2, self.db_session)
+        audit.record(self.db_session, 'relations', 'delete', entry1, related=entry2)
+        await self._changed(entry1, entry2)
 
     async def add_link(self, link_create: schemas.LinkCreate, entry_id: int):
         link = link_create.to_link_instance(entry_id)
         await link.save(self.db_session)
+        audit.record(self.db_session, 'links', 'create', link.id, entry_id=entry_id)
+        await self._changed(entry_id)
 
     async def remove_link(self, link_id: int):
-        await models.Link.delete(link_id, self.db_session)
+        entry_id = await models.Link.delete(link_id, self.db_session)
+        audit.record(self.db_session, 'links', 'delete', link_id, entry_id=entry_id)
+        await self._changed(entry_id)
 
     async def update_link(self, entry_id: int, link_id: int, link_update: schemas.LinkCreate):
         link = link_update.to_link_instance(entry_id)
         link.id = link_id
         await link.update(self.db_session)
+        audit.record(self.db_session, 'links', 'update', link_id, entry_id=entry_id)
+        await self._changed(entry_id)
 
     async def add_category(self, entry_id: int, category_id: int):
         await models.Category.bind_to_entry(entry_id, category_id, self.db_session)
+        dd.invalidate_counts('entries')
+        audit.record(self.db_session, 'category_to_entry', 'create', entry_id, category_id=category_id)
+        await self._changed(entry_id)
 
     async def remove_category(self, entry_id: int, category_id: int):
         await models.Category.unbind_from_entry(entry_id, category_id, self.db_session)
+        dd.invalidate_counts('entries')
+        audit.record(self.db_session, 'category_to_entry', 'delete', entry_id, category_id=category_id)
+        await self._changed(entry_id)
@@ -0,0 +1,187 @@
+import codecs
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from core import audit
+from core.exceptions import GeneralBackendException
+import core.models.dal_dependencies as dd
+import core.models.lex_model as models
+import core.schemas.lex_schema as schemas
+from v1.lex.entry_dal import entries_changed, latest_cache
+
+IMPORT_FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv"
+}
+# Rows sent to the staging table per COPY
+COPY_BATCH_SIZE = 5000
+# Separates names in the list columns (categories, translations) of CSV imports
+CSV_LIST_SEPARATOR = "|"
+CSV_LIST_COLUMNS = ("categories", "translations")
+
+# (line number, row values or None, error or None)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def import_format(requested: Optional[str], content_type: Optional[str]) -> str:
+    """
+    Pick the format of an import, from the "format" parameter or else the content type.
+
+    :raises GeneralBackendException: (400) If neither names a supported format.
+    """
+    if requested is None and content_type:
+        requested = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+    if requested not in IMPORT_FORMATS:
+        raise GeneralBackendException(400, f"Unknown import format (expected any of: {', '.join(IMPORT_FORMATS)}, "
+                                           f"or Content-Type {', '.join(CONTENT_TYPES)})")
+    return requested
+
+
+async def read_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a stream of UTF-8 encoded bytes into lines, without holding more than one chunk in memory.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise GeneralBackendException(400, "Import is not valid UTF-8")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    Parse newline-delimited JSON, one object per line. Blank lines are skipped.
+    """
+    number = 0
+    async for line in read_lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            values = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(values, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, values, None
+
+
+async def read_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedRow]:
+    """
+    Parse CSV with a header row naming the columns. Empty values are read as missing, list columns
+    are split on CSV_LIST_SEPARATOR. Quoted values may span lines, rows are numbered by their first line.
+
+    :raises GeneralBackendException: (400) If the header is missing the "lemma" column.
+    """
+    header = None
+    record = []
+    quotes = 0
+    number = 0
+    start = 0
+    async for line in read_lines(chunks):
+        number += 1
+        if not record:
+            start = number
+        record.append(line)
+        # Quotes inside values are doubled, so an odd count means a quoted value continues on the next line
+        quotes += line.count('"')
+        if quotes % 2:
+            continue
+
+        text = "\n".join(record)
+        record = []
+        quotes = 0
+        if not text.strip():
+            continue
+
+        try:
+            fields = next(csv.reader(io.StringIO(text)))
+        except csv.Error as e:
+            yield start, None, f"Invalid CSV: {e}"
+            continue
+
+        if header is None:
+            header = [column.strip() for column in fields]
+            if "lemma" not in header:
+                raise GeneralBackendException(400, "CSV header has no 'lemma' column")
+            continue
+        if len(fields) != len(header):
+            yield start, None, f"Expected {len(header)} columns, got {len(fields)}"
+            continue
+
+        values = {}
+        for column, value in zip(header, fields):
+            if column in CSV_LIST_COLUMNS:
+                values[column] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+            elif value != "":
+                values[column] = value
+        yield start, values, None
+
+    if record:
+        yield start, None, "Unterminated quoted value"
+
+
+def _describe_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+
+class EntryImportDAL:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    async def import_entries(self, chunks: AsyncIterator[bytes], format_name: str) -> schemas.EntryImportResult:
+        """
+        Import entries from a stream of NDJSON or CSV (see schemas.EntryImportRow for the fields).
+        Rows are staged with COPY in batches as they arrive, then imported with set-based statements.
+        Invalid rows are reported and skipped, they don't stop the import.
+        """
+        rows = read_csv(chunks) if format_name == "csv" else read_ndjson(chunks)
+
+        await models.EntryImport.create_staging_tables(self.db_session)
+        errors = []
+        batch = []
+        async for line, values, error in rows:
+            if error is None:
+                try:
+                    batch.append(schemas.EntryImportRow(**values).to_record(line))
+                except ValidationError as e:
+                    error = _describe_validation_error(e)
+            if error is not None:
+                errors.append(schemas.EntryImportError(line=line, error=error))
+
+            if len(batch) >= COPY_BATCH_SIZE:
+                await models.EntryImport.stage(batch, self.db_session)
+                batch = []
+        if batch:
+            await models.EntryImport.stage(batch, self.db_session)
+
+        imported, rejected, affected_ids = await models.EntryImport.apply(self.db_session)
+        if imported:
+            dd.invalidate_counts('entries')
+            latest_cache.clear_on_commit(self.db_session)
+            audit.record(self.db_session, 'entries', 'import', imported=imported, rejected=len(errors) + len(rejected))
+        await entries_changed(affected_ids, self.db_session)
+
+        errors += [schemas.EntryImportError(line=line, error=error) for line, error in rejected]
+        errors.sort(key=lambda item: item.line)
+        return schemas.EntryImportResult(
+            imported=imported,
+            errors=errors
+        )
@@ -1,24 +1,35 @@
 import traceback
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, Request, Query
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import core.schemas.message_types as mt
-from core.models.database import async_session
+from core.exceptions import GeneralBackendException
 from core.schemas.lex_schema import *
 from v1 import doc_strings
+from v1.dependencies import etag_matches, not_modified, conditional_json, conditional_payload, \
+    get_db_session, UnitOfWorkRoute, writing_endpoint
 from v1.lex.entry_dal import EntryDAL
+from v1.lex.entry_import_dal import EntryImportDAL, import_format
 
 router = APIRouter(
     prefix="/entries",
-    tags=["Entries"]
+    tags=["Entries"],
+    route_class=UnitOfWorkRoute
 )
 
+MAX_BATCH_SIZE = 200
+MAX_LATEST = 100
 
-async def get_entry_dal():
-    async with async_session() as session:
-        async with session.begin():
-            yield EntryDAL(session)
+
+async def get_entry_dal(db_session: AsyncSession = Depends(get_db_session)) -> EntryDAL:
+    return EntryDAL(db_session)
+
+
+async def get_entry_import_dal(db_session: AsyncSession = Depends(get_db_session)) -> EntryImportDAL:
+    return EntryImportDAL(db_session)
 
 
 @router.post("/", status_code=201,
@@ -40,17 +51,25 @@ async def add_entry(entry: EntryCreate, db: EntryDAL = Depends(get_entry_dal)):
 
 @router.get("/", status_code=200,
             responses={500: {"model": mt.Message},
-                       200: {"model": EntryList}})
+                       200: {"model": EntryList}},
+            description=doc_strings.LIST_ENTRIES)
 async def retrieve_entries(sort: str = "lemma", offset: int = None, limit: int = None,
+                           cursor: str = None, count: str = None, include: str = None,
+                           if_none_match: Optional[str] = Header(None),
                            db: EntryDAL = Depends(get_entry_dal)):
     filters = {
         "sort": sort,
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "cursor": cursor,
+        "count": count,
+        "include": include
     }
     try:
         schema = await db.retrieve_entries(filters)
-        return schema
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -61,12 +80,105 @@ async def retrieve_entries(sort: str = "lemma", offset: int = None, limit: int =
 
 @router.get("/latest", status_code=200,
             responses={500: {"model": mt.Message},
-                       200: {"model": EntryList}})
-async def retrieve_latest_entries(number_of_entries: int = 10,
+                       400: {"model": mt.Message},
+                       200: {"model": EntryList}},
+            description=doc_strings.LATEST_ENTRIES)
+async def retrieve_latest_entries(limit: Optional[int] = Query(None, ge=1, le=MAX_LATEST),
+                                  language: str = None, cursor: str = None,
+                                  number_of_entries: Optional[int] = Query(None, ge=1, le=MAX_LATEST,
+                                                                           deprecated=True),
+                                  if_none_match: Optional[str] = Header(None),
                                   db: EntryDAL = Depends(get_entry_dal)):
+    filters = {
+        "limit": limit or number_of_entries or 10,
+        "language": language,
+        "cursor": cursor
+    }
+    try:
+        payload = await db.retrieve_latest_entries(filters)
+        return conditional_payload(payload, if_none_match)
+    except GeneralBackendException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
+
+
+def entry_etag(entry_id: int, version: int) -> str:
+    return f'"{entry_id}-{version}"'
+
+
+def parse_batch_ids(ids: List[int]) -> List[int]:
+    if not ids:
+        raise HTTPException(
+            status_code=400,
+            detail="No entry IDs given"
+        )
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_SIZE} entries can be requested at once"
+        )
+    return ids
+
+
+@router.get("/batch", status_code=200,
+            responses={500: {"model": mt.Message},
+                       400: {"model": mt.Message},
+                       200: {"model": EntryDetailList}},
+            description=doc_strings.BATCH_ENTRIES)
+async def retrieve_entries_batch(ids: str, db: EntryDAL = Depends(get_entry_dal)):
     try:
-        schema = await db.retrieve_latest_n_entries(number_of_entries)
-        return schema
+        entry_ids = [int(entry_id) for entry_id in ids.split(",") if entry_id.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Entry IDs must be comma-separated integers"
+        )
+
+    entry_ids = parse_batch_ids(entry_ids)
+    try:
+        return await db.retrieve_entries_by_ids(entry_ids)
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
+
+
+@router.post("/batch", status_code=200,
+             responses={500: {"model": mt.Message},
+                        400: {"model": mt.Message},
+                        200: {"model": EntryDetailList}},
+             description=doc_strings.BATCH_ENTRIES)
+async def retrieve_entries_batch_post(batch: EntryBatchRequest, db: EntryDAL = Depends(get_entry_dal)):
+    entry_ids = parse_batch_ids(batch.ids)
+    try:
+        return await db.retrieve_entries_by_ids(entry_ids)
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
+
+
+@router.post("/import", status_code=200,
+             responses={500: {"model": mt.Message},
+                        400: {"model": mt.Message},
+                        200: {"model": EntryImportResult}},
+             description=doc_strings.IMPORT_ENTRIES)
+async def import_entries(request: Request, format_name: Optional[str] = Query(None, alias="format"),
+                         db: EntryImportDAL = Depends(get_entry_import_dal)):
+    format_name = import_format(format_name, request.headers.get("content-type"))
+    try:
+        return await db.import_entries(request.stream(), format_name)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -78,16 +190,31 @@ async def retrieve_latest_entries(number_of_entries: int = 10,
 @router.get("/{entry_id}", status_code=200,
             responses={500: {"model": mt.Message},
                        404: {"model": mt.Message},
-                       200: {"model": EntryDetail}})
-async def retrieve_entry(entry_id: int, db: EntryDAL = Depends(get_entry_dal)):
+                       200: {"model": EntryDetail}},
+            description=doc_strings.GET_ENTRY)
+async def retrieve_entry(entry_id: int, if_none_match: Optional[str] = Header(None),
+                         db: EntryDAL = Depends(get_entry_dal)):
     try:
-        entry = await db.retrieve_entry_by_id(entry_id)
-        if not entry:
+        # A cached entry is served without a query
+        detail = db.cached_entry_payload(entry_id)
+        if detail is None:
+            # The ETag only depends on the version, so revalidating never loads the details
+            version = await db.retrieve_entry_version(entry_id)
+            if version is not None:
+                etag = entry_etag(entry_id, version)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+                detail = await db.retrieve_entry_payload(entry_id, version)
+        if not detail:
             raise HTTPException(
                 status_code=404,
                 detail="Entry not found"
             )
-        return entry
+        version, payload = detail
+        etag = entry_etag(entry_id, version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return Response(content=payload, media_type="application/json", headers={"ETag": etag})
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -120,6 +247,7 @@ async def update_entry(entry_id: int, entry: EntryUpdate,
             responses={500: {"model": mt.Message},
                        200: {"model": mt.Message},
                        404: {"model": mt.Message}})
+@writing_endpoint
 async def suggest_translation(entry_id: int, suggestion_id: int,
                               db: EntryDAL = Depends(get_entry_dal)):
     try:
@@ -163,6 +291,7 @@ async def remove_suggestion(entry_id: int, suggestion_id: int,
             responses={500: {"model": mt.Message},
                        200: {"model": mt.Message},
                        404: {"model": mt.Message}})
+@writing_endpoint
 async def add_translation(entry_id: int, translation_id: int,
                           translation_state_id: int = None,
                           db: EntryDAL = Depends(get_entry_dal)):
@@ -232,6 +361,7 @@ async def remove_translation(entry_id: int, db: EntryDAL = Depends(get_entry_dal
             responses={500: {"model": mt.Message},
                        200: {"model": mt.Message},
                        404: {"model": mt.Message}})
+@writing_endpoint
 async def add_relation(entry_id: int, other_entry_id: int,
                        db: EntryDAL = Depends(get_entry_dal)):
     try:
@@ -343,6 +473,7 @@ async def update_link(entry_id: int, link_id: int, link: LinkCreate,
             responses={500: {"model": mt.Message},
                        200: {"model": mt.Message},
                        404: {"model": mt.Message}})
+@writing_endpoint
 async def add_category_to_entry(entry_id: int, category_id: int,
                                 db: EntryDAL = Depends(get_entry_dal)):
     try:
@@ -0,0 +1,103 @@
+import csv
+import datetime
+import io
+import json
+import zlib
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.orm import Session
+
+from core.exceptions import GeneralBackendException
+import core.models.lex_model as models
+from v1.lex.entry_import_dal import CSV_LIST_SEPARATOR
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+EXPORT_COMPRESSIONS = ("gzip",)
+# Same fields as the import (plus a few it ignores), so an export can be imported again
+EXPORT_COLUMNS = ("id", "lemma", "description", "language", "alternative_form", "categories", "translations",
+                  "translation_state", "links", "created", "edited")
+# Rows fetched from the cursor, and rendered into one chunk of the response, at a time
+EXPORT_BATCH_SIZE = 1000
+
+
+def check_export_options(format_name: str, compression: Optional[str]):
+    """
+    :raises GeneralBackendException: (400) If the format or compression isn't supported.
+    """
+    if format_name not in EXPORT_FORMATS:
+        raise GeneralBackendException(400, f"Unknown export format (expected any of: {', '.join(EXPORT_FORMATS)})")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise GeneralBackendException(400, f"Unknown compression (expected any of: {', '.join(EXPORT_COMPRESSIONS)})")
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't export {type(value).__name__}")
+
+
+def _render_ndjson(rows) -> str:
+    lines = []
+    for row in rows:
+        values = dict(row._mapping)
+        values["categories"] = values["categories"] or []
+        values["translations"] = values["translations"] or []
+        lines.append(json.dumps(values, ensure_ascii=False, default=_json_default) + "\n")
+    return "".join(lines)
+
+
+def _render_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            row.id, row.lemma, row.description, row.language, row.alternative_form,
+            CSV_LIST_SEPARATOR.join(row.categories or []),
+            CSV_LIST_SEPARATOR.join(row.translations or []),
+            row.translation_state,
+            CSV_LIST_SEPARATOR.join(link["url"] for link in row.links),
+            row.created.isoformat() if row.created else None,
+            row.edited.isoformat() if row.edited else None
+        ])
+    return buffer.getvalue()
+
+
+class ExportDAL:
+    def __init__(self, db_session: Session):
+        self.db_session = db_session
+
+    async def export_entries(self, format_name: str, compression: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Render all entries as NDJSON or CSV, batch by batch, so memory use doesn't grow with the dictionary.
+
+        :return: Chunks of the (optionally gzip-compressed) export.
+        """
+        result = await models.Entry.stream_export(self.db_session)
+        # wbits=31: gzip container instead of a raw zlib stream
+        compressor = zlib.compressobj(wbits=31) if compression == "gzip" else None
+
+        first = True
+        async for rows in result.partitions(EXPORT_BATCH_SIZE):
+            if format_name == "csv":
+                text = _render_csv(rows, header=first)
+            else:
+                text = _render_ndjson(rows)
+            first = False
+
+            chunk = text.encode("utf-8")
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        if first and format_name == "csv":
+            # Header of an empty dictionary
+            chunk = _render_csv([], header=True).encode("utf-8")
+            yield compressor.compress(chunk) if compressor else chunk
+        if compressor:
+            yield compressor.flush()
@@ -0,0 +1,41 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import core.schemas.message_types as mt
+from v1 import doc_strings
+from v1.dependencies import get_db_session, UnitOfWorkRoute
+from v1.lex.export_dal import ExportDAL, EXPORT_FORMATS, check_export_options
+
+router = APIRouter(
+    prefix="/export",
+    tags=["Export"],
+    route_class=UnitOfWorkRoute
+)
+
+
+async def get_export_dal(db_session: AsyncSession = Depends(get_db_session)) -> ExportDAL:
+    # UnitOfWorkRoute keeps the session open until the stream ends
+    return ExportDAL(db_session)
+
+
+@router.get("/", status_code=200,
+            responses={400: {"model": mt.Message}},
+            description=doc_strings.EXPORT_ENTRIES)
+async def export_entries(format_name: str = Query("ndjson", alias="format"), compression: Optional[str] = None,
+                         db: ExportDAL = Depends(get_export_dal)):
+    check_export_options(format_name, compression)
+
+    filename = f"kolomoni-entries.{format_name}"
+    media_type = EXPORT_FORMATS[format_name]
+    if compression == "gzip":
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        db.export_entries(format_name, compression),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
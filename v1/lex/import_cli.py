@@ -0,0 +1,62 @@
+"""
+Bulk import of entries from a file, the command line counterpart of POST /v1/lex/entries/import.
+
+    python -m v1.lex.import_cli entries.ndjson
+    python -m v1.lex.import_cli entries.txt --format csv
+
+The file is imported in one transaction. Rejected rows are listed on stderr, the exit code is 1 if there were any.
+"""
+import argparse
+import asyncio
+import sys
+from typing import AsyncIterator
+
+from core import audit
+from core.exceptions import GeneralBackendException
+from core.models.database import async_session, disconnect_db
+from v1.lex.entry_import_dal import EntryImportDAL, IMPORT_FORMATS
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def run(path: str, format_name: str) -> int:
+    audit.writer.start()
+    try:
+        async with async_session() as session:
+            async with session.begin():
+                result = await EntryImportDAL(session).import_entries(read_file(path), format_name)
+    except GeneralBackendException as e:
+        print(e.message, file=sys.stderr)
+        return 2
+    finally:
+        await audit.writer.stop()
+        await disconnect_db()
+
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}", file=sys.stderr)
+    print(f"Imported {result.imported} entries, rejected {len(result.errors)} rows")
+    return 1 if result.errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import entries from an NDJSON or CSV file.")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS,
+                        help="File format (default: csv for *.csv files, ndjson otherwise)")
+    args = parser.parse_args()
+
+    format_name = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+    sys.exit(asyncio.run(run(args.file, format_name)))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from .entry_router import router as entry_router
 from .translation_state_router import router as ts_router
 from .category_router import router as category_router
 from .search_router import router as search_router
+from .export_router import router as export_router
+from .changes_router import router as changes_router
 
 router = APIRouter(
     prefix="/lex",
@@ -13,3 +15,5 @@ router.include_router(entry_router)
 router.include_router(ts_router)
 router.include_router(category_router)
 router.include_router(search_router)
+router.include_router(export_router)
+router.include_router(changes_router)
@@ -2,38 +2,82 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
+from core.configuration import config
 import core.models.lex_model as models
 import core.schemas.lex_schema as schemas
+from v1.lex.entry_dal import parse_include, load_relations
 
 
 class SearchDAL:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
-    async def entry_simple_search(self, query: str, filters: dict, language: Optional[str]):
-        if language == 'sl':
-            entries, count = await models.Entry.simple_search_lang(query, language, filters, self.db_session)
+    async def entry_simple_search(self, query: str, filters: dict, language: Optional[str],
+                                  fuzzy: bool = False, threshold: Optional[float] = None):
+        include = parse_include(filters.get('include'))
+        if fuzzy:
+            if threshold is None:
+                threshold = config.SEARCH.SIMILARITY_THRESHOLD
+            if language not in ('sl', 'en'):
+                language = None
+            page = await models.Entry.fuzzy_search(query, language, threshold, filters, self.db_session)
+        elif language == 'sl':
+            page = await models.Entry.simple_search_lang(query, language, filters, self.db_session)
         elif language == 'en':
-            entries, count = await models.Entry.simple_search_lang(query, language, filters, self.db_session)
+            page = await models.Entry.simple_search_lang(query, language, filters, self.db_session)
         else:
-            entries, count = await models.Entry.simple_search_all(query, filters, self.db_session)
-        schema = schemas.EntryMinimal.list_from_model(entries)
+            page = await models.Entry.simple_search_all(query, filters, self.db_session)
+        schema = schemas.EntryMinimal.list_from_model(page.items)
+        if include:
+            relations = await load_relations([entry.id for entry in page.items], include, self.db_session)
+            schema = schemas.EntryRelations.expand(schema, relations)
         list_schema = schemas.MinimalEntryList(
             entries=schema,
-            full_count=count
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
+        )
+        return list_schema
+
+    async def entry_text_search(self, query: str, filters: dict, language: Optional[str]):
+        include = parse_include(filters.get('include'))
+        page = await models.Entry.text_search(query, language, filters, self.db_session)
+        schema = schemas.EntrySearchResult.list_from_rows(page.items)
+        if include:
+            relations = await load_relations([result.id for result in schema], include, self.db_session)
+            schema = schemas.EntryRelations.expand(schema, relations)
+        list_schema = schemas.EntrySearchResultList(
+            entries=schema,
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
         )
         return list_schema
 
     async def entry_full_search(self, query: str, filters: dict, language: Optional[str]):
+        include = parse_include(filters.get('include'))
         if language == 'sl':
-            entries, count = await models.Entry.full_search_lang(query, language, filters, self.db_session)
+            page = await models.Entry.full_search_lang(query, language, filters, self.db_session)
         elif language == 'en':
-            entries, count = await models.Entry.full_search_lang(query, language, filters, self.db_session)
+            page = await models.Entry.full_search_lang(query, language, filters, self.db_session)
         else:
-            entries, count = await models.Entry.full_search_lang(query, '', filters, self.db_session)
-        schema = schemas.EntryPair.from_list_models(entries)
+            page = await models.Entry.full_search_lang(query, '', filters, self.db_session)
+        schema = schemas.EntryPair.from_list_models(page.items)
+        if include:
+            entries = [entry for pair in schema for entry in (pair.english, pair.slovene) if entry]
+            relations = await load_relations([entry.id for entry in entries], include, self.db_session)
+            for pair in schema:
+                if pair.english:
+                    pair.english = schemas.EntryRelations.expand([pair.english], relations)[0]
+                if pair.slovene:
+                    pair.slovene = schemas.EntryRelations.expand([pair.slovene], relations)[0]
         list_schema = schemas.EntryPairList(
             entries=schema,
-            full_count=count
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more,
+            next_cursor=page.next_cursor
         )
         return list_schema
@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import core.schemas.message_types as mt
-from core.models.database import async_session
+from core.exceptions import GeneralBackendException
+from v1 import doc_strings
+from v1.dependencies import conditional_json, get_db_session, UnitOfWorkRoute
 from v1.lex.search_dal import SearchDAL
 
 router = APIRouter(
     prefix="/search",
-    tags=["Search"]
+    tags=["Search"],
+    route_class=UnitOfWorkRoute
 )
 
 
-async def get_search_dal():
-    async with async_session() as session:
-        async with session.begin():
-            yield SearchDAL(session)
+async def get_search_dal(db_session: AsyncSession = Depends(get_db_session)) -> SearchDAL:
+    return SearchDAL(db_session)
 
 
 @router.get("/search/entry/simple", status_code=200,
-            responses={500: {"model": mt.Message}})
-async def simple_search_entries(query: str = "", offset: int = None, limit: int = None, language: str = None,
+            responses={500: {"model": mt.Message}},
+            description=doc_strings.SIMPLE_SEARCH)
+async def simple_search_entries(query: str = "", offset: int = None, limit: int = None,
+                                cursor: str = None, count: str = None, include: str = None,
+                                language: str = None,
+                                fuzzy: bool = False, threshold: Optional[float] = Query(None, ge=0, le=1),
+                                if_none_match: Optional[str] = Header(None),
                                 db: SearchDAL = Depends(get_search_dal)):
     filters = {
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "cursor": cursor,
+        "count": count,
+        "include": include
     }
     try:
-        schema = await db.entry_simple_search(query, filters, language)
-        return schema
+        schema = await db.entry_simple_search(query, filters, language, fuzzy, threshold)
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -37,15 +51,51 @@ async def simple_search_entries(query: str = "", offset: int = None, limit: int
 
 @router.get("/search/entry/full", status_code=200,
             responses={500: {"model": mt.Message}})
-async def full_search_entries(query: str = "", offset: int = None, limit: int = None, language: str = None,
+async def full_search_entries(query: str = "", offset: int = None, limit: int = None,
+                              cursor: str = None, count: str = None, include: str = None,
+                              language: str = None,
+                              if_none_match: Optional[str] = Header(None),
                               db: SearchDAL = Depends(get_search_dal)):
     filters = {
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "cursor": cursor,
+        "count": count,
+        "include": include
     }
     try:
         schema = await db.entry_full_search(query, filters, language)
-        return schema
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=500,
+            detail="Server error"
+        )
+
+
+@router.get("/search/entry/text", status_code=200,
+            responses={500: {"model": mt.Message}},
+            description=doc_strings.TEXT_SEARCH)
+async def text_search_entries(query: str = "", offset: int = None, limit: int = None,
+                              cursor: str = None, count: str = None, include: str = None,
+                              language: str = None,
+                              if_none_match: Optional[str] = Header(None),
+                              db: SearchDAL = Depends(get_search_dal)):
+    filters = {
+        "offset": offset,
+        "limit": limit,
+        "cursor": cursor,
+        "count": count,
+        "include": include
+    }
+    try:
+        schema = await db.entry_text_search(query, filters, language)
+        return conditional_json(schema, if_none_match)
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
 
+from core import audit, registry
+import core.models.dal_dependencies as dd
 import core.models.lex_model as models
 import core.schemas.lex_schema as schemas
+from v1.lex.entry_dal import entries_changed
 
 
 class TranslationStateDAL:
@@ -11,19 +14,27 @@ class TranslationStateDAL:
     async def add_translation_state(self, state_create: schemas.TranslationStateCreate):
         state = state_create.to_state_instance()
         await state.save(self.db_session)
+        await registry.translation_states.changed(self.db_session)
+        audit.record(self.db_session, 'translation_states', 'create', state.id, label=state.label)
 
     async def remove_translation_state(self, state_id: int):
+        entry_ids = await models.Translation.retrieve_parent_ids_by_state(state_id, self.db_session)
         await models.TranslationState.delete(state_id, self.db_session)
+        await registry.translation_states.changed(self.db_session)
+        audit.record(self.db_session, 'translation_states', 'delete', state_id)
+        await entries_changed(entry_ids, self.db_session)
 
     async def retrieve_translation_state_by_id(self, state_id: int):
-        state = await models.TranslationState.retrieve_by_id(state_id, self.db_session)
+        state = await registry.translation_states.get(state_id)
         return state
 
     async def retrieve_all_translation_states(self, filters):
-        states, count = await models.TranslationState.retrieve_all(filters, self.db_session)
-        schema_states = schemas.TranslationState.list_from_model(states)
+        states = await registry.translation_states.all()
+        page = registry.page(states, filters.get('offset'), filters.get('limit'), dd.count_strategy(filters))
         schema = schemas.TranslationStateList(
-            translation_states=schema_states,
-            full_count=count
+            translation_states=page.items,
+            full_count=page.count,
+            count_strategy=page.count_strategy,
+            has_more=page.has_more
         )
         return schema
@@ -1,20 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import core.schemas.message_types as mt
-from core.models.database import async_session
+from core.exceptions import GeneralBackendException
 from core.schemas.lex_schema import *
+from v1.dependencies import get_db_session, UnitOfWorkRoute
 from v1.lex.translation_state_dal import TranslationStateDAL
 
 router = APIRouter(
     prefix="/translation_state",
-    tags=["Translation state"]
+    tags=["Translation state"],
+    route_class=UnitOfWorkRoute
 )
 
 
-async def get_state_dal():
-    async with async_session() as session:
-        async with session.begin():
-            yield TranslationStateDAL(session)
+async def get_state_dal(db_session: AsyncSession = Depends(get_db_session)) -> TranslationStateDAL:
+    return TranslationStateDAL(db_session)
 
 
 @router.post("/", status_code=201,
@@ -35,16 +36,20 @@ async def add_translation_state(state: TranslationStateCreate,
 
 
 @router.get("/", status_code=200,
-            responses={500: {"model": mt.Message}})
-async def retrieve_translation_states(offset: int = None, limit: int = None,
+            responses={500: {"model": mt.Message},
+                       400: {"model": mt.Message}})
+async def retrieve_translation_states(offset: int = None, limit: int = None, count: str = None,
                                       db: TranslationStateDAL = Depends(get_state_dal)):
     filters = {
         "offset": offset,
-        "limit": limit
+        "limit": limit,
+        "count": count
     }
     try:
         schema = await db.retrieve_all_translation_states(filters)
         return schema
+    except GeneralBackendException as e:
+        raise e
     except Exception as e:
         print(e)
         raise HTTPException(
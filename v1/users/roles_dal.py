@@ -1,44 +1,46 @@
 from typing import Optional, List
 
-from sqlalchemy import update, func, delete
+from sqlalchemy import update, delete
 from sqlalchemy.engine import CursorResult
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session
 
+from core import audit, registry
 import core.models.users_model as um
 import core.schemas.users_schema as us
 import core.models.dal_dependencies as dd
+from v1.users.users_dal import users_changed, bump_roles_versions
+
+
+def _has_role(role_id: int):
+    return um.User.id.in_(select(um.RoleToUser.user_id).where(um.RoleToUser.role_id == role_id))
 
 
 class RoleDAL:
     def __init__(self, db_session: Session):
         self.db_session = db_session
 
-    async def get_roles(self, params) -> (List[us.Role], int):
-        count_stm = func.count(um.Role.id)
-        count_query = await self.db_session.execute(count_stm)
-        count: int = count_query.scalar()
-
-        content_stm = select(um.Role.id, um.Role.name, um.Role.permissions)
-        content_stm = dd.paging_filter_sort(content_stm, params)
-        content_query = await self.db_session.execute(content_stm)
-        content = content_query.all()
-
-        return content, count
+    async def get_roles(self, params) -> dd.Page:
+        roles = await registry.roles.all()
+        return registry.page(roles, params.get("skip"), params.get("limit"), dd.count_strategy(params))
 
     async def get_role(self, role_id: int) -> Optional[us.Role]:
-        query = await self.db_session.get(um.Role, role_id)
-        if query:
-            return us.Role.from_model(query)
-        else:
-            return None
+        return await registry.roles.get(role_id)
 
     async def delete_role(self, role_id: int) -> bool:
+        # Before the role (and so who had it) is gone
+        await bump_roles_versions(self.db_session, _has_role(role_id))
+
         query = delete(um.Role).where(um.Role.id == role_id)
         query.execution_options(synchronize_session='fetch')
 
         deleted = await self.db_session.execute(query)
-        return deleted.rowcount != 0
+        dd.invalidate_counts("roles")
+        if deleted.rowcount == 0:
+            return False
+        await registry.roles.changed(self.db_session)
+        audit.record(self.db_session, "roles", "delete", role_id)
+        return True
 
     async def create_role(self, role: us.RoleCreate) -> Optional[us.Role]:
         db_role = um.Role.from_schema(role)
@@ -47,6 +49,9 @@ class RoleDAL:
         try:
             await self.db_session.flush()
             await self.db_session.refresh(db_role)
+            dd.invalidate_counts("roles")
+            await registry.roles.changed(self.db_session)
+            audit.record(self.db_session, "roles", "create", db_role.id, name=db_role.name)
             return db_role
         except:
             await self.db_session.rollback()
@@ -54,16 +59,25 @@ class RoleDAL:
 
     async def update_role(self, role_data: us.RoleUpdate, role_id: int) -> tuple[bool, str]:
         query = update(um.Role).where(um.Role.id == role_id)
+        permissions_changed = False
         if role_data.name:
             query = query.values(name=role_data.name)
         elif role_data.permissions >= 0:
             query = query.values(permissions=role_data.permissions)
+            permissions_changed = True
         query.execution_options(synchronize_session='fetch')
 
         try:
             changed: CursorResult = await self.db_session.execute(query)
             if changed.rowcount == 0:
                 return False, "Role not found"
+            if permissions_changed:
+                await bump_roles_versions(self.db_session, _has_role(role_id))
+            else:
+                users_changed(self.db_session)
+            await registry.roles.changed(self.db_session)
+            audit.record(self.db_session, "roles", "update", role_id,
+                         name=role_data.name, permissions=role_data.permissions)
             return True, "Role updated"
         except:
             await self.db_session.rollback()
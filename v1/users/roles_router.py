@@ -1,25 +1,26 @@
 from fastapi import APIRouter, Depends, Request
 from fastapi.encoders import jsonable_encoder
 from starlette.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.exceptions import GeneralBackendException
 import core.schemas.message_types as mt
-from core.models.database import async_session
-from core.schemas.users_schema import Role, RoleCreate, RoleUpdate
+from core.schemas.users_schema import Role, RoleCreate, RoleUpdate, TokenData, MANAGE_ROLES
 
 import v1.doc_strings as doc_str
+from v1.dependencies import count_headers, get_db_session, UnitOfWorkRoute
 from v1.users.roles_dal import RoleDAL
+from v1.users.users_router import require_permissions
 
 router = APIRouter(
     prefix="/roles",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=UnitOfWorkRoute
 )
 
 
-async def get_role_dal():
-    async with async_session() as session:
-        async with session.begin():
-            yield RoleDAL(session)
+async def get_role_dal(db_session: AsyncSession = Depends(get_db_session)) -> RoleDAL:
+    return RoleDAL(db_session)
 
 
 @router.get("/", response_model=list[Role], status_code=200,
@@ -27,17 +28,18 @@ async def get_role_dal():
 async def read_all_roles(req: Request, db: RoleDAL = Depends(get_role_dal)):
     params = req.query_params
 
-    content, count = await db.get_roles(params)
-    json_content = jsonable_encoder(content)
-    headers = {"X-Total-Count": str(count)}
+    page = await db.get_roles(params)
+    json_content = jsonable_encoder(page.items)
+    headers = count_headers(page)
     return JSONResponse(
         content=json_content, headers=headers
     )
 
 
 @router.post("/", response_model=Role, status_code=201,
-             responses={400: {}}, description=doc_str.POST_ROLE)
-async def create_role(role: RoleCreate, db: RoleDAL = Depends(get_role_dal)):
+             responses={400: {}, 401: {}, 403: {}}, description=doc_str.POST_ROLE)
+async def create_role(role: RoleCreate, db: RoleDAL = Depends(get_role_dal),
+                      _: TokenData = Depends(require_permissions(MANAGE_ROLES))):
     new_role = await db.create_role(role)
     if new_role is None:
         raise GeneralBackendException(400, "Error creating Role")
@@ -54,8 +56,10 @@ async def read_role(role_id: int, db: RoleDAL = Depends(get_role_dal)):
 
 
 @router.put("/{role_id}", response_model=mt.Message, status_code=200,
-            responses={404: {'model': mt.Message}}, description=doc_str.PUT_ROLE)
-async def update_role(role_data: RoleUpdate, role_id: int, db: RoleDAL = Depends(get_role_dal)):
+            responses={401: {'model': mt.Message}, 403: {'model': mt.Message}, 404: {'model': mt.Message}},
+            description=doc_str.PUT_ROLE)
+async def update_role(role_data: RoleUpdate, role_id: int, db: RoleDAL = Depends(get_role_dal),
+                      _: TokenData = Depends(require_permissions(MANAGE_ROLES))):
     updated, msg = await db.update_role(role_data, role_id)
     if not updated:
         raise GeneralBackendException(404, "Role not found")
@@ -63,8 +67,10 @@ async def update_role(role_data: RoleUpdate, role_id: int, db: RoleDAL = Depends
 
 
 @router.delete("/{role_id}", response_model=mt.Message, status_code=200,
-               responses={404: {'model': mt.Message}}, description=doc_str.DELETE_ROLE)
-async def remove_role(role_id: int, db: RoleDAL = Depends(get_role_dal)):
+               responses={401: {'model': mt.Message}, 403: {'model': mt.Message}, 404: {'model': mt.Message}},
+               description=doc_str.DELETE_ROLE)
+async def remove_role(role_id: int, db: RoleDAL = Depends(get_role_dal),
+                      _: TokenData = Depends(require_permissions(MANAGE_ROLES))):
     deleted = await db.delete_role(role_id)
     if not deleted:
         raise GeneralBackendException(404, "Role not found")
@@ -1,18 +1,54 @@
 import traceback
-from typing import Optional
+from typing import Iterable, Optional, Tuple
 
-from sqlalchemy import update, func, delete
+from sqlalchemy import update, func, delete, true, any_, literal, Integer
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.engine import CursorResult
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
 from sqlalchemy.sql import Select
 from starlette.datastructures import QueryParams
 
+from core import audit
+from core.cache import LRUCache
+from core.configuration import config
 import core.models.dal_dependencies as dd
 import core.models.users_model as um
 import core.schemas.users_schema as us
 
+# UserDetail of authenticated users by username, cleared on every user or role change. Other processes only notice
+# a change once their copy expires, so the TTL bounds how stale an authenticated user can be.
+user_cache = LRUCache("users", config.CACHE.USER_CACHE_MAX_BYTES, config.CACHE.USER_CACHE_TTL)
+# Current roles version of users by username (compared against the version in access tokens), cleared the same way
+roles_version_cache = LRUCache("roles_versions", config.CACHE.USER_CACHE_MAX_BYTES, config.CACHE.USER_CACHE_TTL)
+
+
+def users_changed(db_session: AsyncSession):
+    """
+    Drop the cached users once the session commits (after any change to users, their roles or roles).
+    """
+    user_cache.clear_on_commit(db_session)
+    roles_version_cache.clear_on_commit(db_session)
+
+
+async def bump_roles_versions(db_session: AsyncSession, *conditions):
+    """
+    Bump the roles version of the users matching the conditions, so their access tokens' permissions are
+    recognized as outdated.
+    """
+    # Bookkeeping, not a change to the user itself (modified would be set by onupdate otherwise)
+    await db_session.execute(update(um.User).where(*conditions)
+                             .values(roles_version=um.User.roles_version + 1, modified=um.User.modified)
+                             .execution_options(synchronize_session=False))
+    users_changed(db_session)
+
+
+def _any_of(column, ids: Iterable[int]):
+    """
+    column = ANY(:ids), with the IDs sent as a single array parameter (the same statement for any number of IDs).
+    """
+    return column == any_(literal(list(ids), ARRAY(Integer)))
+
 
 class UserDAL:
     """
@@ -21,25 +57,24 @@ class UserDAL:
     def __init__(self, db_session: AsyncSession):
         self.db_session: AsyncSession = db_session
 
-    async def get_users(self, paging_params: Optional[QueryParams] = None) -> tuple[list[us.User], int]:
+    async def get_users(self, paging_params: Optional[QueryParams] = None) -> dd.Page:
         """
         Get list of registered users.
 
-        :param paging_params: Dictionary containing skip and/or limit parameters for pagination
+        :param paging_params: Dictionary containing skip, limit and/or count parameters for pagination
             (starlette QueryParameters expected actually, but those are just a frozen dict).
-        :return: A tuple containing a list of users and total user count.
+        :return: A Page containing a list of users and total user count (see dd.count_rows for the count strategies).
         """
-        count_stm = func.count(um.User.id)
-        count_query = await self.db_session.execute(count_stm)
-        total_user_count: int = count_query.scalar()
+        paging_params = paging_params or {}
+        total_user_count, strategy = await dd.count_rows(select(um.User.id), paging_params, self.db_session, "users")
 
         content_stm: Select = select(um.User.id, um.User.username, um.User.display_name, um.User.is_active)
-        content_stm = dd.paging_filter_sort(content_stm, paging_params)
+        content_stm = dd.paging_filter_sort(content_stm, paging_params, peek=True)
 
         content_query = await self.db_session.execute(content_stm)
-        content = content_query.all()
+        content, has_more = dd.trim_peeked_row(content_query.all(), paging_params)
 
-        return content, total_user_count
+        return dd.Page(content, total_user_count, None, strategy, has_more)
 
     async def get_user(self, user_id: int) -> Optional[us.UserDetail]:
         """
@@ -70,6 +105,54 @@ class UserDAL:
 
         return us.UserDetail.from_model(result)
 
+    async def get_cached_user_by_username(self, username: str) -> Optional[us.UserDetail]:
+        """
+        Like get_user_by_username(), from the user cache if possible (unknown usernames aren't cached).
+        """
+        user = user_cache.get(username)
+        if user is None:
+            generation = user_cache.generation
+            user = await self.get_user_by_username(username)
+            if user is not None:
+                user_cache.set(username, user, len(user.json()), generation)
+        return user
+
+    async def get_permissions(self, username: str) -> Optional[Tuple[int, int]]:
+        """
+        Get the aggregated permissions of a user (all roles' permissions OR-ed together).
+
+        :param username: Username.
+        :return: Tuple of the permissions and the roles version they are current for, None if no such user.
+        """
+        statement = select(um.User.roles_version, func.coalesce(func.bit_or(um.Role.permissions), 0)) \
+            .outerjoin(um.RoleToUser, um.RoleToUser.user_id == um.User.id) \
+            .outerjoin(um.Role, um.Role.id == um.RoleToUser.role_id) \
+            .where(um.User.username == username) \
+            .group_by(um.User.id)
+        query = await self.db_session.execute(statement)
+
+        row = query.first()
+        if row is None:
+            return None
+        roles_version, permissions = row
+        return permissions, roles_version
+
+    async def get_cached_roles_version(self, username: str) -> Optional[int]:
+        """
+        Get the current roles version of a user, from the roles version cache if possible.
+
+        :param username: Username.
+        :return: Roles version, None if no such user.
+        """
+        roles_version = roles_version_cache.get(username)
+        if roles_version is None:
+            generation = roles_version_cache.generation
+            query = await self.db_session.execute(select(um.User.roles_version).where(um.User.username == username))
+            roles_version = query.scalar()
+            if roles_version is not None:
+                roles_version_cache.set(username, roles_version, len(username) + 8, generation)
+        return roles_version
+
     async def get_user_credentials_by_username(self, username: str) -> Optional[us.UserLogin]:
         """
         Get user credentials by username.
@@ -109,6 +192,9 @@ class UserDAL:
                 return False
 
             await self.db_session.flush()
+            dd.invalidate_counts("users")
+            users_changed(self.db_session)
+            audit.record(self.db_session, "users", "delete", user_id)
             return True
 
         except Exception:
@@ -131,6 +217,8 @@ class UserDAL:
         try:
             await self.db_session.flush()
             await self.db_session.refresh(db_user)
+            dd.invalidate_counts("users")
+            audit.record(self.db_session, "users", "create", db_user.id, username=db_user.username)
 
             return db_user
         except Exception:
@@ -160,7 +248,11 @@ class UserDAL:
             changed: CursorResult = await self.db_session.execute(query)
             if changed.rowcount == 0:
                 return False, "User not found"
+            users_changed(self.db_session)
 
+            # Never the password (hash), only whether it changed
+            audit.record(self.db_session, "users", "update", user_id,
+                         display_name=user_data.display_name, password_changed=bool(user_data.password))
             return True, "User updated"
         except Exception:
             traceback.print_exc()
@@ -203,46 +295,103 @@ class UserDAL:
         return result
 
     async def create_user_roles(self, user_id: int, role_ids: list[int]) -> (bool, str):
-        user_stm = select(um.User) \
-            .where(um.User.id == user_id) \
-            .options(selectinload(um.User.roles))
-        user_query = await self.db_session.execute(user_stm)
-
-        user = user_query.scalar()
-        if not user:
-            return False, "User not found"
-
-        for role_id in role_ids:
-            role = await self.db_session.get(um.Role, role_id)
-            if role:
-                user.roles.append(role)
-
         try:
-            await self.db_session.flush()
-            return True, "Roles appended"
+            assigned = await self._assign_roles([user_id], role_ids)
         except:
             await self.db_session.rollback()
             return False, "Database error"
 
-    async def remove_user_roles(self, user_id: int, role_ids: list[int]) -> (bool, str):
-        user_stm = select(um.User).where(um.User.id == user_id).options(selectinload(um.User.roles))
-        user_query = await self.db_session.execute(user_stm)
-
-        user = user_query.scalar()
-        if not user:
+        if not assigned and await self._missing_ids(um.User.id, [user_id]):
             return False, "User not found"
+        return True, "Roles appended"
 
-        for role_id in role_ids:
-            role = await self.db_session.get(um.Role, role_id)
-            if role:
-                try:
-                    user.roles.remove(role)
-                except:
-                    print("Role not in list")
-
+    async def remove_user_roles(self, user_id: int, role_ids: list[int]) -> (bool, str):
         try:
-            await self.db_session.flush()
-            return True, "Roles removed"
+            removed = await self._remove_roles([user_id], role_ids)
         except:
             await self.db_session.rollback()
             return False, "Database error"
+
+        if not removed and await self._missing_ids(um.User.id, [user_id]):
+            return False, "User not found"
+        return True, "Roles removed"
+
+    async def assign_roles(self, user_ids: list[int], role_ids: list[int]) -> us.UserRolesChangeResult:
+        """
+        Assign every role to every user (roles they already have are skipped).
+
+        :param user_ids: IDs of the users.
+        :param role_ids: IDs of the roles to assign.
+        :return: UserRolesChangeResult with the number of assignments made and the IDs that don't exist.
+        """
+        assigned = await self._assign_roles(user_ids, role_ids)
+        return us.UserRolesChangeResult(
+            changed=len(assigned),
+            missing_user_ids=await self._missing_ids(um.User.id, user_ids),
+            missing_role_ids=await self._missing_ids(um.Role.id, role_ids)
+        )
+
+    async def remove_roles(self, user_ids: list[int], role_ids: list[int]) -> us.UserRolesChangeResult:
+        """
+        Remove every role from every user (roles they don't have are skipped).
+
+        :param user_ids: IDs of the users.
+        :param role_ids: IDs of the roles to remove.
+        :return: UserRolesChangeResult with the number of assignments removed and the IDs that don't exist.
+        """
+        removed = await self._remove_roles(user_ids, role_ids)
+        return us.UserRolesChangeResult(
+            changed=len(removed),
+            missing_user_ids=await self._missing_ids(um.User.id, user_ids),
+            missing_role_ids=await self._missing_ids(um.Role.id, role_ids)
+        )
+
+    async def _assign_roles(self, user_ids: list[int], role_ids: list[int]) -> list[tuple[int, int]]:
+        """
+        :return: (user ID, role ID) of the assignments made.
+        """
+        pairs = select(um.Role.id, um.User.id) \
+            .select_from(um.Role) \
+            .join(um.User, true()) \
+            .where(_any_of(um.Role.id, role_ids), _any_of(um.User.id, user_ids))
+        statement = pg_insert(um.RoleToUser) \
+            .from_select(["role_id", "user_id"], pairs) \
+            .on_conflict_do_nothing() \
+            .returning(um.RoleToUser.user_id, um.RoleToUser.role_id)
+        query = await self.db_session.execute(statement)
+
+        assigned = query.all()
+        await self._roles_changed(assigned, "create")
+        return assigned
+
+    async def _remove_roles(self, user_ids: list[int], role_ids: list[int]) -> list[tuple[int, int]]:
+        """
+        :return: (user ID, role ID) of the assignments removed.
+        """
+        statement = delete(um.RoleToUser) \
+            .where(_any_of(um.RoleToUser.user_id, user_ids), _any_of(um.RoleToUser.role_id, role_ids)) \
+            .returning(um.RoleToUser.user_id, um.RoleToUser.role_id) \
+            .execution_options(synchronize_session=False)
+        query = await self.db_session.execute(statement)
+
+        removed = query.all()
+        await self._roles_changed(removed, "delete")
+        return removed
+
+    async def _roles_changed(self, changes: list[tuple[int, int]], action: str):
+        role_ids_by_user: dict[int, list[int]] = {}
+        for user_id, role_id in changes:
+            role_ids_by_user.setdefault(user_id, []).append(role_id)
+        if not role_ids_by_user:
+            return
+
+        await bump_roles_versions(self.db_session, _any_of(um.User.id, role_ids_by_user))
+        for user_id, role_ids in role_ids_by_user.items():
+            audit.record(self.db_session, "role_to_user", action, user_id, role_ids=sorted(role_ids))
+
+    async def _missing_ids(self, column, ids: list[int]) -> list[int]:
+        """
+        :return: Those of the IDs that aren't in the column, sorted.
+        """
+        query = await self.db_session.execute(select(column).where(_any_of(column, ids)))
+        return sorted(set(ids) - set(query.scalars().all()))
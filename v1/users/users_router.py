@@ -1,3 +1,4 @@
+import time
 from datetime import timedelta, datetime
 from typing import Optional
 
@@ -5,60 +6,63 @@ from fastapi import APIRouter, Depends, Request, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from starlette import status
 from starlette.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core import audit
+from core.cache import LRUCache
 from core.exceptions import GeneralBackendException
+from core.passwords import hasher
 from core.schemas.message_types import Message
-from core.models.database import async_session
 from core.configuration import config
-from core.schemas.users_schema import TokenData, User, UserDetail, UserCreate, UserUpdate, Role, UserLogin
+from core.schemas.users_schema import TokenData, User, UserDetail, UserCreate, UserUpdate, Role, UserLogin, \
+    UserRolesChange, UserRolesChangeResult, MANAGE_ROLES, MANAGE_USERS
 
-from v1.dependencies import oauth2_scheme
+from v1.dependencies import oauth2_scheme, count_headers, get_db_session, UnitOfWorkRoute
 from v1.users.users_dal import UserDAL
 
 router = APIRouter(
     prefix="/users",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=UnitOfWorkRoute
 )
 
-pwd_context = CryptContext(schemes=["bcrypt"])
+# (TokenData, expiry timestamp) of valid tokens, so repeated requests with a token skip verifying its signature
+token_cache = LRUCache("tokens", config.CACHE.USER_CACHE_MAX_BYTES, config.CACHE.USER_CACHE_TTL)
 
 ####
 # Utility functions
 ####
-async def get_user_dal() -> UserDAL:
+async def get_user_dal(db_session: AsyncSession = Depends(get_db_session)) -> UserDAL:
     """
     FastAPI injectable to provide access to users in the database.
     """
-    async with async_session() as session:
-        async with session.begin():
-            return UserDAL(session)
+    return UserDAL(db_session)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verify the validity of the password by comparing it to a hash of the expected password.
+    Verify the validity of the password by comparing it to a hash of the expected password
+    (on the password hashing pool, see core/passwords.py).
 
     :param plain_password: Plain-text password (will be hashed and compared).
     :param hashed_password: Pasword hash to compare to.
     :return: Boolean indicating whether the password matched the hash.
+    :raises GeneralBackendException: (503) If too many passwords are being hashed already.
     """
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except (ValueError, TypeError):
-        return False
+    return await hasher.verify(plain_password, hashed_password)
 
 
-def hash_password(password: str) -> str:
+async def hash_password(password: str) -> str:
     """
-    Hash the provided password.
+    Hash the provided password (on the password hashing pool, see core/passwords.py).
 
     :param password: Password to hash.
     :return: Hashed password.
+    :raises GeneralBackendException: (503) If too many passwords are being hashed already.
     """
-    return pwd_context.hash(password)
+    return await hasher.hash(password)
 
 
 async def authenticate_user(username: str, password: str, database: UserDAL) -> Optional[UserLogin]:
@@ -71,14 +75,48 @@ async def authenticate_user(username: str, password: str, database: UserDAL) ->
     :return: UserLogin instance if sucessfully authenticated, None otherwise.
     """
     user: Optional[UserLogin] = await database.get_user_credentials_by_username(username)
-    is_valid_password: bool = verify_password(password, user.password)
+    if user is None:
+        # Costs as much as checking a password, not to give away which usernames exist
+        await hasher.verify_dummy(password)
+        return None
 
-    if user is None or is_valid_password is False:
+    is_valid_password: bool = await verify_password(password, user.password)
+    if is_valid_password is False:
         return None
 
     return user
 
 
+def decode_token(token: str) -> TokenData:
+    """
+    Get the claims of a token, from the token cache if possible.
+
+    :param token: Access token.
+    :return: TokenData of the token (username None if the token has no subject).
+    :raises JWTError: If the token is invalid or expired.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        token_data, expires = cached
+        if expires is None or expires > time.time():
+            return token_data
+
+    payload: dict = jwt.decode(token=token, key=config.JWT.SECRET_KEY, algorithms=[config.JWT.ALGORITHM])
+    token_data = TokenData(username=payload.get("sub"), permissions=payload.get("perms", 0),
+                           roles_version=payload.get("rv"))
+    if token_data.username is not None:
+        token_cache.set(token, (token_data, payload.get("exp")), len(token) + len(token_data.username) + 16)
+    return token_data
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
 async def get_current_user(
         database: UserDAL = Depends(get_user_dal),
         token: str = Depends(oauth2_scheme)
@@ -90,45 +128,104 @@ async def get_current_user(
     :param token: Token from the Authentication header.
     :return: UserDetail instance of the logged-in user.
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"}
-    )
+    credentials_exception = _credentials_exception()
 
     try:
-        payload: dict = jwt.decode(token=token, key=config.JWT.SECRET_KEY, algorithms=[config.JWT.ALGORITHM])
-
-        username: str = payload.get("sub")
-        if username is None:
+        token_data = decode_token(token)
+        if token_data.username is None:
             raise credentials_exception
-
-        token_data = TokenData(username=username)
     except JWTError as error:
         raise credentials_exception from error
 
-    user = await database.get_user_by_username(token_data.username)
+    user = await database.get_cached_user_by_username(token_data.username)
     if user is None:
         raise credentials_exception
 
+    audit.set_current_user(user.id, user.username)
     return user
 
 
+async def get_token_data(
+        database: UserDAL = Depends(get_user_dal),
+        token: str = Depends(oauth2_scheme)
+) -> TokenData:
+    """
+    FastAPI injectable to fetch the claims (username and permissions) of the Bearer token.
+
+    The permissions in the token are only used while the user's roles version still matches the one the token
+    was issued for (a cached lookup), otherwise they are reloaded from the database, so role changes take effect
+    without logging in again.
+
+    :param database: Instance of UserDAL to access users.
+    :param token: Token from the Authentication header.
+    :return: TokenData with the user's current permissions.
+    """
+    credentials_exception = _credentials_exception()
+
+    try:
+        token_data = decode_token(token)
+        if token_data.username is None:
+            raise credentials_exception
+    except JWTError as error:
+        raise credentials_exception from error
+
+    roles_version = await database.get_cached_roles_version(token_data.username)
+    if roles_version is None:
+        raise credentials_exception
+
+    if roles_version != token_data.roles_version:
+        current = await database.get_permissions(token_data.username)
+        if current is None:
+            raise credentials_exception
+        permissions, roles_version = current
+        token_data = TokenData(username=token_data.username, permissions=permissions, roles_version=roles_version)
+
+    return token_data
+
+
+def require_permissions(permissions: int):
+    """
+    Create a FastAPI injectable that only lets through users having all of the permissions (bits) in the mask
+    (see core/schemas/users_schema.py). Authorized users are recorded as the authors of the request's changes.
+
+    :param permissions: Bitmask of the required permissions.
+    :return: Injectable returning the TokenData of the authorized user.
+    """
+    async def check_permissions(
+            token_data: TokenData = Depends(get_token_data),
+            database: UserDAL = Depends(get_user_dal)
+    ) -> TokenData:
+        if token_data.permissions & permissions != permissions:
+            raise GeneralBackendException(403, "Insufficient permissions")
+
+        user = await database.get_cached_user_by_username(token_data.username)
+        if user is None:
+            raise _credentials_exception()
+        audit.set_current_user(user.id, user.username)
+        return token_data
+
+    return check_permissions
+
+
 def create_access_token(
         data: dict,
-        expires_delta: timedelta = timedelta(minutes=15)
+        expires_delta: timedelta = timedelta(minutes=15),
+        permissions: int = 0,
+        roles_version: Optional[int] = None
 ) -> str:
     """
     Create an access token for the user.
 
     :param data: Data to encode in the JWT.
     :param expires_delta: Timedelta of token expiration.
+    :param permissions: Aggregated permissions of the user's roles.
+    :param roles_version: Roles version of the user the permissions are current for.
     :return: Access token.
     """
     to_encode: dict = data.copy()
     expire: datetime = datetime.utcnow() + expires_delta
 
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "perms": permissions, "rv": roles_version})
     encoded_jwt = jwt.encode(to_encode, config.JWT.SECRET_KEY, algorithm=config.JWT.ALGORITHM)
 
     return encoded_jwt
@@ -146,14 +243,13 @@ async def read_users(
 ):
     """
     Retrieves a list of general information about users.
-    Use "limit" and "skip" for pagination.
+    Use "limit" and "skip" for pagination, "count" to choose how X-Total-Count is computed
+    ("exact", "estimated", "cached" or "none").
     """
-    content, count = await database.get_users(req.query_params)
+    page = await database.get_users(req.query_params)
 
-    json_content = jsonable_encoder(content)
-    headers = {
-        "X-Total-Count": str(count)
-    }
+    json_content = jsonable_encoder(page.items)
+    headers = count_headers(page)
 
     return JSONResponse(
         content=json_content, headers=headers
@@ -171,7 +267,7 @@ async def create_user(
     """
     Creates a new user. Requires username and password, display_name is optional.
     """
-    new_user.password = hash_password(new_user.password)
+    new_user.password = await hash_password(new_user.password)
 
     new_user = await database.create_user(new_user)
     if new_user is None:
@@ -193,19 +289,13 @@ async def read_user_me(
 
 @router.get("/me/perms")
 async def read_user_me_permissions(
-        current_user: User = Depends(get_current_user),
-        database: UserDAL = Depends(get_user_dal)
+        token_data: TokenData = Depends(get_token_data)
 ):
     """
     Return information about the currently authenticated user's permissions (roles) (based on the Authorization header).
     """
-    roles, _ = await database.get_user_roles(current_user.id, None)
-    perms = 0
-    for role in roles:
-        perms = perms | role.permissions
-
     return {
-        "permissions": perms
+        "permissions": token_data.permissions
     }
 
 
@@ -226,10 +316,14 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    permissions, roles_version = await database.get_permissions(user.username) or (0, None)
+
     access_token_expires = timedelta(minutes=config.JWT.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username},
-        expires_delta=access_token_expires
+        expires_delta=access_token_expires,
+        permissions=permissions,
+        roles_version=roles_version
     )
 
     return {
@@ -238,6 +332,39 @@ async def login(
     }
 
 
+@router.post("/roles",
+             response_model=UserRolesChangeResult,
+             status_code=200,
+             responses={401: {}, 403: {}})
+async def add_roles_to_users(
+        change: UserRolesChange,
+        database: UserDAL = Depends(get_user_dal),
+        _: TokenData = Depends(require_permissions(MANAGE_ROLES))
+):
+    """
+    Adds roles to many users at once. As request body accepts the user IDs and the role IDs to append to each of them.
+    Reports how many roles were appended (ones users already had don't count) and which IDs don't exist.
+    Requires the permission to manage roles.
+    """
+    return await database.assign_roles(change.user_ids, change.role_ids)
+
+
+@router.delete("/roles",
+               response_model=UserRolesChangeResult,
+               status_code=200,
+               responses={401: {}, 403: {}})
+async def remove_roles_from_users(
+        change: UserRolesChange,
+        database: UserDAL = Depends(get_user_dal),
+        _: TokenData = Depends(require_permissions(MANAGE_ROLES))
+):
+    """
+    Removes roles from many users at once. As request body accepts the user IDs and the role IDs to remove from each
+    of them. Reports how many roles were removed and which IDs don't exist. Requires the permission to manage roles.
+    """
+    return await database.remove_roles(change.user_ids, change.role_ids)
+
+
 @router.get("/{user_id}",
             response_model=UserDetail,
             status_code=200,
@@ -275,6 +402,8 @@ async def update_user(
     if user_id != current_user.id:
         raise GeneralBackendException(401, "You are not the owner of this account.")
 
+    if user_data.password:
+        user_data.password = await hash_password(user_data.password)
     updated, msg = await database.update_user(user_data, user_id)
     if not updated:
         raise GeneralBackendException(404, msg)
@@ -284,13 +413,14 @@ async def update_user(
 
 @router.delete("/{user_id}",
                status_code=200,
-               responses={404: {}})
+               responses={401: {}, 403: {}, 404: {}})
 async def remove_user(
         user_id: int,
-        database: UserDAL = Depends(get_user_dal)
+        database: UserDAL = Depends(get_user_dal),
+        _: TokenData = Depends(require_permissions(MANAGE_USERS))
 ):
     """
-    Deletes an existing user, user ID required.
+    Deletes an existing user, user ID required. Requires the permission to manage users.
     """
     deleted = await database.delete_user(user_id)
     if not deleted:
@@ -325,15 +455,17 @@ async def read_user_roles(
 
 @router.post("/{user_id}/roles",
              response_model=Message,
-             status_code=200)
+             status_code=200,
+             responses={401: {}, 403: {}, 404: {}})
 async def add_user_roles(
         user_id: int,
         role_ids: list[int],
-        database: UserDAL = Depends(get_user_dal)
+        database: UserDAL = Depends(get_user_dal),
+        _: TokenData = Depends(require_permissions(MANAGE_ROLES))
 ):
     """
     Adds new roles to existing user, user ID required.
-    As request body accepts a list of role IDs to append.
+    As request body accepts a list of role IDs to append. Requires the permission to manage roles.
     """
     added, msg = await database.create_user_roles(user_id, role_ids)
     if not added:
@@ -343,15 +475,17 @@ async def add_user_roles(
 
 @router.delete("/{user_id}/roles",
                response_model=Message,
-               status_code=200)
+               status_code=200,
+               responses={401: {}, 403: {}, 404: {}})
 async def remove_user_roles(
         user_id: int,
         role_ids: list[int],
-        database: UserDAL = Depends(get_user_dal)
+        database: UserDAL = Depends(get_user_dal),
+        _: TokenData = Depends(require_permissions(MANAGE_ROLES))
 ):
     """
     Removes roles from existing user, user ID required.
-    As request body accepts a list of role IDs to remove.
+    As request body accepts a list of role IDs to remove. Requires the permission to manage roles.
     """
     removed, msg = await database.remove_user_roles(user_id, role_ids)
     if not removed: